@@ -0,0 +1,345 @@
+# encoding=utf-8
+
+""" Benchmark
+    Author: lipixun
+    Created Time : 2024-04-02 21:33:50
+
+    File Name: benchmark.py
+    Description:
+
+        Generate synthetic mods and measure hot paths. Results are written as json, compare them between commits.
+
+"""
+from typing import Any, Callable, Dict, List
+
+import os
+import os.path
+import sys
+import random
+import subprocess
+
+from time import perf_counter
+
+from localization import LocalizationManager
+from project import ProjectRegistry, RegistryConfig, get_project_config
+from search import SearchIndex
+from translation import BuildTarget, DataFormatSnapshot, TranslationManager
+from utils import json
+
+ScriptPath = os.path.dirname(os.path.abspath(__file__))
+# Words to generate values, including stellaris formatting codes
+ValueWords = [
+    "empire", "fleet", "planet", "the", "of", "and", "research", "energy", "minerals", "alloys",
+    "$FLEET_NAME$", "$ALIAS_KEY$", "§Ywarning§!", "§G+10%§!", "£energy£", "£minerals£", "\\n", "\\\"quoted\\\"",
+]
+
+
+def generate_source(dirpath: str, key_count: int, languages: List[str], file_count: int, seed: int = 0) -> List[str]:
+    """Generate a synthetic localisation directory
+    Returns:
+        The generated keys
+    """
+    rand = random.Random(seed)
+    keys = ["bench_%s_%d" % (rand.choice(["event", "tech", "building", "desc", "tooltip"]), index) for index in range(key_count)]
+    for language in languages:
+        lang_dir = os.path.join(dirpath, language)
+        os.makedirs(lang_dir, exist_ok=True)
+        for file_index in range(file_count):
+            with open(os.path.join(lang_dir, "bench_%d_l_%s.yml" % (file_index, language)), "w", encoding="utf-8-sig") as fd:
+                fd.write("l_%s:\n" % language)
+                for key in keys[file_index::file_count]:
+                    value = " ".join(rand.choice(ValueWords) for _ in range(rand.randint(1, 16)))
+                    fd.write(" %s:0 \"%s\"\n" % (key, value))
+    return keys
+
+
+def generate_data(filepath: str, source_localization: LocalizationManager, languages: List[str],
+                  translated_ratio: float = 0.5, skipped_ratio: float = 0.05, changed_ratio: float = 0.05, seed: int = 0) -> None:
+    """Generate a synthetic translation data file
+    """
+    rand = random.Random(seed)
+    with open(filepath, "w", encoding="utf-8") as fd:
+        for language in languages:
+            for key in source_localization.sorted_keys:
+                if rand.random() >= translated_ratio:
+                    continue
+                original_value = source_localization.get(key).values[0].value
+                if rand.random() < changed_ratio:
+                    original_value = "outdated %s" % original_value
+                record: Dict[str, Any] = {"l": language, "k": key, "v0": original_value, "v1": "translated %s" % key, "t": 0}
+                if rand.random() < skipped_ratio:
+                    record["s"] = True
+                    record["v1"] = ""
+                print(json.dumps(record, sort_keys=True, ensure_ascii=False), file=fd)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Measure a function
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        func()
+        times.append(perf_counter() - start_time)
+    return {
+        "runs": repeat,
+        "min": min(times),
+        "mean": sum(times) / len(times),
+        "max": max(times),
+    }
+
+
+def run_benchmark(work_dir: str, key_count: int, source_languages: List[str], target_languages: List[str],
+                  file_count: int, repeat: int, jobs: int, queries: List[str]) -> Dict[str, Any]:
+    """Run benchmark of a mod size
+    """
+    import server
+
+    from bottle import request
+
+    source_dir = os.path.join(work_dir, "source")
+    data_file = os.path.join(work_dir, "data.jsonl")
+    output_dir = os.path.join(work_dir, "output")
+    os.makedirs(output_dir, exist_ok=True)
+
+    generate_source(source_dir, key_count, source_languages, file_count)
+    source_localization = LocalizationManager()
+    source_localization.load(source_dir, jobs)
+    generate_data(data_file, source_localization, target_languages)
+
+    results: Dict[str, Any] = {}
+
+    def load_source():
+        LocalizationManager().load(source_dir, jobs)
+    results["localization.load"] = measure(load_source, repeat)
+
+    def load_data():
+        TranslationManager(source_localization).load(data_file)
+    results["translation.load"] = measure(load_data, repeat)
+
+    snapshot_file = os.path.join(work_dir, "data.snapshot")
+    snapshot_manager = TranslationManager(source_localization)
+    snapshot_manager.load(data_file)
+    snapshot_manager.save(snapshot_file, DataFormatSnapshot)
+
+    def load_snapshot():
+        translation_manager = TranslationManager(source_localization)
+        translation_manager.load(snapshot_file)
+        translation_manager.get_translation_keys(target_languages[0])
+    results["translation.load.snapshot.first_keys"] = measure(load_snapshot, repeat)
+
+    def load_data_and_keys():
+        translation_manager = TranslationManager(source_localization)
+        translation_manager.load(data_file)
+        translation_manager.get_translation_keys(target_languages[0])
+    results["translation.load.first_keys"] = measure(load_data_and_keys, repeat)
+
+    translation_manager = TranslationManager(source_localization)
+    translation_manager.load(data_file)
+    language = target_languages[0]
+
+    def get_keys_cold():
+        translation_manager.reset_key_states()
+        translation_manager.get_translation_keys(language)
+    results["translation.get_translation_keys.cold"] = measure(get_keys_cold, repeat)
+    results["translation.get_translation_keys.warm"] = measure(lambda: translation_manager.get_translation_keys(language), repeat)
+
+    def add_and_delete():
+        for key in source_localization.sorted_keys[:1000]:
+            translation_manager.add(key, language, "benchmark", False)
+        for key in source_localization.sorted_keys[:1000]:
+            translation_manager.delete(key, language)
+    results["translation.add_delete.1000"] = measure(add_and_delete, repeat)
+
+    # Search indexes (built on the first search)
+    def build_key_index():
+        SearchIndex().build((key, key) for key in source_localization.sorted_keys)
+    results["search.build.key"] = measure(build_key_index, repeat)
+
+    def build_value_index():
+        SearchIndex().build((key, "\n".join(value.value for value in source_localization.get(key).values))
+                            for key in source_localization.sorted_keys)
+    results["search.build.value"] = measure(build_value_index, repeat)
+    source_localization.search_keys("bench")
+    source_localization.search_values("bench")
+    translation_manager.search_translations("bench", language)
+
+    # The /_/keys handler, of a project which has warmed up indexes
+    server.gRegistry = ProjectRegistry(RegistryConfig(
+        projects=[get_project_config({
+            "name": "bench",
+            "source_paths": [source_dir],
+            "data_file": data_file,
+            "output_path": output_dir,
+            "default_target_language": language,
+            "disable_journal": True,
+        }, work_dir)],
+        default_project=None, max_loaded_projects=0, idle_timeout=0, autosave_interval=0, jobs=jobs, source_cache=None,
+        watch_source=False, watch_interval=0,
+    ), server.gLock.write_lock)
+    project = server.gRegistry.get()
+    project.localization_manager.search_keys("bench")
+    project.localization_manager.search_values("bench")
+    project.translation_manager.search_translations("bench", language)
+    for query in queries:
+        for scope in (("key", "all") if query else ("key",)):
+            for state in ("", "new"):
+                def get_keys():
+                    request.bind({"QUERY_STRING": "language=%s&query=%s&scope=%s&state=%s" % (language, query, scope, state)})
+                    server.handle_get_keys()
+                results["server.keys.%s.%s.%s" % (scope, state or "full", query or "empty")] = measure(get_keys, repeat)
+
+    results["translation.save"] = measure(lambda: translation_manager.save(os.path.join(work_dir, "saved.jsonl")), repeat)
+
+    def build_cold():
+        translation_manager.reset_key_states()  # Reset build fingerprints
+        translation_manager.build("bench", output_dir, True)
+    results["translation.build.cold"] = measure(build_cold, repeat)
+    results["translation.build.warm"] = measure(lambda: translation_manager.build("bench", output_dir, True), repeat)
+
+    # Two output projects share values of each language
+    build_targets = [BuildTarget("bench", output_dir, None, True), BuildTarget("bench_sub", output_dir, None, False)]
+
+    def build_targets_cold():
+        translation_manager.reset_key_states()
+        translation_manager.build_targets(build_targets, jobs=jobs)
+    results["translation.build_targets.cold"] = measure(build_targets_cold, repeat)
+
+    return results
+
+
+def run_startup_benchmark(work_dir: str, repeat: int) -> Dict[str, Any]:
+    """Run benchmark of cli startup, the import time and a build of a small mod without and with the daemon
+    """
+    source_dir = os.path.join(work_dir, "source")
+    data_file = os.path.join(work_dir, "data.jsonl")
+    output_dir = os.path.join(work_dir, "output")
+    os.makedirs(output_dir, exist_ok=True)
+    generate_source(source_dir, 20000, ["english"], 20)
+    source_localization = LocalizationManager()
+    source_localization.load(source_dir)
+    generate_data(data_file, source_localization, ["simp_chinese"])
+
+    def run_cli(*args: str) -> None:
+        subprocess.run([sys.executable, os.path.join(ScriptPath, "translation.py"), *args], cwd=work_dir, check=True, stdout=subprocess.DEVNULL)
+
+    results: Dict[str, Any] = {}
+    for name in ["translation", "server"]:
+        results["import.%s" % name] = measure(lambda: subprocess.run([sys.executable, "-c", "import %s" % name], cwd=ScriptPath, check=True), repeat)
+    results["cli.help"] = measure(lambda: run_cli("--help"), repeat)
+    build_args = ["build", "--name", "bench", "--source-path", source_dir, "--data-file", data_file, "--output-path", output_dir]
+    results["cli.build"] = measure(lambda: run_cli(*build_args), repeat)
+
+    address = r"\\.\pipe\stellaris-bench-%d" % os.getpid() if sys.platform == "win32" else os.path.join(work_dir, "daemon.sock")
+    daemon = subprocess.Popen([sys.executable, os.path.join(ScriptPath, "translation.py"), "daemon", "--address", address],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        # Wait for listening
+        daemon.stdout.readline()  # type: ignore
+        run_cli("--daemon", address, *build_args)
+        results["cli.build.daemon"] = measure(lambda: run_cli("--daemon", address, *build_args), repeat)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    return results
+
+
+def get_git_commit() -> str | None:
+    """Get current git commit of this repository
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ScriptPath,
+                                       stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+
+    import shutil
+    import platform
+    import tempfile
+
+    from argparse import ArgumentParser
+
+    from utils import LanguageNames
+
+    def get_args():
+        """Get args
+        """
+        parser = ArgumentParser(description="Stellaris translation benchmark")
+        parser.add_argument("--keys", dest="key_counts", default=[], type=int, action="append",
+                            help="The number of keys of the synthetic mod, 10000 by default. You can specify multiple sizes")
+        parser.add_argument("--source-language", dest="source_languages", default=[], action="append", choices=LanguageNames,
+                            help="Languages of the synthetic mod, english by default. You can specify multiple languages")
+        parser.add_argument("--target-language", dest="target_languages", default=[], action="append", choices=LanguageNames,
+                            help="Languages of the synthetic translation data, simp_chinese by default. You can specify multiple languages")
+        parser.add_argument("--files", dest="file_count", default=20, type=int, help="The number of files per language, 20 by default")
+        parser.add_argument("--query", dest="queries", default=[], action="append",
+                            help="Queries of the /_/keys benchmark, [\"\", \"b\", \"tech_1\"] by default")
+        parser.add_argument("--repeat", dest="repeat", default=3, type=int, help="Runs of each measurement, 3 by default")
+        parser.add_argument("--jobs", dest="jobs", default=1, type=int, help="The number of processes to parse source files")
+        parser.add_argument("--work-dir", dest="work_dir", default=None, help="The directory to generate files, a temp directory by default")
+        parser.add_argument("--output", dest="output", default=None, help="The json file to write results, stdout by default")
+        parser.add_argument("--compare", dest="compare", default=None, help="A json file of previous results, print the change of mean time")
+        return parser.parse_args()
+
+    def main():
+        """Main entry
+        """
+        args = get_args()
+        key_counts = args.key_counts or [10000]
+        source_languages = args.source_languages or ["english"]
+        target_languages = args.target_languages or ["simp_chinese"]
+        queries = args.queries or ["", "b", "tech_1"]
+
+        report: Dict[str, Any] = {
+            "commit": get_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "source_languages": source_languages,
+                "target_languages": target_languages,
+                "files": args.file_count,
+                "repeat": args.repeat,
+                "jobs": args.jobs,
+            },
+            "results": {},
+        }
+        for key_count in key_counts:
+            work_dir = os.path.join(args.work_dir, str(key_count)) if args.work_dir else tempfile.mkdtemp(prefix="stellaris-bench-")
+            try:
+                print("[+] Run benchmark of [%d] keys in [%s]" % (key_count, work_dir), file=sys.stderr)
+                report["results"][str(key_count)] = run_benchmark(work_dir, key_count, source_languages, target_languages,
+                                                                  args.file_count, args.repeat, args.jobs, queries)
+            finally:
+                if not args.work_dir:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+        work_dir = os.path.join(args.work_dir, "startup") if args.work_dir else tempfile.mkdtemp(prefix="stellaris-bench-")
+        try:
+            print("[+] Run startup benchmark in [%s]" % work_dir, file=sys.stderr)
+            report["results"]["startup"] = run_startup_benchmark(work_dir, args.repeat)
+        finally:
+            if not args.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as fd:
+                baseline = json.load(fd)
+            print("[+] Compare with commit [%s]" % baseline.get("commit"), file=sys.stderr)
+            for size, results in report["results"].items():
+                for name, result in sorted(results.items()):
+                    baseline_result = baseline.get("results", {}).get(size, {}).get(name)
+                    if baseline_result and baseline_result["mean"] > 0:
+                        print("    [%s] %s: %.3fms -> %.3fms (%+.1f%%)" % (
+                            size, name, baseline_result["mean"] * 1000, result["mean"] * 1000,
+                            (result["mean"] / baseline_result["mean"] - 1) * 100), file=sys.stderr)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as fd:
+                json.dump(report, fd, indent=2, sort_keys=True)
+        else:
+            print(json.dumps(report, indent=2, sort_keys=True))
+        return 0
+
+    sys.exit(main())
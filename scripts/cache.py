@@ -0,0 +1,138 @@
+# encoding=utf-8
+
+""" Cache
+    Author: lipixun
+    Created Time : 2024-03-22 21:05:37
+
+    File Name: cache.py
+    Description:
+
+        The cache file only stores the metadata of source files, which is kept in memory. Parsed values of a file are
+        stored in a file named by its content hash in the `<cache file>.values` directory, they're read when the file is
+        loaded and not kept in memory. Files with the same content (e.g. vanilla files copied by several mods) share one.
+
+"""
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import os
+import os.path
+import pickle
+import hashlib
+
+# The version of cache file format, cache files of other versions are ignored
+CacheVersion = 2
+
+# Defines a cached file
+CacheEntry = NamedTuple("CacheEntry", [
+    ("mtime", int),                         # In nanoseconds
+    ("size", int),
+    ("digest", bytes),
+    ("language", str),
+])
+
+
+class SourceCache(object):
+    """Persistent cache of parsed source localisation files
+    A file is considered unchanged if its mtime and size are not changed, or its content hash is not changed
+    """
+
+    def __init__(self, filepath: str) -> None:
+        """Create a new SourceCache
+        """
+        self._filepath = filepath
+        self._values_dirpath = "%s.values" % filepath
+        self._entries: Dict[str, CacheEntry] = {}
+        self._used_paths: Set[str] = set()
+        self._dirty = False
+        self._load()
+
+    def get(self, filepath: str) -> Tuple[str, List[Tuple[str, str]]] | None:
+        """Get parsed (language, values) of a file, returns None if not cached or the file has been changed
+        """
+        filepath = os.path.abspath(filepath)
+        entry = self._entries.get(filepath)
+        if entry is None:
+            return None
+        stat = os.stat(filepath)
+        if stat.st_size != entry.size:
+            return None
+        if stat.st_mtime_ns != entry.mtime:
+            # Touched but may not be changed
+            if get_file_digest(filepath) != entry.digest:
+                return None
+            entry = self._entries[filepath] = entry._replace(mtime=stat.st_mtime_ns)
+            self._dirty = True
+        values = self._read_values(entry.digest)
+        if values is None:
+            return None
+        self._used_paths.add(filepath)
+        return entry.language, values
+
+    def set(self, filepath: str, language: str, values: List[Tuple[str, str]]) -> None:
+        """Set parsed (language, values) of a file, values are written at once
+        """
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        digest = get_file_digest(filepath)
+        self._write_values(digest, values)
+        self._entries[filepath] = CacheEntry(stat.st_mtime_ns, stat.st_size, digest, language)
+        self._used_paths.add(filepath)
+        self._dirty = True
+
+    def save(self) -> None:
+        """Save cache file. Only files used by this process are preserved
+        """
+        if self._dirty or len(self._used_paths) != len(self._entries):
+            entries = {path: tuple(entry) for path, entry in self._entries.items() if path in self._used_paths}
+            temp_filepath = "%s.tmp" % self._filepath
+            with open(temp_filepath, "wb") as fd:
+                pickle.dump({"version": CacheVersion, "entries": entries}, fd, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filepath, self._filepath)
+            self._dirty = False
+        # Remove values of files which are not cached any more. Files not used yet are still in memory (files of
+        # another project may be loaded later), their values are removed by the next process if they aren't used
+        digests = {entry.digest.hex() for entry in self._entries.values()}
+        for name in os.listdir(self._values_dirpath) if os.path.isdir(self._values_dirpath) else []:
+            if name not in digests:
+                os.remove(os.path.join(self._values_dirpath, name))
+
+    def _read_values(self, digest: bytes) -> List[Tuple[str, str]] | None:
+        """Read values of a file by its content hash, returns None if not found or broken
+        """
+        try:
+            with open(os.path.join(self._values_dirpath, digest.hex()), "rb") as fd:
+                return pickle.load(fd)
+        except Exception:
+            return None
+
+    def _write_values(self, digest: bytes, values: List[Tuple[str, str]]) -> None:
+        """Write values of a file by its content hash, unless they have been written
+        """
+        filepath = os.path.join(self._values_dirpath, digest.hex())
+        if os.path.isfile(filepath):
+            return
+        os.makedirs(self._values_dirpath, exist_ok=True)
+        temp_filepath = "%s.tmp" % filepath
+        with open(temp_filepath, "wb") as fd:
+            pickle.dump(values, fd, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filepath, filepath)
+
+    def _load(self) -> None:
+        """Load cache file, ignore any errors
+        """
+        if not os.path.isfile(self._filepath):
+            return
+        try:
+            with open(self._filepath, "rb") as fd:
+                data = pickle.load(fd)
+            if data.get("version") == CacheVersion:
+                self._entries = {path: CacheEntry(*entry) for path, entry in data["entries"].items()}
+        except Exception as error:
+            print("[!] Ignore broken source cache file [%s]: %s" % (self._filepath, error))
+
+
+def get_file_digest(filepath: str) -> bytes:
+    """Get content hash of a file
+    """
+    with open(filepath, "rb") as fd:
+        return hashlib.blake2b(fd.read(), digest_size=16).digest()
@@ -0,0 +1,155 @@
+# encoding=utf-8
+
+""" Auto skip classifier
+    Author: lipixun
+    Created Time : 2024-04-08 21:36:18
+
+    File Name: classifier.py
+    Description:
+
+        Classify keys which don't need translation by a pipeline of rules. A key is classified by the
+        first matched rule. Keys are split into chunks which are classified in a process pool, and each
+        rule is applied to all remaining values of a chunk at once.
+
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+import re
+
+from time import perf_counter
+
+# (language, value) pairs of a key, the first one is the original value
+Values = List[Tuple[str, str]]
+
+AliasValueRegex = re.compile(r"^[ \t\n]*((§\S*)*\$[^\$]*\$§*[ \:\-\.\t\n\!\?\,]*)*[ \:\-\.\t\n\!\?\,]*$", re.UNICODE)
+FormattingValueRegex = re.compile(r"^([ \t\n\:\-\.\!\?\,]|§.|£[^£\s]*£)*$", re.UNICODE)
+NumericValueRegex = re.compile(r"^[ \t\n\+\-]*[0-9][0-9 \t\n\.\,\:\/\%\+\-]*$", re.UNICODE)
+
+
+def is_empty_value(values: Values) -> bool:
+    """The value is empty or whitespaces
+    """
+    return not values[0][1].strip()
+
+
+def is_alias_value(values: Values) -> bool:
+    """The value is just only references to other keys, like `$KEY$`
+    """
+    return AliasValueRegex.match(values[0][1]) is not None
+
+
+def is_formatting_value(values: Values) -> bool:
+    """The value is just only formatting codes (`§X`) and icons (`£icon£`)
+    """
+    return FormattingValueRegex.match(values[0][1]) is not None
+
+
+def is_numeric_value(values: Values) -> bool:
+    """The value is just only numbers
+    """
+    return NumericValueRegex.match(values[0][1]) is not None
+
+
+def is_identical_value(values: Values) -> bool:
+    """The value of another language is identical to the original value, usually a name which is not translated
+    """
+    return any(value == values[0][1] for language, value in values[1:] if language != values[0][0])
+
+
+# Rules in the order of classifying. Rules MUST be module level functions so they can be used in the process pool
+Rules: Dict[str, Callable[[Values], bool]] = {
+    "empty": is_empty_value,
+    "alias": is_alias_value,
+    "formatting": is_formatting_value,
+    "numeric": is_numeric_value,
+    "identical": is_identical_value,
+}
+# Rules used by default
+DefaultRuleNames = ["empty", "alias", "formatting", "numeric"]
+
+# Keys of a chunk
+ChunkSize = 4096
+
+RuleStats = NamedTuple("RuleStats", [
+    ("count", int),                 # The number of matched keys
+    ("elapsed", float),             # Seconds
+])
+
+ClassifyResult = NamedTuple("ClassifyResult", [
+    ("matches", Dict[str, str]),            # key to the matched rule name
+    ("stats", Dict[str, RuleStats]),        # rule name to stats, in the order of rules
+    ("elapsed", float),                     # Seconds of the whole classification
+])
+
+
+def classify(items: Iterable[Tuple[str, Values]], rule_names: List[str] | None = None, jobs: int = 1) -> ClassifyResult:
+    """Classify (key, values) items
+    Args:
+        rule_names: Names of rules to use, `DefaultRuleNames` if not specified. Rules are always applied in the order of `Rules`
+        jobs: The number of processes, 0 means the number of CPUs
+    """
+    start_time = perf_counter()
+    if rule_names is None:
+        rule_names = DefaultRuleNames
+    for name in rule_names:
+        if name not in Rules:
+            raise ValueError("Unknown rule [%s]" % name)
+    rule_names = [name for name in Rules if name in rule_names]
+    chunks = get_chunks(items, ChunkSize)
+    if jobs == 1 or len(chunks) < 2:
+        results = [classify_chunk(chunk, rule_names) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+            results = list(executor.map(classify_chunk, chunks, [rule_names] * len(chunks)))
+    # Merge
+    matches: Dict[str, str] = {}
+    counts = {name: 0 for name in rule_names}
+    elapsed = {name: 0.0 for name in rule_names}
+    for chunk_matches, chunk_elapsed in results:
+        for key, name in chunk_matches:
+            matches[key] = name
+            counts[name] += 1
+        for name, seconds in chunk_elapsed.items():
+            elapsed[name] += seconds
+    return ClassifyResult(
+        matches,
+        {name: RuleStats(counts[name], elapsed[name]) for name in rule_names},
+        perf_counter() - start_time,
+    )
+
+
+def classify_chunk(items: List[Tuple[str, Values]], rule_names: List[str]) -> Tuple[List[Tuple[str, str]], Dict[str, float]]:
+    """Classify a chunk of items
+    Returns:
+        ([(key, rule name)], rule name to elapsed seconds)
+    """
+    matches: List[Tuple[str, str]] = []
+    elapsed: Dict[str, float] = {}
+    for name in rule_names:
+        if not items:
+            break
+        rule = Rules[name]
+        start_time = perf_counter()
+        remaining_items = []
+        for item in items:
+            if rule(item[1]):
+                matches.append((item[0], name))
+            else:
+                remaining_items.append(item)
+        items = remaining_items
+        elapsed[name] = perf_counter() - start_time
+    return matches, elapsed
+
+
+def get_chunks(items: Iterable[Tuple[str, Values]], size: int) -> List[List[Tuple[str, Values]]]:
+    """Split items into chunks
+    """
+    chunks: List[List[Tuple[str, Values]]] = []
+    for item in items:
+        if not chunks or len(chunks[-1]) >= size:
+            chunks.append([])
+        chunks[-1].append(item)
+    return chunks
+
@@ -0,0 +1,156 @@
+# encoding=utf-8
+
+""" Daemon
+    Author: lipixun
+    Created Time : 2024-04-20 15:06:37
+
+    File Name: daemon.py
+    Description:
+
+        A local server which runs commands in a warm process, and its client. It listens on a unix socket (a named pipe
+        on windows), requests and responses are json objects. Clients are authenticated by a random key stored in a
+        directory which is only accessible by the user (as is the default socket), so other users can't run commands
+        in the daemon.
+
+"""
+from typing import Any, Callable, Dict
+
+import os
+import os.path
+import sys
+import hashlib
+import stat
+import tempfile
+
+from utils import json
+
+
+def get_runtime_dirpath() -> str:
+    """Get the directory of daemon files of current user, which is only accessible by the user.
+    It's in $XDG_RUNTIME_DIR if set, otherwise a directory named by the user id in the temporary directory
+    """
+    if sys.platform == "win32":
+        # The temporary directory is per user
+        return os.path.join(tempfile.gettempdir(), "stellaris-translation")
+    runtime_dirpath = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dirpath and os.path.isdir(runtime_dirpath):
+        return os.path.join(runtime_dirpath, "stellaris-translation")
+    return os.path.join(tempfile.gettempdir(), "stellaris-translation-%d" % os.getuid())
+
+
+def get_default_address() -> str:
+    """Get the default address of the daemon of current user
+    """
+    if sys.platform == "win32":
+        return r"\\.\pipe\stellaris-translation-%s" % os.environ.get("USERNAME", "default")
+    return os.path.join(get_runtime_dirpath(), "daemon.sock")
+
+
+def get_key_filepath(address: str) -> str:
+    """Get the file path of the authentication key of a daemon address
+    """
+    return os.path.join(get_runtime_dirpath(), "%s.key" % hashlib.sha1(address.encode("utf-8")).hexdigest()[:12])
+
+
+def check_runtime_dir(create: bool = False) -> None:
+    """Check the runtime directory is a directory (not a link) owned by current user and not accessible by others,
+    so files in it can't be created or replaced by other users
+    Args:
+        create: Create the directory if not exists
+    """
+    dirpath = get_runtime_dirpath()
+    if create:
+        try:
+            os.mkdir(dirpath, 0o700)
+        except FileExistsError:
+            pass
+    if sys.platform == "win32":
+        return
+    info = os.lstat(dirpath)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise ValueError("Directory [%s] must be owned by current user and not accessible by others" % dirpath)
+
+
+def serve_daemon(address: str, handler: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+    """Serve requests one by one until interrupted
+    Args:
+        handler: Called with each request, returns the response
+    """
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Listener
+
+    check_runtime_dir(create=True)
+    if sys.platform != "win32" and os.path.exists(address):
+        conn = connect_daemon(address)
+        if conn is not None:
+            conn.close()
+            raise ValueError("Daemon [%s] is already running" % address)
+        # Left by a daemon which was killed
+        os.remove(address)
+    authkey = os.urandom(32)
+    key_filepath = get_key_filepath(address)
+    try:
+        # Never reuse or follow an existing file
+        fd = os.open(key_filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    except FileExistsError:
+        raise ValueError("Key file [%s] already exists, another daemon may be starting or was killed. Remove it if not" % key_filepath)
+    try:
+        with os.fdopen(fd, "wb") as key_fd:
+            key_fd.write(authkey)
+        # The socket is created only accessible by the user, even if it's not in the runtime directory
+        umask = os.umask(0o177) if sys.platform != "win32" else None
+        try:
+            listener = Listener(address, authkey=authkey)
+        finally:
+            if umask is not None:
+                os.umask(umask)
+        with listener:
+            print("[+] Daemon is listening on [%s]" % address, flush=True)
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError, EOFError) as error:
+                    # Failed authentication or handshake
+                    print("[!] Failed to accept a client: %s" % error, flush=True)
+                    continue
+                with conn:
+                    try:
+                        request = json.loads(conn.recv_bytes().decode("utf-8"))
+                        conn.send_bytes(json.dumps(handler(request)).encode("utf-8"))
+                    except EOFError:
+                        # Closed by the client without a request, e.g. probed by another daemon
+                        pass
+                    except OSError as error:
+                        print("[!] Lost the client: %s" % error, flush=True)
+    finally:
+        os.remove(key_filepath)
+
+
+def connect_daemon(address: str):
+    """Connect to the daemon, returns None if it's not running
+    """
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+
+    try:
+        # Don't send requests to a daemon started by another user
+        check_runtime_dir()
+        with open(get_key_filepath(address), "rb") as fd:
+            authkey = fd.read()
+    except (OSError, ValueError):
+        return None
+    try:
+        return Client(address, authkey=authkey)
+    except (AuthenticationError, OSError):
+        return None
+
+
+def call_daemon(address: str, request: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Send a request to the daemon and wait for the response, returns None if the daemon is not running
+    """
+    conn = connect_daemon(address)
+    if conn is None:
+        return None
+    with conn:
+        conn.send_bytes(json.dumps(request).encode("utf-8"))
+        return json.loads(conn.recv_bytes().decode("utf-8"))
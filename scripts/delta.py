@@ -0,0 +1,104 @@
+# encoding=utf-8
+
+""" Source delta
+    Author: lipixun
+    Created Time : 2024-04-16 20:31:52
+
+    File Name: delta.py
+    Description:
+
+        Word level diff between the original value a translation was made for and the current source value of a
+        changed key, so only the changed words need review. A change is trivial if only whitespaces or punctuations
+        (except line breaks and formatting codes) changed, its translation can be accepted without review.
+
+"""
+from typing import List, NamedTuple, Tuple
+
+import re
+import threading
+import unicodedata
+
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+# Segment ops
+DeltaEqual = "equal"
+DeltaInsert = "insert"
+DeltaDelete = "delete"
+
+# Words, whitespaces and other chars (each one is a word), which cover the whole value
+WordRegex = re.compile(r"\s+|\w+|[^\w\s]", re.UNICODE)
+# Whitespaces and punctuations which are meaningful in game: line breaks, formatting codes and escapes
+SignificantChars = {"\n", "§", "\\"}
+
+# The max number of cached deltas
+MaxCachedDeltas = 200000
+
+Delta = NamedTuple("Delta", [
+    ("segments", List[Tuple[str, str]]),        # (op, text), the old value is the equal and deleted texts
+    ("trivial", bool),                          # Only whitespaces or punctuations changed
+])
+
+
+def get_delta(old_value: str, new_value: str) -> Delta:
+    """Get the word level delta from the old value to the new value
+    """
+    old_words = WordRegex.findall(old_value)
+    new_words = WordRegex.findall(new_value)
+    segments: List[Tuple[str, str]] = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_words, new_words, autojunk=False).get_opcodes():
+        if tag == "equal":
+            segments.append((DeltaEqual, "".join(old_words[i1:i2])))
+            continue
+        if i2 > i1:
+            segments.append((DeltaDelete, "".join(old_words[i1:i2])))
+        if j2 > j1:
+            segments.append((DeltaInsert, "".join(new_words[j1:j2])))
+    return Delta(segments, strip_trivial_chars(old_value) == strip_trivial_chars(new_value))
+
+
+def strip_trivial_chars(value: str) -> str:
+    """Remove whitespaces and punctuations of a value
+    """
+    return "".join(char for char in value if not is_trivial_char(char))
+
+
+@lru_cache(maxsize=4096)
+def is_trivial_char(char: str) -> bool:
+    """Check if a char is a whitespace or a punctuation
+    """
+    if char in SignificantChars:
+        return False
+    return char.isspace() or unicodedata.category(char).startswith("P")
+
+
+class DeltaCache(object):
+    """Cache of deltas by (old value, new value), shared by languages since they usually have the same changes
+    """
+
+    def __init__(self, max_size: int = MaxCachedDeltas) -> None:
+        """Create a new DeltaCache
+        """
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._deltas: OrderedDict[Tuple[str, str], Delta] = OrderedDict()      # Least recently used first
+
+    def __len__(self) -> int:
+        return len(self._deltas)
+
+    def get(self, old_value: str, new_value: str) -> Delta:
+        """Get the delta, compute it if not cached
+        """
+        cache_key = (old_value, new_value)
+        with self._lock:
+            delta = self._deltas.get(cache_key)
+            if delta is not None:
+                self._deltas.move_to_end(cache_key)
+                return delta
+        delta = get_delta(old_value, new_value)
+        with self._lock:
+            self._deltas[cache_key] = delta
+            while len(self._deltas) > self._max_size:
+                self._deltas.popitem(last=False)
+        return delta
@@ -0,0 +1,105 @@
+# encoding=utf-8
+
+""" Emitter
+    Author: lipixun
+    Created Time : 2024-03-30 16:48:52
+
+    File Name: emitter.py
+    Description:
+
+        Write stellaris localisation files line by line. The output is byte-for-byte identical to
+        dumping {"l_<language>": {key: DoubleQuotedScalarString(value)}} by the yaml instance in utils.
+
+"""
+from typing import Iterable, TextIO, Tuple
+
+import re
+
+# Keys which can be written as plain scalars without quotes, others are written by ruamel
+PlainKeyRegex = re.compile(r"[A-Za-z][A-Za-z0-9_.\-]*")
+# Plain keys which will be resolved to non-string values by yaml, so they must be quoted
+ReservedKeys = {"null", "Null", "NULL", "true", "True", "TRUE", "false", "False", "FALSE"}
+# Keys of this length or longer are written as complex keys ("? key")
+MaxSimpleKeyLength = 123
+
+# Chars which must be escaped in double quoted scalars (the same as ruamel with allow_unicode)
+EscapeCharRegex = re.compile("[\"\\\\\x00-\x1f\x7f-\x9f\u2028\u2029\ufeff\ud800-\udfff\ufffe\uffff]")
+EscapeReplacements = {
+    "\x00": "0",
+    "\x07": "a",
+    "\x08": "b",
+    "\t": "t",
+    "\n": "n",
+    "\x0b": "v",
+    "\x0c": "f",
+    "\r": "r",
+    "\x1b": "e",
+    "\"": "\"",
+    "\\": "\\",
+    "\x85": "N",
+    "\u2028": "L",
+    "\u2029": "P",
+}
+
+
+def write_localization_file(fd: TextIO, language: str, values: Iterable[Tuple[str, str]]) -> None:
+    """Write a localisation file
+    Args:
+        fd: The file opened in text mode (with utf-8-sig encoding)
+        values: (key, value) pairs in the order to write
+    """
+    header = "l_%s:" % language
+    empty = True
+    for key, value in values:
+        if empty:
+            fd.write(header)
+            fd.write("\n")
+            empty = False
+        fd.write(format_entry(key, value))
+    if empty:
+        fd.write(header)
+        fd.write(" {}\n")
+
+
+def dump_localization_file(fd: TextIO, language: str, values: Iterable[Tuple[str, str]]) -> None:
+    """Write a localisation file by ruamel, the reference implementation of `write_localization_file`
+    """
+    from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+    from utils import get_yaml
+
+    get_yaml().dump({"l_%s" % language: {key: DoubleQuotedScalarString(value) for key, value in values}}, fd)
+
+
+def escape_value(value: str) -> str:
+    """Escape a value for a double quoted scalar
+    """
+    if EscapeCharRegex.search(value) is None:
+        return value
+    return EscapeCharRegex.sub(_escape_char, value)
+
+
+def format_entry(key: str, value: str) -> str:
+    """Format a line of key and value
+    """
+    if len(key) < MaxSimpleKeyLength and key not in ReservedKeys and PlainKeyRegex.fullmatch(key):
+        return " %s: \"%s\"\n" % (key, escape_value(value))
+    # Rare, let ruamel decide the style of key. Strip the header line
+    from io import StringIO
+    from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+    from utils import get_yaml
+
+    stream = StringIO()
+    get_yaml().dump({"l": {key: DoubleQuotedScalarString(value)}}, stream)
+    return stream.getvalue()[len("l:\n"):]
+
+
+def _escape_char(match: re.Match) -> str:
+    """Escape a char
+    """
+    char = match.group(0)
+    replacement = EscapeReplacements.get(char)
+    if replacement is not None:
+        return "\\" + replacement
+    if char <= "\xff":
+        return "\\x%02X" % ord(char)
+    return "\\u%04X" % ord(char)
@@ -0,0 +1,156 @@
+# encoding=utf-8
+
+""" Http cache
+    Author: lipixun
+    Created Time : 2024-04-14 10:42:06
+
+    File Name: httpcache.py
+    Description:
+
+        Helpers of response compression (gzip, or brotli if installed), ETags and versioned static files.
+
+"""
+from typing import Dict, Tuple
+
+import gzip
+import hashlib
+import os
+import os.path
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Don't compress bodies smaller than this size
+CompressMinSize = 1024
+GzipLevel = 6
+BrotliQuality = 5
+# Extensions of static files which are compressed
+CompressibleExtensions = {".css", ".html", ".js", ".json", ".svg", ".txt"}
+
+
+def get_accepted_encoding(accept_encoding: str | None) -> str | None:
+    """Get the content encoding to use from the Accept-Encoding header, brotli is preferred if installed
+    """
+    if not accept_encoding:
+        return None
+    encodings = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and not float_or_zero(params[2:]):
+            continue
+        encodings.add(name.strip().lower())
+    if brotli is not None and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress body by a content encoding returned by `get_accepted_encoding`
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BrotliQuality)
+    if encoding == "gzip":
+        return gzip.compress(body, GzipLevel, mtime=0)
+    raise ValueError("Unsupported content encoding [%s]" % encoding)
+
+
+def get_etag(*parts) -> str:
+    """Get a weak ETag of parts (versions) which identify the content. It's weak since the compressed and uncompressed bodies share it
+    """
+    return 'W/"%s"' % "-".join(str(part) for part in parts)
+
+
+def match_etag(if_none_match: str | None, etag: str) -> bool:
+    """Check if the If-None-Match header matches the ETag, by weak comparison
+    """
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*" or value.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def float_or_zero(value: str) -> float:
+    """Parse a float, 0 if invalid
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+class StaticFiles(object):
+    """Versions and compressed bodies of static files, which are cached until files are changed
+    """
+
+    def __init__(self, root: str) -> None:
+        """Create a new StaticFiles
+        """
+        self._root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._versions: Dict[str, Tuple[Tuple, str]] = {}               # path to (file fingerprint, version)
+        self._bodies: Dict[Tuple[str, str], Tuple[Tuple, bytes]] = {}   # (path, encoding) to (file fingerprint, compressed body)
+
+    def get_url(self, path: str) -> str:
+        """Get the versioned url of a static file, which can be cached forever
+        """
+        return "/%s?v=%s" % (path, self.get_version(path))
+
+    def get_version(self, path: str) -> str:
+        """Get the version (hash of the content) of a static file
+        """
+        filepath = self._get_filepath(path)
+        fingerprint = get_file_fingerprint(filepath)
+        with self._lock:
+            value = self._versions.get(path)
+            if value is not None and value[0] == fingerprint:
+                return value[1]
+        with open(filepath, "rb") as fd:
+            version = hashlib.sha1(fd.read()).hexdigest()[:12]
+        with self._lock:
+            self._versions[path] = (fingerprint, version)
+        return version
+
+    def get_compressed(self, path: str, encoding: str) -> bytes | None:
+        """Get the compressed body of a static file, None if the file shouldn't be compressed
+        """
+        filepath = self._get_filepath(path)
+        if os.path.splitext(filepath)[1].lower() not in CompressibleExtensions:
+            return None
+        fingerprint = get_file_fingerprint(filepath)
+        with self._lock:
+            value = self._bodies.get((path, encoding))
+            if value is not None and value[0] == fingerprint:
+                return value[1]
+        with open(filepath, "rb") as fd:
+            body = fd.read()
+        if len(body) < CompressMinSize:
+            return None
+        body = compress(body, encoding)
+        with self._lock:
+            self._bodies[(path, encoding)] = (fingerprint, body)
+        return body
+
+    def _get_filepath(self, path: str) -> str:
+        """Get the file path of a static file, which MUST be under the root
+        """
+        filepath = os.path.abspath(os.path.join(self._root, path.strip("/\\")))
+        if not filepath.startswith(self._root + os.sep) or not os.path.isfile(filepath):
+            raise FileNotFoundError("Static file [%s] not found" % path)
+        return filepath
+
+
+def get_file_fingerprint(filepath: str) -> Tuple[int, int]:
+    """Get (mtime, size) of a file
+    """
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
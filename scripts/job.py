@@ -0,0 +1,183 @@
+# encoding=utf-8
+
+""" Job
+    Author: lipixun
+    Created Time : 2024-04-12 22:20:09
+
+    File Name: job.py
+    Description:
+
+        Run long jobs (save, build) in a background worker thread, so requests are not blocked by them.
+        Jobs run one by one in the order of submission, and report their progress. A job which is still
+        pending can be shared by repeated submissions (e.g. saving twice), since it will see the latest data.
+
+"""
+from typing import Any, Callable, Dict, List, Tuple
+
+import threading
+
+from collections import OrderedDict
+from queue import Queue
+from time import time
+
+# Job states
+JobStatePending = "pending"
+JobStateRunning = "running"
+JobStateSucceeded = "succeeded"
+JobStateFailed = "failed"
+JobStates = [JobStatePending, JobStateRunning, JobStateSucceeded, JobStateFailed]
+
+# The number of finished jobs to keep
+MaxFinishedJobs = 100
+
+
+class Job(object):
+    """A background job
+    """
+
+    def __init__(self, job_id: int, name: str, project: str | None, func: Callable[["Job"], Any]) -> None:
+        """Create a new Job
+        Args:
+            func: Called with the job in the worker thread, returns the result
+        """
+        self.id = job_id
+        self.name = name
+        self.project = project
+        self.state = JobStatePending
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: str | None = None
+        self.create_time = time()
+        self.start_time: float | None = None
+        self.end_time: float | None = None
+        self._func = func
+        self._done_event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        """Check if the job has finished (either succeeded or failed)
+        """
+        return self._done_event.is_set()
+
+    def set_progress(self, progress: float) -> None:
+        """Set the progress (0 to 1), called by the job function
+        """
+        self.progress = min(max(progress, 0.0), 1.0)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for the job to finish, returns False if timed out
+        """
+        return self._done_event.wait(timeout)
+
+    def run(self) -> None:
+        """Run the job
+        """
+        self.state = JobStateRunning
+        self.start_time = time()
+        try:
+            self.result = self._func(self)
+            self.progress = 1.0
+            self.state = JobStateSucceeded
+        except Exception as error:
+            print("[!] Job [%s] #%d of project [%s] failed: %s" % (self.name, self.id, self.project, error))
+            self.error = str(error)
+            self.state = JobStateFailed
+        finally:
+            self.end_time = time()
+            self._done_event.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the json object of the job
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "project": self.project,
+            "state": self.state,
+            "progress": round(self.progress, 4),
+            "result": self.result,
+            "error": self.error,
+            "create_time": self.create_time,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+        }
+
+
+class JobWorker(object):
+    """Run jobs one by one in a background thread
+    """
+
+    def __init__(self) -> None:
+        """Create a new JobWorker
+        """
+        self._lock = threading.Lock()
+        self._queue: Queue = Queue()
+        self._jobs: OrderedDict[int, Job] = OrderedDict()     # job id to job, in the order of submission
+        self._next_job_id = 1
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the worker thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker thread after pending jobs have finished
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, name: str, project: str | None, func: Callable[[Job], Any],
+               coalesce_names: List[str] | None = None) -> Tuple[Job, bool]:
+        """Submit a job
+        Args:
+            coalesce_names: Return the pending job of the project with one of these names instead if exists,
+                which hasn't started yet so it will see all changes made before this submission
+        Returns:
+            (job, whether the job is submitted rather than coalesced)
+        """
+        with self._lock:
+            # Find and submit atomically, otherwise concurrent submissions may not be coalesced
+            if coalesce_names:
+                for job in self._jobs.values():
+                    if job.state == JobStatePending and job.project == project and job.name in coalesce_names:
+                        return job, False
+            job = Job(self._next_job_id, name, project, func)
+            self._next_job_id += 1
+            self._jobs[job.id] = job
+            self._remove_finished_jobs()
+            # Queued with the lock held, so jobs run in the order of ids
+            self._queue.put(job)
+        return job, True
+
+    def get(self, job_id: int) -> Job | None:
+        """Get a job
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, project: str | None = None) -> List[Job]:
+        """Get all jobs (of a project if specified) in the order of submission
+        """
+        with self._lock:
+            return [job for job in self._jobs.values() if project is None or job.project == project]
+
+    def _remove_finished_jobs(self) -> None:
+        """Only keep the latest finished jobs
+        """
+        finished_job_ids = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished_job_ids[:max(0, len(finished_job_ids) - MaxFinishedJobs)]:
+            del self._jobs[job_id]
+
+    def _run(self) -> None:
+        """Run jobs
+        """
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            job.run()
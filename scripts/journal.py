@@ -0,0 +1,159 @@
+# encoding=utf-8
+
+""" Journal
+    Author: lipixun
+    Created Time : 2024-03-27 22:16:03
+
+    File Name: journal.py
+    Description:
+
+"""
+from typing import Any, Dict, Iterator, List
+
+import os
+import os.path
+
+from time import time
+
+from utils import json
+
+
+class Journal(object):
+    """Append-only journal of translation changes
+    Records are flushed on every append and fsynced in batches.
+    When compacting, the journal is rotated to a `.compacting` file which is removed once the snapshot has been written.
+    """
+
+    def __init__(self, filepath: str, sync_batch_size: int = 64, sync_interval: float = 1.0) -> None:
+        """Create a new Journal
+        """
+        self._filepath = filepath
+        self._sync_batch_size = sync_batch_size
+        self._sync_interval = sync_interval
+        self._size = count_records(filepath)
+        self._pending_size = 0
+        self._last_sync_time = time()
+        self._fd = open(filepath, "a", encoding="utf-8")
+
+    @property
+    def size(self) -> int:
+        """Get the number of records in the journal
+        """
+        return self._size
+
+    @property
+    def rotated_filepath(self) -> str:
+        """Get the file path of rotated journal
+        """
+        return get_rotated_filepath(self._filepath)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append a record
+        """
+        self._fd.write(json.dumps(record, sort_keys=True, ensure_ascii=False))
+        self._fd.write("\n")
+        self._fd.flush()
+        self._size += 1
+        self._pending_size += 1
+        if self._pending_size >= self._sync_batch_size or time() - self._last_sync_time >= self._sync_interval:
+            self.sync()
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """Append records as a batch record, which is either replayed entirely or ignored if broken
+        """
+        if len(records) == 1:
+            self.append(records[0])
+        elif records:
+            self.append({"b": records})
+
+    def sync(self) -> None:
+        """Fsync pending records
+        """
+        if self._pending_size:
+            os.fsync(self._fd.fileno())
+            self._pending_size = 0
+        self._last_sync_time = time()
+
+    def rotate(self) -> None:
+        """Move current records to the rotated journal and start a new one
+        """
+        self.sync()
+        self._fd.close()
+        if os.path.isfile(self.rotated_filepath):
+            # A previous compaction has not finished, keep its records
+            with open(self.rotated_filepath, "a", encoding="utf-8") as fd, open(self._filepath, "r", encoding="utf-8") as journal_fd:
+                for line in journal_fd:
+                    fd.write(line)
+                fd.flush()
+                os.fsync(fd.fileno())
+            os.remove(self._filepath)
+        else:
+            os.replace(self._filepath, self.rotated_filepath)
+        self._fd = open(self._filepath, "a", encoding="utf-8")
+        self._size = 0
+
+    def remove_rotated(self) -> None:
+        """Remove the rotated journal, all of its records have been written to the snapshot
+        """
+        if os.path.isfile(self.rotated_filepath):
+            os.remove(self.rotated_filepath)
+
+    def close(self) -> None:
+        """Sync and close
+        """
+        if not self._fd.closed:
+            self.sync()
+            self._fd.close()
+
+
+def get_journal_filepath(data_filepath: str) -> str:
+    """Get the journal file path of a data file
+    """
+    return "%s.journal" % data_filepath
+
+
+def get_rotated_filepath(journal_filepath: str) -> str:
+    """Get the rotated file path of a journal
+    """
+    return "%s.compacting" % journal_filepath
+
+
+def remove_journal_files(journal_filepath: str) -> None:
+    """Remove a journal and its rotated one
+    """
+    for filepath in (journal_filepath, get_rotated_filepath(journal_filepath)):
+        if os.path.isfile(filepath):
+            os.remove(filepath)
+
+
+def count_records(filepath: str) -> int:
+    """Count records in a journal file
+    """
+    if not os.path.isfile(filepath):
+        return 0
+    with open(filepath, "r", encoding="utf-8") as fd:
+        return sum(1 for line in fd if line.strip())
+
+
+def read_records(journal_filepath: str) -> Iterator[Dict[str, Any]]:
+    """Read records of a journal (including the rotated one) in order
+    """
+    for filepath in (get_rotated_filepath(journal_filepath), journal_filepath):
+        if not os.path.isfile(filepath):
+            continue
+        with open(filepath, "r", encoding="utf-8") as fd:
+            for line in fd:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last record may be partially written when crashed
+                    print("[!] Ignore broken journal record in [%s]" % filepath)
+                    continue
+                if record and "b" in record:
+                    # Batch
+                    yield from record["b"]
+                elif record:
+                    yield record
@@ -8,10 +8,21 @@
     Description:
 
 """
-from typing import Dict, List, NamedTuple
+from typing import Dict, Iterator, List, NamedTuple, Set, TextIO, Tuple
 
+import os
 import os.path
+import re
+import sys
+import threading
+import weakref
 
+from array import array
+from bisect import bisect_left, bisect_right
+
+from cache import SourceCache, get_file_digest
+from metrics import gMetrics
+from search import SearchIndex
 from utils import LanguageNames
 
 # Defines a localized value with its language
@@ -23,93 +34,473 @@ LocalizationItem = NamedTuple("LocalizationItem", [("key", str), ("values", List
 FileNameSuffix = ["_l_%s.yml" % lang for lang in LanguageNames]
 # Stellaris: Header line format
 FileHeaderMapping = {"l_%s" % lang: lang for lang in LanguageNames}
+# Language to its index in LanguageNames
+LanguageIds = {lang: index for index, lang in enumerate(LanguageNames)}
+# The size of chunks to read localisation files
+ReadChunkSize = 1 << 20
+# Escaped chars in values, other backslashes are kept as is
+UnescapeRegex = re.compile(r"\\([n\"\\])")
+UnescapeReplacements = {"n": "\n", "\"": "\"", "\\": "\\"}
+
+# Content hash to values of files read by any manager, while any manager uses them
+gFileValues: "weakref.WeakValueDictionary[bytes, FileValues]" = weakref.WeakValueDictionary()
+gFileValuesLock = threading.Lock()
+
+
+class FileValues(object):
+    """Parsed values of a source file, values are stored as utf-8 in a single heap.
+    Managers which read files of the same content share one, see `get_shared_file_values`
+    """
+
+    __slots__ = ("__weakref__", "language", "keys", "heap", "offsets", "sizes")
+
+    def __init__(self, language: str, values: List[Tuple[str, str]]) -> None:
+        """Create a new FileValues
+        """
+        self.language = language
+        self.keys = [sys.intern(key) for key, _ in values]
+        self.offsets = array("Q")
+        self.sizes = array("I")
+        heap = bytearray()
+        for _, value in values:
+            data = value.encode("utf-8", "surrogatepass")
+            self.offsets.append(len(heap))
+            self.sizes.append(len(data))
+            heap.extend(data)
+        self.heap = bytes(heap)
+
+
+class LocalizationStore(object):
+    """Compact store of localized values
+    Keys are interned, languages are stored as small ints and values are stored as utf-8 in heaps, which are either
+    the store's own heap or heaps of shared file values. Values of a key are linked in order, so the per value overhead
+    is only a few array slots instead of python objects.
+    """
+
+    __slots__ = (
+        "_key_ids", "_first_value_ids", "_last_value_ids", "_next_value_ids",
+        "_value_offsets", "_value_sizes", "_value_languages", "_value_heap_ids", "_heaps", "_heap_ids", "_file_values",
+    )
+
+    def __init__(self) -> None:
+        """Create a new LocalizationStore
+        """
+        self._key_ids: Dict[str, int] = {}          # key to key id
+        self._first_value_ids = array("i")          # key id to the first value id
+        self._last_value_ids = array("i")           # key id to the last value id
+        self._next_value_ids = array("i")           # value id to the next value id of the same key, -1 means the end
+        self._value_offsets = array("Q")            # value id to the offset in heap
+        self._value_sizes = array("I")              # value id to the size in heap
+        self._value_languages = array("B")          # value id to the language id
+        self._value_heap_ids = array("I")           # value id to the heap id
+        self._heaps: List[bytes | bytearray] = [bytearray()]   # heap id to heap, the first one is owned by the store
+        self._heap_ids: Dict[int, int] = {}                     # id of file values to its heap id
+        self._file_values: List[FileValues] = []                # Referenced file values, so their ids are not reused
+
+    def __len__(self) -> int:
+        return len(self._key_ids)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_ids
+
+    def keys(self) -> Iterator[str]:
+        """Get all keys
+        """
+        return iter(self._key_ids.keys())
+
+    def get_values(self, key: str) -> List[Tuple[str, str]] | None:
+        """Get (language, value) pairs of a key
+        """
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            return None
+        return [(LanguageNames[self._value_languages[value_id]], self._get_value(value_id)) for value_id in self._iter_value_ids(key_id)]
+
+    def get_value(self, key: str, language: str | None = None) -> str | None:
+        """Get the value of a language, or the first value if the language is not specified or not found
+        """
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            return None
+        first_value_id = self._first_value_ids[key_id]
+        if language is not None:
+            language_id = LanguageIds.get(language)
+            for value_id in self._iter_value_ids(key_id):
+                if self._value_languages[value_id] == language_id:
+                    return self._get_value(value_id)
+        return self._get_value(first_value_id)
+
+    def add_file_values(self, file_values: FileValues) -> int:
+        """Reference the heap of file values, returns its heap id
+        """
+        heap_id = self._heap_ids.get(id(file_values))
+        if heap_id is None:
+            heap_id = self._heap_ids[id(file_values)] = len(self._heaps)
+            self._heaps.append(file_values.heap)
+            self._file_values.append(file_values)
+        return heap_id
+
+    def insert(self, key: str, language: str, value: str, index: int | None = None) -> None:
+        """Insert a value of a key at index, append it if index is not specified
+        """
+        data = value.encode("utf-8", "surrogatepass")
+        heap = self._heaps[0]
+        offset = len(heap)
+        heap.extend(data)  # type: ignore
+        self.insert_ref(key, LanguageIds[language], 0, offset, len(data), index)
+
+    def insert_ref(self, key: str, language_id: int, heap_id: int, offset: int, size: int, index: int | None = None) -> None:
+        """Insert a value in a heap (see `add_file_values`) of a key at index, append it if index is not specified
+        """
+        # Add value
+        value_id = len(self._value_offsets)
+        self._value_offsets.append(offset)
+        self._value_sizes.append(size)
+        self._value_languages.append(language_id)
+        self._value_heap_ids.append(heap_id)
+        self._next_value_ids.append(-1)
+        # Link it
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            self._key_ids[sys.intern(key)] = len(self._first_value_ids)
+            self._first_value_ids.append(value_id)
+            self._last_value_ids.append(value_id)
+        elif index is None:
+            self._next_value_ids[self._last_value_ids[key_id]] = value_id
+            self._last_value_ids[key_id] = value_id
+        elif index == 0:
+            self._next_value_ids[value_id] = self._first_value_ids[key_id]
+            self._first_value_ids[key_id] = value_id
+        else:
+            previous_value_id = self._first_value_ids[key_id]
+            for _ in range(index - 1):
+                previous_value_id = self._next_value_ids[previous_value_id]
+            self._next_value_ids[value_id] = self._next_value_ids[previous_value_id]
+            self._next_value_ids[previous_value_id] = value_id
+            if self._next_value_ids[value_id] == -1:
+                self._last_value_ids[key_id] = value_id
+
+    def remove(self, key: str, index: int) -> None:
+        """Remove the value of a key at index, the key is removed when it has no values.
+        The space of removed values in heaps is not reclaimed.
+        """
+        key_id = self._key_ids[key]
+        previous_value_id = -1
+        value_id = self._first_value_ids[key_id]
+        for _ in range(index):
+            previous_value_id, value_id = value_id, self._next_value_ids[value_id]
+        next_value_id = self._next_value_ids[value_id]
+        if previous_value_id == -1:
+            if next_value_id == -1:
+                del self._key_ids[key]
+                return
+            self._first_value_ids[key_id] = next_value_id
+        else:
+            self._next_value_ids[previous_value_id] = next_value_id
+        if next_value_id == -1:
+            self._last_value_ids[key_id] = previous_value_id
+
+    def get_language_values(self, language: str) -> Dict[str, str]:
+        """Get values of a language of all keys, the first value of a key is used if the language is not found
+        """
+        language_id = LanguageIds.get(language)
+        first_value_ids, next_value_ids, value_languages = self._first_value_ids, self._next_value_ids, self._value_languages
+        values = {}
+        for key, key_id in self._key_ids.items():
+            value_id = first_value_id = first_value_ids[key_id]
+            while value_id != -1 and value_languages[value_id] != language_id:
+                value_id = next_value_ids[value_id]
+            values[key] = self._get_value(value_id if value_id != -1 else first_value_id)
+        return values
+
+    def _iter_value_ids(self, key_id: int) -> Iterator[int]:
+        """Iterate value ids of a key
+        """
+        value_id = self._first_value_ids[key_id]
+        while value_id != -1:
+            yield value_id
+            value_id = self._next_value_ids[value_id]
+
+    def _get_value(self, value_id: int) -> str:
+        """Get a value
+        """
+        offset = self._value_offsets[value_id]
+        heap = self._heaps[self._value_heap_ids[value_id]]
+        return heap[offset:offset+self._value_sizes[value_id]].decode("utf-8", "surrogatepass")
 
 
 class LocalizationManager(object):
     """Localization manager
     """
 
-    def __init__(self, enabled_languages: List[str] | None = None) -> None:
+    def __init__(self, enabled_languages: List[str] | None = None, cache: SourceCache | None = None, track_files: bool = False) -> None:
         """Create a new LocalizationManager
+        Args:
+            cache: The parsed source cache, files will be parsed every time if not specified
+            track_files: Track the file of each value, which is required by `reload_files`
         """
         self._enabled_languages = enabled_languages
-        self._items: Dict[str, LocalizationItem] = {}
+        self._cache = cache
+        self._track_files = track_files
+        self._store = LocalizationStore()
+        self._file_ids: Dict[str, int] = {}                 # file path to file id, ids are assigned in reading order
+        self._next_file_id = 0
+        self._file_keys: Dict[int, List[str]] = {}          # file id to keys
+        self._value_file_ids: Dict[str, List[int]] = {}     # key to file id of each value
         self._sorted_keys: List[str] | None = None
+        self._key_index: SearchIndex | None = None
+        self._value_index: SearchIndex | None = None
+        self._language_values: Dict[str, Dict[str, str]] = {}      # language to values of all keys, see `get_language_values`
 
     @property
     def sorted_keys(self) -> List[str]:
         """Get sorted keys
         """
         if self._sorted_keys is None:
-            self._sorted_keys = sorted(self._items.keys())
+            self._sorted_keys = sorted(self._store.keys())
         return self._sorted_keys
 
     def get(self, key, default=None):
         """Get item
         """
-        return self._items.get(key, default)
+        values = self._store.get_values(key)
+        if values is None:
+            return default
+        return LocalizationItem(key, [LocalizationValue(language, value) for language, value in values])
 
-    def load(self, file_or_dir_path: str):
+    def get_values(self, key: str) -> List[Tuple[str, str]] | None:
+        """Get (language, value) pairs of a key, faster than `get` since no items are created
+        """
+        return self._store.get_values(key)
+
+    def get_value(self, key: str, language: str | None = None) -> str | None:
+        """Get the value of a language, or the first value if the language is not specified or not found.
+        Faster than `get` since other values are not decoded.
+        """
+        return self._store.get_value(key, language)
+
+    def get_language_values(self, language: str) -> Dict[str, str]:
+        """Get values of a language of all keys (the first value if the language is not found), which is cached until the source is changed.
+        Faster than `get_value` of each key when getting values of most keys. DO NOT modify the returned dict
+        """
+        values = self._language_values.get(language)
+        if values is None:
+            values = self._language_values[language] = self._store.get_language_values(language)
+        return values
+
+    def search_keys(self, query: str) -> Set[str]:
+        """Search keys which contain the query (case insensitive)
+        """
+        key_index = self._key_index
+        if key_index is None:
+            # Readers may build it concurrently, it's only shared once it has been built
+            key_index = SearchIndex()
+            key_index.build((key, key) for key in self._store.keys())
+            self._key_index = key_index
+        return key_index.search(query)
+
+    def search_values(self, query: str) -> Set[str]:
+        """Search keys of which any value contains the query (case insensitive)
+        """
+        value_index = self._value_index
+        if value_index is None:
+            value_index = SearchIndex()
+            value_index.build((key, self._get_search_text(key)) for key in self._store.keys())
+            self._value_index = value_index
+        return value_index.search(query)
+
+    @gMetrics.timed("translation_phase_seconds", phase="parse")
+    def load(self, file_or_dir_path: str, jobs: int = 1):
         """Load or reload data
+        Args:
+            jobs: The number of processes to parse files, 0 means the number of CPUs
         """
+        # Sorted keys and search indexes will be rebuilt on demand
+        self._sorted_keys = None
+        self._key_index = None
+        self._value_index = None
         if os.path.isdir(file_or_dir_path):
-            self._read_directory(file_or_dir_path)
+            # Only localisation files are read in a directory, a file path is always read
+            self._read_files([filepath for filepath in list_files(file_or_dir_path) if self._check_filename(filepath)], jobs)
         elif os.path.isfile(file_or_dir_path):
-            self._read_file(file_or_dir_path)
-
-    def _read_directory(self, dirpath: str) -> None:
-        """Read directory
-        """
-        for name in os.listdir(dirpath):
-            fullpath = os.path.join(dirpath, name)
-            if os.path.isdir(fullpath):
-                self._read_directory(fullpath)
-            elif os.path.isfile(fullpath):
-                self._read_file(fullpath)
-
-    def _read_file(self, filepath: str) -> None:
-        """Read file
-        """
-        with open(filepath, "r", encoding="utf-8-sig") as fd:
-            #
-            # Why not parse by a yaml library?
-            #
-            #   I have found lots of errors in mod localisation files (Invalid empty line with indents as prefix; invalid number after colon; unescaped chars...)
-            #   So I decided to parse the file by myself (But write will be proceed by a yaml library) and ignore any errors.
-            #
-
-            # Read file header
-            line = fd.readline().strip()
-            if not line.endswith(":"):
-                raise ValueError("Invalid file. Malformed header line [%s]." % line)
-            if not line[:-1] in FileHeaderMapping:
-                raise ValueError("Invalid file. Malformed header line [%s]." % line)
-            language = FileHeaderMapping[line[:-1]]
-            # Check enabled languages
-            if self._enabled_languages and language not in self._enabled_languages:
-                return
-            # Read line by line
-            for line in fd.readlines():
-                line = line.strip()
-                if not line:
-                    continue
-                if line.startswith("#"):
-                    continue
-                if not line.endswith("\""):
-                    continue
-                index1 = line.find(":")
-                index2 = line.find("\"")
-                if index1 < 0 or index2 < 0:
-                    continue
-                key = line[:index1].strip()
-                value = line[index2+1:-1].strip()
-                # Unescape
-                value = value.replace("\\n", "\n").replace("\\\"", "\"").replace("\\\\", "\\")
-                # Add it
-                if key not in self._items:
-                    self._items[key] = LocalizationItem(key, [LocalizationValue(language, value)])
+            self._read_files([file_or_dir_path], jobs)
+        if self._cache:
+            self._cache.save()
+
+    def _read_files(self, filepaths: List[str], jobs: int = 1) -> None:
+        """Read files
+        """
+        # Get shared and cached files
+        digests = [get_file_digest(filepath) for filepath in filepaths]
+        results: List[FileValues | None] = [get_shared_file_values(digest) for digest in digests]
+        if self._cache:
+            for index, filepath in enumerate(filepaths):
+                if results[index] is None:
+                    result = self._cache.get(filepath)
+                    if result is not None:
+                        results[index] = self._share_file_values(digests[index], *result)
+        # Parse the others. Cached values are not filtered by enabled languages so they can be shared
+        enabled_languages = None if self._cache else self._enabled_languages
+        indexes = [index for index, result in enumerate(results) if result is None]
+        if jobs == 1 or len(indexes) < 2:
+            for index in indexes:
+                results[index] = self._share_file_values(digests[index], *self._parse_file(filepaths[index], enabled_languages))
+        else:
+            # Parse files in parallel, results are merged in the same order as reading serially
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+                chunksize = max(1, len(indexes) // ((jobs or os.cpu_count() or 1) * 4))
+                for index, result in zip(indexes, executor.map(parse_file, [filepaths[index] for index in indexes],
+                                                               [enabled_languages] * len(indexes), chunksize=chunksize)):
+                    results[index] = self._share_file_values(digests[index], *result)
+                    if self._cache:
+                        self._cache.set(filepaths[index], *result)
+        # Merge
+        for filepath, result in zip(filepaths, results):
+            if result:
+                self._add_values(result, file_id=self._get_file_id(filepath))
+
+    @gMetrics.timed("translation_phase_seconds", phase="parse")
+    def reload_files(self, changed_filepaths: List[str], removed_filepaths: List[str]) -> Set[str]:
+        """Reload changed (or new) files and remove values of removed files, values of other files are not touched
+        Returns:
+            The affected keys
+        """
+        if not self._track_files:
+            raise ValueError("Reload files requires tracking files")
+        affected_keys: Set[str] = set()
+        for filepath in removed_filepaths:
+            file_id = self._file_ids.pop(filepath, None)
+            if file_id is not None:
+                affected_keys.update(self._remove_values(file_id))
+        for filepath in changed_filepaths:
+            if filepath not in self._file_ids and not self._check_filename(filepath):
+                # Not a localisation file
+                continue
+            try:
+                file_values = self._get_file_values(filepath)
+            except (OSError, ValueError) as error:
+                # Keep current values
+                print("[!] Failed to reload file [%s]: %s" % (filepath, error))
+                continue
+            file_id = self._get_file_id(filepath)
+            affected_keys.update(self._remove_values(file_id))
+            affected_keys.update(self._add_values(file_values, file_id))
+        if self._cache:
+            self._cache.save()
+        # Update sorted keys and search indexes
+        for key in affected_keys:
+            found = key in self._store
+            if self._sorted_keys is not None:
+                index = bisect_left(self._sorted_keys, key)
+                indexed = index < len(self._sorted_keys) and self._sorted_keys[index] == key
+                if found and not indexed:
+                    self._sorted_keys.insert(index, key)
+                elif not found and indexed:
+                    del self._sorted_keys[index]
+            if self._key_index is not None:
+                if found:
+                    self._key_index.set(key, key)
+                else:
+                    self._key_index.remove(key)
+            if self._value_index is not None:
+                if found:
+                    self._value_index.set(key, self._get_search_text(key))
                 else:
-                    self._items[key].values.append(LocalizationValue(language, value))
+                    self._value_index.remove(key)
+        return affected_keys
+
+    def _get_search_text(self, key: str) -> str:
+        """Get the text of a key to search values
+        """
+        return "\n".join(value for _, value in self._store.get_values(key) or [])
+
+    def _get_file_values(self, filepath: str) -> FileValues:
+        """Get values of a file, which are shared if another manager has read a file of the same content, or from cache, or by parsing it
+        """
+        digest = get_file_digest(filepath)
+        file_values = get_shared_file_values(digest)
+        if file_values is None:
+            result = self._cache.get(filepath) if self._cache else None
+            if result is None:
+                result = self._parse_file(filepath, None if self._cache else self._enabled_languages)
+            file_values = self._share_file_values(digest, *result)
+        return file_values
+
+    def _parse_file(self, filepath: str, enabled_languages: List[str] | None) -> Tuple[str, List[Tuple[str, str]]]:
+        """Parse a file and cache the result
+        """
+        language, values = parse_file(filepath, enabled_languages)
+        if self._cache:
+            self._cache.set(filepath, language, values)
+        return language, values
+
+    def _share_file_values(self, digest: bytes, language: str, values: List[Tuple[str, str]]) -> FileValues:
+        """Create file values of parsed values and share them. Values of a language which is not enabled may have been dropped by the parser,
+        so they're not shared
+        """
+        file_values = FileValues(language, values)
+        if self._enabled_languages and language not in self._enabled_languages:
+            return file_values
+        with gFileValuesLock:
+            return gFileValues.setdefault(digest, file_values)
+
+    def _get_file_id(self, filepath: str) -> int:
+        """Get the id of a file, assign a new one if not exists
+        """
+        file_id = self._file_ids.get(filepath)
+        if file_id is None:
+            file_id = self._file_ids[filepath] = self._next_file_id
+            self._next_file_id += 1
+        return file_id
+
+    def _add_values(self, file_values: FileValues, file_id: int = 0) -> List[str]:
+        """Add values of a file
+        Returns:
+            The added keys
+        """
+        language = file_values.language
+        if self._enabled_languages and language not in self._enabled_languages:
+            return []
+        self._language_values = {}
+        heap_id = self._store.add_file_values(file_values)
+        language_id = LanguageIds[language]
+        for key, offset, size in zip(file_values.keys, file_values.offsets, file_values.sizes):
+            if not self._track_files:
+                self._store.insert_ref(key, language_id, heap_id, offset, size)
+            elif key not in self._value_file_ids:
+                self._store.insert_ref(key, language_id, heap_id, offset, size)
+                self._value_file_ids[key] = [file_id]
+            else:
+                # Keep values in the order of files
+                file_ids = self._value_file_ids[key]
+                index = bisect_right(file_ids, file_id)
+                file_ids.insert(index, file_id)
+                self._store.insert_ref(key, language_id, heap_id, offset, size, index)
+        keys = list(file_values.keys)
+        if self._track_files:
+            self._file_keys.setdefault(file_id, []).extend(keys)
+        return keys
+
+    def _remove_values(self, file_id: int) -> List[str]:
+        """Remove values of a file
+        Returns:
+            The removed keys
+        """
+        keys = self._file_keys.pop(file_id, [])
+        self._language_values = {}
+        for key in keys:
+            file_ids = self._value_file_ids.get(key)
+            if not file_ids:
+                continue
+            for index in range(len(file_ids) - 1, -1, -1):
+                if file_ids[index] == file_id:
+                    del file_ids[index]
+                    self._store.remove(key, index)
+            if not file_ids:
+                del self._value_file_ids[key]
+        return keys
 
     def _check_filename(self, filename: str) -> bool:
         """Check filename
@@ -118,3 +509,111 @@ class LocalizationManager(object):
             if filename.endswith(suffix):
                 return True
         return False
+
+
+def get_shared_file_values(digest: bytes) -> FileValues | None:
+    """Get values of a file of the content hash, which have been read by any manager
+    """
+    with gFileValuesLock:
+        return gFileValues.get(digest)
+
+
+def list_files(dirpath: str) -> List[str]:
+    """List files in a directory recursively
+    """
+    filepaths = []
+    for name in os.listdir(dirpath):
+        fullpath = os.path.join(dirpath, name)
+        if os.path.isdir(fullpath):
+            filepaths.extend(list_files(fullpath))
+        elif os.path.isfile(fullpath):
+            filepaths.append(fullpath)
+    return filepaths
+
+
+def parse_file(filepath: str, enabled_languages: List[str] | None = None) -> Tuple[str, List[Tuple[str, str]]]:
+    """Parse a localisation file
+    Returns:
+        (language, [(key, value)])
+    """
+    values: List[Tuple[str, str]] = []
+    with open(filepath, "r", encoding="utf-8-sig") as fd:
+        #
+        # Why not parse by a yaml library?
+        #
+        #   I have found lots of errors in mod localisation files (Invalid empty line with indents as prefix; invalid number after colon; unescaped chars...)
+        #   So I decided to parse the file by myself (But write will be proceed by a yaml library) and ignore any errors.
+        #
+
+        # Read file header, empty lines and comments before it are allowed
+        language = None
+        for line in iter(fd.readline, ""):
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            header = line.split("#", 1)[0].rstrip() if "#" in line else line
+            if not header.endswith(":") or header[:-1] not in FileHeaderMapping:
+                raise ValueError("Invalid file. Malformed header line [%s]." % line)
+            language = FileHeaderMapping[header[:-1]]
+            break
+        if language is None:
+            raise ValueError("Invalid file. Header line not found.")
+        # Check enabled languages
+        if enabled_languages and language not in enabled_languages:
+            return language, values
+        # Read lines by chunks, the format is: key:0 "value" # comment
+        for text in iter_chunks(fd):
+            for line in text.split("\n"):
+                line = line.strip()
+                if not line or line[0] == "#":
+                    continue
+                if line[-1] == "\"":
+                    end = len(line) - 1
+                elif "#" in line:
+                    # The value ends with the last quote which is followed by nothing but a comment
+                    end = line.rfind("\"")
+                    while end >= 0 and line[end+1:].lstrip()[0] != "#":
+                        end = line.rfind("\"", 0, end)
+                else:
+                    continue
+                # The key is followed by a colon (and an optional version number) before the first quote.
+                # Quotes in the value are usually not escaped in mods
+                start = line.find("\"")
+                if start >= end:
+                    continue
+                colon = line.find(":", 0, start)
+                if colon <= 0:
+                    continue
+                value = line[start+1:end].strip()
+                if "\\" in value:
+                    if "\\\\" in value:
+                        value = UnescapeRegex.sub(_unescape_char, value)
+                    else:
+                        # Fast path, every backslash starts an escape sequence
+                        value = value.replace("\\n", "\n").replace("\\\"", "\"")
+                values.append((line[:colon].rstrip(), value))
+    return language, values
+
+
+def iter_chunks(fd: TextIO) -> Iterator[str]:
+    """Iterate chunks of a file, each chunk consists of whole lines
+    """
+    remainder = ""
+    while True:
+        chunk = fd.read(ReadChunkSize)
+        if not chunk:
+            break
+        index = chunk.rfind("\n")
+        if index < 0:
+            remainder += chunk
+            continue
+        yield remainder + chunk[:index] if remainder else chunk[:index]
+        remainder = chunk[index+1:]
+    if remainder:
+        yield remainder
+
+
+def _unescape_char(match: re.Match) -> str:
+    """Unescape a char
+    """
+    return UnescapeReplacements[match.group(1)]
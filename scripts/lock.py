@@ -0,0 +1,106 @@
+# encoding=utf-8
+
+""" Lock
+    Author: lipixun
+    Created Time : 2024-04-12 21:03:47
+
+    File Name: lock.py
+    Description:
+
+"""
+from typing import Callable, Dict
+
+import threading
+
+
+class LockContext(object):
+    """A reusable context manager of a lock
+    """
+
+    def __init__(self, acquire: Callable[[], None], release: Callable[[], None]) -> None:
+        """Create a new LockContext
+        """
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self) -> None:
+        self._acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._release()
+
+
+class ReadWriteLock(object):
+    """Reader-writer lock, which allows either multiple readers or a single writer
+    Writers are preferred: new readers wait while a writer is waiting, so writers are not starved by overlapped reads.
+    Both locks are reentrant, and the writer can also acquire the read lock. A reader MUST NOT acquire the write lock.
+    """
+
+    def __init__(self) -> None:
+        """Create a new ReadWriteLock
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers: Dict[int, int] = {}          # thread id to the number of acquired read locks
+        self._writer: int | None = None             # thread id of the writer
+        self._write_count = 0
+        self._waiting_writers = 0
+        self.read_lock = LockContext(self.acquire_read, self.release_read)
+        self.write_lock = LockContext(self.acquire_write, self.release_write)
+
+    def acquire_read(self) -> None:
+        """Acquire the read lock
+        """
+        thread_id = threading.get_ident()
+        with self._condition:
+            if self._writer != thread_id and thread_id not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers[thread_id] = self._readers.get(thread_id, 0) + 1
+
+    def release_read(self) -> None:
+        """Release the read lock
+        """
+        thread_id = threading.get_ident()
+        with self._condition:
+            count = self._readers.get(thread_id, 0)
+            if not count:
+                raise RuntimeError("Release an unacquired read lock")
+            if count > 1:
+                self._readers[thread_id] = count - 1
+            else:
+                del self._readers[thread_id]
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        """Acquire the write lock
+        """
+        thread_id = threading.get_ident()
+        with self._condition:
+            if self._writer == thread_id:
+                self._write_count += 1
+                return
+            if thread_id in self._readers:
+                raise RuntimeError("Can't upgrade a read lock to the write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            except BaseException:
+                self._waiting_writers -= 1
+                self._condition.notify_all()
+                raise
+            self._waiting_writers -= 1
+            self._writer = thread_id
+            self._write_count = 1
+
+    def release_write(self) -> None:
+        """Release the write lock
+        """
+        with self._condition:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("Release an unacquired write lock")
+            self._write_count -= 1
+            if not self._write_count:
+                self._writer = None
+                self._condition.notify_all()
@@ -0,0 +1,203 @@
+# encoding=utf-8
+
+""" Translation memory
+    Author: lipixun
+    Created Time : 2024-04-06 15:27:09
+
+    File Name: memory.py
+    Description:
+
+        Find translated items of which the source text is the same as, or similar to a text.
+
+        Exact matches are found by the hash of the stripped text. Similar texts are found by MinHash LSH:
+        the signature of a text is the minimum hash of its (lowercased) tokens in each bin (one permutation
+        hashing), and texts which share all values of a band of the signature are candidates. Tokens are words,
+        and also character n-grams for texts of a few words. Candidates are ranked by the jaccard similarity
+        of tokens, then the best of them by the similarity of texts.
+
+        Hashes are kept in sorted arrays (one for each band) instead of dicts, so an entry only costs
+        a few bytes for each band.
+
+"""
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+import sys
+import itertools
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from difflib import SequenceMatcher
+
+from search import GramSize
+
+# The signature of a text consists of MinHashBands * MinHashRows values
+MinHashBands = 6
+MinHashRows = 2
+MinHashSize = MinHashBands * MinHashRows
+# Texts of less words also use character n-grams as tokens
+MinWordTokens = 3
+# Ignore buckets shared by more entries than this, they're too common to tell anything (exact matches are not limited)
+MaxBucketSize = 1000
+# Rank at most these candidates (which share most bands) by the jaccard similarity of tokens
+MaxCandidates = 100
+# Then rank at most these candidates by the similarity of texts
+MaxRankedCandidates = 20
+# Ignore suggestions less similar than this
+MinSuggestionScore = 0.5
+
+# Defines a suggestion
+Suggestion = NamedTuple("Suggestion", [
+    ("key", str),
+    ("source", str),
+    ("translation", str),
+    ("score", float),               # 1.0 means the same source text
+])
+
+
+class TranslationMemory(object):
+    """Translation memory of a language
+    """
+
+    def __init__(self) -> None:
+        """Create a new TranslationMemory
+        """
+        self._entry_ids: Dict[str, int] = {}                # key to entry id
+        self._keys: List[str | None] = []                   # entry id to key, None means removed
+        self._sources: List[str | None] = []                # entry id to source text
+        self._translations: List[str | None] = []           # entry id to translation
+        # The exact index and band indexes. Each index is (sorted hashes, entry ids)
+        self._indexes = [(array("q"), array("i")) for _ in range(MinHashBands + 1)]
+
+    def __len__(self) -> int:
+        return len(self._entry_ids)
+
+    def build(self, items: Iterable[Tuple[str, str, str]]) -> None:
+        """Build the memory from (key, source text, translation), faster than calling `set` one by one
+        """
+        entries: List[Tuple[int, List[int]]] = []
+        for key, source, translation in items:
+            if key in self._entry_ids or not source or not translation:
+                self.set(key, source, translation)
+                continue
+            entries.append((self._add_entry(key, source, translation), get_hashes(source.strip())))
+        # Merge into sorted arrays. The sort is stable so entry ids of the same hash are still sorted
+        for index, (hashes, entry_ids) in enumerate(self._indexes):
+            all_hashes = hashes.tolist() + [entry_hashes[index] for _, entry_hashes in entries]
+            all_entry_ids = entry_ids.tolist() + [entry_id for entry_id, _ in entries]
+            order = sorted(range(len(all_hashes)), key=all_hashes.__getitem__)
+            self._indexes[index] = (array("q", [all_hashes[i] for i in order]), array("i", [all_entry_ids[i] for i in order]))
+
+    def set(self, key: str, source: str | None, translation: str | None) -> None:
+        """Set (add or replace) the source text and translation of a key. Remove the key if either of them is empty
+        """
+        entry_id = self._entry_ids.get(key)
+        if entry_id is not None:
+            if self._sources[entry_id] == source and self._translations[entry_id] == translation:
+                return
+            self.remove(key)
+        if not source or not translation:
+            return
+        entry_id = self._add_entry(key, source, translation)
+        for (hashes, entry_ids), value in zip(self._indexes, get_hashes(source.strip())):
+            position = bisect_right(hashes, value)
+            hashes.insert(position, value)
+            entry_ids.insert(position, entry_id)
+
+    def remove(self, key: str) -> None:
+        """Remove a key
+        """
+        entry_id = self._entry_ids.pop(key, None)
+        if entry_id is None:
+            return
+        for (hashes, entry_ids), value in zip(self._indexes, get_hashes(self._sources[entry_id].strip())):
+            # Entry ids of the same hash are sorted since ids are increasing
+            start = bisect_left(hashes, value)
+            position = bisect_left(entry_ids, entry_id, start, bisect_right(hashes, value, start))
+            del hashes[position]
+            del entry_ids[position]
+        self._keys[entry_id] = self._sources[entry_id] = self._translations[entry_id] = None
+
+    def suggest(self, text: str, limit: int = 5, exclude_key: str | None = None) -> List[Suggestion]:
+        """Get suggestions of a text, ordered by similarity. Suggestions of the same translation are merged
+        """
+        stripped_text = text.strip() if text else ""
+        if not stripped_text:
+            return []
+        tokens = get_tokens(stripped_text)
+        # Count the matched bands of candidates
+        exact_entry_ids = set()
+        counter: Counter = Counter()
+        for index, ((hashes, entry_ids), value) in enumerate(zip(self._indexes, get_hashes(stripped_text, tokens))):
+            start = bisect_left(hashes, value)
+            end = bisect_right(hashes, value, start)
+            if index == 0:
+                exact_entry_ids.update(entry_id for entry_id in entry_ids[start:end] if self._sources[entry_id].strip() == stripped_text)
+            elif end - start <= MaxBucketSize:
+                counter.update(entry_ids[start:end])
+        # Rank candidates by jaccard similarity of tokens, then the best of them by the similarity of texts
+        candidates: List[Tuple[float, int]] = []
+        for entry_id, _ in counter.most_common(MaxCandidates):
+            if entry_id not in exact_entry_ids:
+                candidate_tokens = get_tokens(self._sources[entry_id].strip())
+                candidates.append((len(tokens & candidate_tokens) / len(tokens | candidate_tokens), entry_id))
+        candidates.sort(key=lambda c: -c[0])
+        scores = [(1.0, entry_id) for entry_id in exact_entry_ids]
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(stripped_text.lower())
+        for _, entry_id in candidates[:MaxRankedCandidates]:
+            matcher.set_seq1(self._sources[entry_id].strip().lower())
+            score = matcher.ratio()
+            if score >= MinSuggestionScore:
+                scores.append((score, entry_id))
+        # Merge suggestions of the same translation
+        suggestions: Dict[str, Suggestion] = {}    # translation to suggestion
+        for score, entry_id in sorted(scores, key=lambda s: (-s[0], self._keys[s[1]])):
+            key, translation = self._keys[entry_id], self._translations[entry_id]
+            if key != exclude_key and translation not in suggestions:
+                suggestions[translation] = Suggestion(key, self._sources[entry_id], translation, score)
+                if len(suggestions) >= limit:
+                    break
+        return list(suggestions.values())
+
+    def _add_entry(self, key: str, source: str, translation: str) -> int:
+        """Add an entry without indexing it
+        """
+        entry_id = self._entry_ids[key] = len(self._keys)
+        self._keys.append(key)
+        self._sources.append(source)
+        self._translations.append(translation)
+        return entry_id
+
+
+def get_tokens(text: str) -> Set[str]:
+    """Get tokens of a stripped text
+    """
+    lowered_text = text.lower()
+    tokens = set(lowered_text.split())
+    if len(tokens) < MinWordTokens:
+        tokens.update(lowered_text[i:i + GramSize] for i in range(len(lowered_text) - GramSize + 1))
+    return tokens
+
+
+def get_hashes(text: str, tokens: Set[str] | None = None) -> List[int]:
+    """Get the exact hash and band hashes of a stripped text
+    """
+    # Signature by one permutation hashing. Values in a bin have the same remainder, so they're compared as they are
+    signature = [sys.maxsize] * MinHashSize
+    for value in map(hash, tokens if tokens is not None else get_tokens(text)):
+        bin_index = value % MinHashSize
+        if value < signature[bin_index]:
+            signature[bin_index] = value
+    # Fill empty bins by the next non-empty bin (rotation)
+    if sys.maxsize in signature:
+        next_value = None
+        for bin_index in itertools.chain(range(MinHashSize - 1, -1, -1), range(MinHashSize - 1, -1, -1)):
+            if signature[bin_index] == sys.maxsize:
+                if next_value is not None:
+                    signature[bin_index] = next_value
+            else:
+                next_value = signature[bin_index] + 1
+    hashes = [hash(text)]
+    hashes.extend(map(hash, zip(*[iter(signature)] * MinHashRows)))
+    return hashes
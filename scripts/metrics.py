@@ -0,0 +1,200 @@
+# encoding=utf-8
+
+""" Metrics
+    Author: lipixun
+    Created Time : 2024-04-18 20:52:17
+
+    File Name: metrics.py
+    Description:
+
+        In-process counters and histograms (request latencies, phase timings), rendered in the prometheus text format.
+        And the opt-in profiler which dumps cProfile stats and tracemalloc snapshots.
+
+"""
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import cProfile
+import functools
+import threading
+import tracemalloc
+
+from contextlib import contextmanager
+from time import perf_counter
+
+# Histogram buckets in seconds
+DefaultBuckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Sorted (label name, value) pairs
+Labels = Tuple[Tuple[str, str], ...]
+# (metric name, type, help, [(labels, value)])
+Sample = Tuple[str, str, str, List[Tuple[Labels, float]]]
+
+
+class Histogram(object):
+    """Histogram of observed values
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DefaultBuckets) -> None:
+        """Create a new Histogram
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)        # Not cumulative
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Observe a value
+        """
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class Metrics(object):
+    """Registry of counters and histograms, which is thread safe
+    """
+
+    def __init__(self) -> None:
+        """Create a new Metrics
+        """
+        self._lock = threading.Lock()
+        self._helps: Dict[str, Tuple[str, str]] = {}                        # name to (type, help)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._collectors: List[Callable[[], List[Sample]]] = []
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        """Describe a metric, which is optional
+        """
+        self._helps[name] = (metric_type, help_text)
+
+    def inc(self, name: str, value: float = 1, /, **labels: str) -> None:
+        """Increase a counter
+        """
+        label_items = get_labels(labels)
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            counters[label_items] = counters.get(label_items, 0) + value
+
+    def observe(self, name: str, value: float, /, **labels: str) -> None:
+        """Observe a value of a histogram
+        """
+        label_items = get_labels(labels)
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            histogram = histograms.get(label_items)
+            if histogram is None:
+                histogram = histograms[label_items] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, /, **labels: str) -> Iterator[None]:
+        """Observe the seconds of the block (even if it raises)
+        """
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start_time, **labels)
+
+    def timed(self, name: str, /, **labels: str) -> Callable[[Callable], Callable]:
+        """Decorator which observes the seconds of each call
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapped_func(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapped_func
+        return decorator
+
+    def add_collector(self, collector: Callable[[], List[Sample]]) -> None:
+        """Add a function which returns samples (usually gauges) when rendering
+        """
+        self._collectors.append(collector)
+
+    def get_histograms(self, name: str) -> List[Tuple[Labels, int, float]]:
+        """Get (labels, count, sum) of all histograms of a name
+        """
+        with self._lock:
+            return [(label_items, histogram.count, histogram.sum) for label_items, histogram in self._histograms.get(name, {}).items()]
+
+    def render(self) -> str:
+        """Render all metrics in the prometheus text format
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, counters in sorted(self._counters.items()):
+                self._render_header(lines, name, "counter")
+                for label_items, value in sorted(counters.items()):
+                    lines.append("%s%s %s" % (name, format_labels(label_items), format_value(value)))
+            for name, histograms in sorted(self._histograms.items()):
+                self._render_header(lines, name, "histogram")
+                for label_items, histogram in sorted(histograms.items()):
+                    cumulative_count = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative_count += count
+                        lines.append("%s_bucket%s %d" % (name, format_labels(label_items + (("le", format_value(bound)),)), cumulative_count))
+                    lines.append("%s_bucket%s %d" % (name, format_labels(label_items + (("le", "+Inf"),)), histogram.count))
+                    lines.append("%s_sum%s %s" % (name, format_labels(label_items), format_value(histogram.sum)))
+                    lines.append("%s_count%s %d" % (name, format_labels(label_items), histogram.count))
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s %s" % (name, metric_type))
+                for label_items, value in samples:
+                    lines.append("%s%s %s" % (name, format_labels(label_items), format_value(value)))
+        return "\n".join(lines) + "\n"
+
+    def _render_header(self, lines: List[str], name: str, default_type: str) -> None:
+        """Render HELP and TYPE lines of a metric
+        """
+        metric_type, help_text = self._helps.get(name, (default_type, name))
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s %s" % (name, metric_type))
+
+
+def get_labels(labels: Dict[str, str]) -> Labels:
+    """Get sorted label items
+    """
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def format_labels(label_items: Labels) -> str:
+    """Format labels as `{name="value",...}`
+    """
+    if not label_items:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (name, value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+                             for name, value in label_items)
+
+
+def format_value(value: float) -> str:
+    """Format a sample value
+    """
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+@contextmanager
+def profile(path_prefix: str) -> Iterator[None]:
+    """Profile the block, dump cProfile stats to `<path_prefix>.prof` and the tracemalloc snapshot to `<path_prefix>.tracemalloc`
+    if tracemalloc is tracing (start it as early as possible to trace all allocations). Stats can be read by `pstats` or `snakeviz`
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats("%s.prof" % path_prefix)
+        if tracemalloc.is_tracing():
+            tracemalloc.take_snapshot().dump("%s.tracemalloc" % path_prefix)
+
+
+# The metrics of this process
+gMetrics = Metrics()
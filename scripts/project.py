@@ -0,0 +1,499 @@
+# encoding=utf-8
+
+""" Project
+    Author: lipixun
+    Created Time : 2024-04-10 20:15:32
+
+    File Name: project.py
+    Description:
+
+        Serve several translation projects (usually mods of a collection) in one process. Projects are
+        configured by a json file, loaded on first access and unloaded when they have been idle for a while
+        or too many projects are loaded (least recently used first). Projects of the same source paths and
+        source language share the parsed source localisation, and all projects share the source cache.
+
+        Config file:
+
+            {
+                "default_project": "name",              # Optional, the first project by default
+                "max_loaded_projects": 4,               # Optional, 0 means unlimited
+                "idle_timeout": 1800,                   # Optional, seconds, 0 means never unload idle projects
+                "autosave_interval": 300,               # Optional, seconds, 0 means never save changed projects automatically
+                "jobs": 1,                              # Optional
+                "source_cache": "path",                 # Optional
+                "watch_source": false,                  # Optional
+                "watch_interval": 2.0,                  # Optional
+                "projects": [
+                    {
+                        "name": "name",
+                        "source_paths": ["path"],
+                        "source_language": "english",   # Optional
+                        "data_file": "path",
+                        "output_path": "path",
+                        "default_target_language": "simp_chinese",  # Optional
+                        "build_none_translated_key": false,         # Optional
+                        "disable_journal": false,                   # Optional
+                        "journal_compact_size": 10000,              # Optional
+                        "targets": [                                # Optional, more output projects (submods) built with the project
+                            {"name": "name", "output_path": "path", "languages": ["simp_chinese"], "build_none_translated_key": false}
+                        ]
+                    }
+                ]
+            }
+
+        Relative paths are relative to the directory of the config file.
+
+"""
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Tuple
+
+import os
+import os.path
+import threading
+
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime
+from time import monotonic, perf_counter, time
+
+from cache import SourceCache
+from localization import LocalizationManager
+from translation import BuildTarget, TranslationManager, get_build_target
+from utils import json, LanguageNames
+from watcher import SourceWatcher
+
+ProjectConfig = NamedTuple("ProjectConfig", [
+    ("name", str),
+    ("source_paths", List[str]),
+    ("source_language", str | None),
+    ("data_file", str),
+    ("output_path", str),
+    ("default_target_language", str),
+    ("build_none_translated_key", bool),
+    ("disable_journal", bool),
+    ("journal_compact_size", int),      # Compact the journal when it has more records than this size, 0 to disable
+    ("build_targets", List[BuildTarget]),   # The project itself and more output projects, built in one pass
+])
+
+RegistryConfig = NamedTuple("RegistryConfig", [
+    ("projects", List[ProjectConfig]),
+    ("default_project", str | None),
+    ("max_loaded_projects", int),       # 0 means unlimited
+    ("idle_timeout", float),            # Seconds, 0 means never
+    ("autosave_interval", float),       # Seconds, 0 means never
+    ("jobs", int),
+    ("source_cache", str | None),
+    ("watch_source", bool),
+    ("watch_interval", float),
+])
+
+# Interval in seconds of checking idle projects
+IdleCheckInterval = 60.0
+
+
+class SharedSource(object):
+    """Source localisation shared by projects of the same source paths and source language
+    """
+
+    def __init__(self, source_paths: List[str], source_language: str | None, source_cache: SourceCache | None, jobs: int,
+                 watch_interval: float | None = None, lock: ContextManager = nullcontext(), read_lock: ContextManager | None = None) -> None:
+        """Create a new SharedSource and load source files
+        Args:
+            watch_interval: Watch source paths and reload changed files automatically if specified
+            lock: The lock which protects projects when reloading changed files
+            read_lock: The shared lock of projects used by background threads which only read projects, the lock by default
+        """
+        self.localization_manager = LocalizationManager([source_language] if source_language else None, source_cache,
+                                                        track_files=watch_interval is not None)
+        self.version = 0                                    # Increased when the source has been reloaded
+        self.update_time: datetime | None = None
+        self.projects: List["Project"] = []                 # Loaded projects which use this source
+        self._lock = lock
+        self._read_lock = read_lock or lock
+        # Take the snapshot before loading in order not to miss any changes
+        self._watcher = SourceWatcher(source_paths, self._handle_source_changed, watch_interval) if watch_interval is not None else None
+        for source_path in source_paths:
+            self.localization_manager.load(source_path, jobs)
+        if self._watcher is not None:
+            self._watcher.start()
+
+    def close(self) -> None:
+        """Stop watching. The watcher thread exits in background since it may be waiting for the lock
+        """
+        if self._watcher is not None:
+            self._watcher.stop(wait=False)
+            self._watcher = None
+
+    def _handle_source_changed(self, changed_filepaths: List[str], removed_filepaths: List[str]) -> None:
+        """Reload changed source files, called by the source watcher
+        """
+        with self._lock:
+            keys = self.localization_manager.reload_files(changed_filepaths, removed_filepaths)
+            for project in self.projects:
+                project.translation_manager.refresh_key_states(keys)
+            self.version += 1
+            self.update_time = datetime.now()
+            projects = list(self.projects)
+        print("[+] Source changed: reload [%d] files, remove [%d] files, [%d] keys affected" % (
+            len(changed_filepaths), len(removed_filepaths), len(keys)))
+        for project in projects:
+            project.precompute_deltas(self._read_lock)
+
+
+class Project(object):
+    """A loaded translation project
+    """
+
+    def __init__(self, config: ProjectConfig, source: SharedSource) -> None:
+        """Create a new Project and load its translation data
+        """
+        self.config = config
+        self.source = source
+        self.translation_manager = TranslationManager(source.localization_manager)
+        if os.path.isfile(config.data_file):
+            self.translation_manager.load(config.data_file)
+        if not config.disable_journal:
+            self.translation_manager.open_journal(config.data_file)
+        self.load_time = time()
+        self.last_access_time = monotonic()
+        self._compact_thread: threading.Thread | None = None
+        self._delta_thread: threading.Thread | None = None
+        self._job_lock = threading.Lock()
+        self._job_count = 0                                 # The number of pending and running background jobs
+
+    @property
+    def name(self) -> str:
+        """Get project name
+        """
+        return self.config.name
+
+    @property
+    def localization_manager(self) -> LocalizationManager:
+        """Get source localization manager
+        """
+        return self.source.localization_manager
+
+    @property
+    def busy(self) -> bool:
+        """Check if the project is compacting its journal or has background jobs, a busy project can't be unloaded
+        """
+        return bool(self._job_count) or (self._compact_thread is not None and self._compact_thread.is_alive())
+
+    def add_job(self) -> None:
+        """Add a pending background job
+        """
+        with self._job_lock:
+            self._job_count += 1
+
+    def remove_job(self) -> None:
+        """Remove a finished background job
+        """
+        with self._job_lock:
+            self._job_count -= 1
+
+    def compact_journal_if_needed(self, lock: ContextManager = nullcontext()) -> None:
+        """Compact the journal in background if it's too large
+        """
+        if not self.config.journal_compact_size or self.translation_manager.journal_size < self.config.journal_compact_size:
+            return
+        if self.busy:
+            return
+
+        def compact():
+            try:
+                self.translation_manager.compact(self.config.data_file, lock)
+            except Exception as error:
+                print("[!] Failed to compact journal of project [%s]: %s" % (self.name, error))
+
+        self._compact_thread = threading.Thread(target=compact, name="journal-compact-%s" % self.name, daemon=True)
+        self._compact_thread.start()
+
+    def precompute_deltas(self, lock: ContextManager = nullcontext()) -> None:
+        """Compute deltas of changed keys of the default target language in background, see `TranslationManager.precompute_deltas`.
+        Deltas of other languages (or keys changed while computing) are computed on demand
+        """
+        if self._delta_thread is not None and self._delta_thread.is_alive():
+            return
+
+        def precompute():
+            try:
+                start_time = perf_counter()
+                count = self.translation_manager.precompute_deltas(self.config.default_target_language, lock)
+                if count:
+                    print("[+] Computed deltas of [%d] changed keys of project [%s] in %.3fs" % (count, self.name, perf_counter() - start_time))
+            except Exception as error:
+                print("[!] Failed to compute deltas of project [%s]: %s" % (self.name, error))
+
+        self._delta_thread = threading.Thread(target=precompute, name="delta-precompute-%s" % self.name, daemon=True)
+        self._delta_thread.start()
+
+    def close(self) -> None:
+        """Close the project. Changes are kept in the journal, or saved if the journal is disabled.
+        MUST NOT be called with the lock held if the project is busy.
+        """
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+            self._compact_thread = None
+        if self.config.disable_journal:
+            self.translation_manager.save(self.config.data_file)
+        else:
+            self.translation_manager.close_journal()
+
+
+class ProjectRegistry(object):
+    """Registry of projects, which loads projects on demand. Methods MUST be called with the write lock held unless noted
+    """
+
+    def __init__(self, config: RegistryConfig, lock: ContextManager = nullcontext(), read_lock: ContextManager | None = None) -> None:
+        """Create a new ProjectRegistry
+        Args:
+            lock: The lock which protects projects, used by background threads
+            read_lock: The shared lock used by background threads which only read projects, the lock by default
+        """
+        if not config.projects:
+            raise ValueError("Require at least 1 project")
+        self._config = config
+        self._lock = lock
+        self._read_lock = read_lock or lock
+        self._project_configs: Dict[str, ProjectConfig] = {}
+        for project_config in config.projects:
+            if project_config.name in self._project_configs:
+                raise ValueError("Duplicated project [%s]" % project_config.name)
+            self._project_configs[project_config.name] = project_config
+        if config.default_project is not None and config.default_project not in self._project_configs:
+            raise ValueError("Default project [%s] not found" % config.default_project)
+        self._source_cache = SourceCache(config.source_cache) if config.source_cache else None
+        self._projects: OrderedDict[str, Project] = OrderedDict()           # Loaded projects, least recently used first
+        self._access_lock = threading.Lock()                                # Protect the order of loaded projects
+        self._sources: Dict[Tuple, SharedSource] = {}                       # (source paths, source language) to source
+        self._stop_event = threading.Event()
+        self._idle_thread: threading.Thread | None = None
+        self._autosave_thread: threading.Thread | None = None
+
+    @property
+    def default_project_name(self) -> str:
+        """Get the name of default project
+        """
+        return self._config.default_project or self._config.projects[0].name
+
+    @property
+    def project_names(self) -> List[str]:
+        """Get names of all projects
+        """
+        return list(self._project_configs.keys())
+
+    @property
+    def loaded_projects(self) -> List[Project]:
+        """Get loaded projects. Can be called with the read lock held
+        """
+        with self._access_lock:
+            return list(self._projects.values())
+
+    def has(self, name: str) -> bool:
+        """Check if a project exists. Can be called without the lock
+        """
+        return name in self._project_configs
+
+    def is_loaded(self, name: str) -> bool:
+        """Check if a project is loaded. Can be called with the read lock held
+        """
+        return name in self._projects
+
+    def get_loaded(self, name: str | None = None) -> Project | None:
+        """Get a loaded project (the default one if name is not specified). Can be called with the read lock held
+        """
+        if name is None:
+            name = self.default_project_name
+        with self._access_lock:
+            project = self._projects.get(name)
+            if project is not None:
+                self._projects.move_to_end(name)
+                project.last_access_time = monotonic()
+            return project
+
+    def get(self, name: str | None = None) -> Project | None:
+        """Get a project (the default one if name is not specified), load it if not loaded. Returns None if not found
+        """
+        if name is None:
+            name = self.default_project_name
+        project = self.get_loaded(name)
+        if project is not None:
+            return project
+        project_config = self._project_configs.get(name)
+        if project_config is None:
+            return None
+        # Unload least recently used projects first, so at most max loaded projects are in memory (unless they're busy)
+        if self._config.max_loaded_projects:
+            for loaded_name, loaded_project in list(self._projects.items()):
+                if len(self._projects) < self._config.max_loaded_projects:
+                    break
+                if not loaded_project.busy:
+                    self.unload(loaded_name)
+        print("[+] Load project [%s]" % name)
+        source = self._get_source(project_config)
+        try:
+            project = Project(project_config, source)
+        except Exception:
+            self._release_source(source)
+            raise
+        source.projects.append(project)
+        with self._access_lock:
+            self._projects[name] = project
+        project.precompute_deltas(self._read_lock)
+        return project
+
+    def unload(self, name: str) -> None:
+        """Unload a project
+        """
+        with self._access_lock:
+            project = self._projects.pop(name, None)
+        if project is None:
+            return
+        print("[+] Unload project [%s]" % name)
+        try:
+            project.close()
+        finally:
+            project.source.projects.remove(project)
+            self._release_source(project.source)
+
+    def unload_idle(self) -> None:
+        """Unload projects which have been idle for longer than the idle timeout
+        """
+        if not self._config.idle_timeout:
+            return
+        now = monotonic()
+        for name, project in list(self._projects.items()):
+            if now - project.last_access_time >= self._config.idle_timeout and not project.busy:
+                self.unload(name)
+
+    def start(self, autosave: Callable[[Project], None] | None = None) -> None:
+        """Start unloading idle projects in background
+        Args:
+            autosave: Called periodically with the lock held for each loaded project which has unsaved changes and isn't busy
+        """
+        if self._config.idle_timeout and self._idle_thread is None:
+            self._idle_thread = threading.Thread(target=self._run_idle_check, name="project-idle-check", daemon=True)
+            self._idle_thread.start()
+        if autosave is not None and self._config.autosave_interval and self._autosave_thread is None:
+            self._autosave_thread = threading.Thread(target=self._run_autosave, args=(autosave,), name="project-autosave", daemon=True)
+            self._autosave_thread.start()
+
+    def close(self) -> None:
+        """Stop background thread and unload all projects. MUST be called without the lock held
+        """
+        self._stop_event.set()
+        for name in list(self._projects.keys()):
+            self.unload(name)
+        if self._source_cache:
+            self._source_cache.save()
+
+    def _get_source(self, project_config: ProjectConfig) -> SharedSource:
+        """Get the shared source of a project, load it if not loaded
+        """
+        source_key = (tuple(project_config.source_paths), project_config.source_language)
+        source = self._sources.get(source_key)
+        if source is None:
+            source = SharedSource(project_config.source_paths, project_config.source_language, self._source_cache, self._config.jobs,
+                                  self._config.watch_interval if self._config.watch_source else None, self._lock, self._read_lock)
+            self._sources[source_key] = source
+        return source
+
+    def _release_source(self, source: SharedSource) -> None:
+        """Unload a shared source if no project uses it
+        """
+        if source.projects:
+            return
+        for source_key, value in list(self._sources.items()):
+            if value is source:
+                del self._sources[source_key]
+        source.close()
+
+    def _run_idle_check(self) -> None:
+        """Check idle projects periodically
+        """
+        while not self._stop_event.wait(min(IdleCheckInterval, self._config.idle_timeout)):
+            try:
+                with self._lock:
+                    self.unload_idle()
+            except Exception as error:
+                print("[!] Failed to unload idle projects: %s" % error)
+
+    def _run_autosave(self, autosave: Callable[[Project], None]) -> None:
+        """Autosave changed projects periodically
+        """
+        while not self._stop_event.wait(self._config.autosave_interval):
+            try:
+                with self._lock:
+                    for project in list(self._projects.values()):
+                        if project.translation_manager.dirty and not project.busy:
+                            autosave(project)
+            except Exception as error:
+                print("[!] Failed to autosave projects: %s" % error)
+
+
+def load_registry_config(filepath: str) -> RegistryConfig:
+    """Load registry config file
+    """
+    with open(filepath, "r", encoding="utf-8") as fd:
+        value = json.load(fd)
+    base_path = os.path.dirname(os.path.abspath(filepath))
+    projects = [get_project_config(project, base_path) for project in value.get("projects") or []]
+    return RegistryConfig(
+        projects=projects,
+        default_project=value.get("default_project"),
+        max_loaded_projects=int(value.get("max_loaded_projects", 0)),
+        idle_timeout=float(value.get("idle_timeout", 0)),
+        autosave_interval=float(value.get("autosave_interval", 300)),
+        jobs=int(value.get("jobs", 1)),
+        source_cache=get_path(value.get("source_cache"), base_path) if value.get("source_cache") else None,
+        watch_source=bool(value.get("watch_source", False)),
+        watch_interval=float(value.get("watch_interval", 2.0)),
+    )
+
+
+def get_project_config(value: Dict[str, Any], base_path: str) -> ProjectConfig:
+    """Get the config of a project, paths are checked
+    """
+    name = value.get("name")
+    if not name or not isinstance(name, str) or "/" in name:
+        raise ValueError("Invalid project name [%s]" % name)
+    source_paths = [get_path(path, base_path) for path in value.get("source_paths") or []]
+    if not source_paths:
+        raise ValueError("Require at least 1 source path of project [%s]" % name)
+    for source_path in source_paths:
+        if not os.path.isdir(source_path) and not os.path.isfile(source_path):
+            raise ValueError("Source path [%s] of project [%s] not exist" % (source_path, name))
+    source_language = value.get("source_language")
+    if source_language is not None and source_language not in LanguageNames:
+        raise ValueError("Invalid source language [%s] of project [%s]" % (source_language, name))
+    default_target_language = value.get("default_target_language", "simp_chinese")
+    if default_target_language not in LanguageNames:
+        raise ValueError("Invalid default target language [%s] of project [%s]" % (default_target_language, name))
+    data_file = get_path(value.get("data_file"), base_path)
+    if not os.path.isdir(os.path.dirname(data_file)):
+        raise ValueError("Parent directory of data file [%s] of project [%s] not exist" % (data_file, name))
+    output_path = get_path(value.get("output_path"), base_path)
+    if not os.path.isdir(output_path):
+        raise ValueError("Output directory [%s] of project [%s] not exist" % (output_path, name))
+    build_none_translated_key = bool(value.get("build_none_translated_key", False))
+    build_targets = [BuildTarget(name, output_path, None, build_none_translated_key)]
+    build_targets.extend(get_build_target(target, base_path) for target in value.get("targets") or [])
+    return ProjectConfig(
+        name=name,
+        source_paths=source_paths,
+        source_language=source_language,
+        data_file=data_file,
+        output_path=output_path,
+        default_target_language=default_target_language,
+        build_none_translated_key=build_none_translated_key,
+        disable_journal=bool(value.get("disable_journal", False)),
+        journal_compact_size=int(value.get("journal_compact_size", 10000)),
+        build_targets=build_targets,
+    )
+
+
+def get_path(path: str | None, base_path: str) -> str:
+    """Get the absolute path of a path relative to base path
+    """
+    if not path or not isinstance(path, str):
+        raise ValueError("Invalid path [%s]" % path)
+    return os.path.abspath(os.path.join(base_path, os.path.expanduser(path)))
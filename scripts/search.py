@@ -0,0 +1,97 @@
+# encoding=utf-8
+
+""" Search
+    Author: lipixun
+    Created Time : 2024-03-20 10:12:41
+
+    File Name: search.py
+    Description:
+
+"""
+from typing import Dict, Iterable, Set, Tuple
+
+# The length of grams in the inverted index
+GramSize = 3
+
+
+class SearchIndex(object):
+    """Case insensitive substring search index (n-gram inverted index)
+    """
+
+    def __init__(self) -> None:
+        """Create a new SearchIndex
+        """
+        self._texts: Dict[str, str] = {}            # key to lowercased text
+        self._postings: Dict[str, Set[str]] = {}    # gram to keys
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def build(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Build the index from (key, text) pairs
+        """
+        for key, text in items:
+            self.set(key, text)
+
+    def set(self, key: str, text: str | None) -> None:
+        """Set (add or replace) the text of a key
+        """
+        text = text.lower() if text else ""
+        old_text = self._texts.get(key)
+        if old_text == text:
+            return
+        if old_text is not None:
+            self.remove(key)
+        self._texts[key] = text
+        for gram in self._get_grams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = {key}
+            else:
+                postings.add(key)
+
+    def remove(self, key: str) -> None:
+        """Remove a key
+        """
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._get_grams(text):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(self, query: str) -> Set[str]:
+        """Search keys whose text contains the query (case insensitive)
+        """
+        query = query.lower()
+        if not query:
+            return set(self._texts.keys())
+        if len(query) < GramSize:
+            # Too short to use the index, scan all texts
+            return {key for key, text in self._texts.items() if query in text}
+        # Intersect postings, start from the smallest one
+        postings_list = []
+        for gram in self._get_grams(query):
+            postings = self._postings.get(gram)
+            if not postings:
+                return set()
+            postings_list.append(postings)
+        postings_list.sort(key=len)
+        candidates = set(postings_list[0])
+        for postings in postings_list[1:]:
+            candidates.intersection_update(postings)
+            if not candidates:
+                return candidates
+        # Verify candidates since grams may not be adjacent
+        if len(postings_list) == 1 and len(query) == GramSize:
+            return candidates
+        texts = self._texts
+        return {key for key in candidates if query in texts[key]}
+
+    def _get_grams(self, text: str) -> Set[str]:
+        """Get grams of a text
+        """
+        return {text[i:i + GramSize] for i in range(len(text) - GramSize + 1)}
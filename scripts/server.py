@@ -8,26 +8,31 @@
     Description:
 
 """
-from typing import Any, Dict
+from typing import Any, Callable, ContextManager, Dict, List
 
 import os
 import os.path
 
+from bisect import bisect_right
+from contextlib import nullcontext
 from datetime import datetime
+from time import perf_counter
 
-from bottle import HTTPError, abort, get, post, request, response, run, static_file, template, TEMPLATE_PATH
+from bottle import HTTPResponse, ServerAdapter, abort, get, post, redirect, request, response, run, static_file, template, TEMPLATE_PATH
 
-from localization import LocalizationManager
-from translation import TranslationManager
+from httpcache import StaticFiles, compress, get_accepted_encoding, get_etag, match_etag, CompressMinSize
+from job import Job, JobStates, JobWorker
+from lock import ReadWriteLock
+from metrics import Sample, gMetrics, profile
+from project import Project, ProjectRegistry, RegistryConfig, get_project_config, load_registry_config
+from translation import TranslationOperation
 from utils import json, LanguageNames
+from validator import validate_value
 
-gName: str | None = None
-gLocalizationManager: LocalizationManager | None = None
-gTranslationManager: TranslationManager | None = None
-gTranslationDataFile: str | None = None
-gDefaultTargetLanguage: str | None = None
-gBuildOutputPath: str | None = None
-gBuildNoneTranslatedKey: bool = False
+gRegistry: ProjectRegistry | None = None
+gLock = ReadWriteLock()                 # Requests which only read projects hold the read lock, others hold the write lock
+gJobWorker = JobWorker()                # Run save and build in background
+gProfilePath: str | None = None         # Requests with `profile=1` query are profiled into this directory if set
 
 # Path
 WebPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web")
@@ -35,59 +40,179 @@ StaticPath = os.path.join(WebPath, "static")
 TemplatePath = os.path.join(WebPath, "views")
 TEMPLATE_PATH.insert(0, TemplatePath)
 
+gStaticFiles = StaticFiles(StaticPath)
+
+gMetrics.describe("http_request_seconds", "histogram", "Seconds of api requests by handler and status (error means the handler failed)")
+gMetrics.describe("job_seconds", "histogram", "Seconds of background jobs by name")
+
+# Search scopes of the key query
+SearchScopes = ["key", "source", "translation", "all"]
+# Key state names, in the order of buckets returned by `TranslationManager.get_translation_keys`
+KeyStateNames = ["new", "changed", "done", "skipped"]
+# Key page size
+DefaultKeyPageSize = 100
+MaxKeyPageSize = 1000
+# Suggestion size
+DefaultSuggestionSize = 5
+MaxSuggestionSize = 50
+# Validation issue page size
+DefaultIssuePageSize = 100
+MaxIssuePageSize = 1000
+# Job page size
+MaxJobPageSize = 100
+# Max operations of a batch
+MaxOperationSize = 100000
+# Supported WSGI servers, names other than threading are bottle's server adapters
+WSGIServerNames = ["threading", "wsgiref", "waitress", "cheroot", "paste"]
+
+
+class ThreadingWSGIRefServer(ServerAdapter):
+    """The wsgiref server which handles each request in a thread
+    """
+
+    def run(self, handler):
+        from socketserver import ThreadingMixIn
+        from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+        class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+            daemon_threads = True
+
+        handler_class = WSGIRequestHandler
+        if self.quiet:
+            class QuietHandler(WSGIRequestHandler):
+                def log_request(*args, **kwargs):
+                    pass
+            handler_class = QuietHandler
 
-def json_response(f):
-    """Wrap as a json response
+        server = make_server(self.host, self.port, handler, ThreadingWSGIServer, handler_class)
+        server.serve_forever()
+
+
+def json_response(func=None, *, write: bool = False):
+    """Wrap as a json response. The requested project is loaded before the handler is called
+    Args:
+        write: Hold the write lock instead of the read lock, if the handler changes projects
     """
-    def wrapped_func(*args, **kwargs):
-        try:
-            result = f(*args, **kwargs)
-            response.add_header("Content-Type", "application/json")
-            return json.dumps({"ok": True, "data": result})
-        except HTTPError:
-            raise
-        except Exception as error:
-            response.add_header("Content-Type", "application/json")
-            return json.dumps({"ok": False, "message": str(error)})
-    return wrapped_func
+    def decorator(f):
+        def wrapped_func(*args, **kwargs):
+            start_time = perf_counter()
+            status = "200"
+            try:
+                with get_request_profiler(f.__name__):
+                    load_project(kwargs.get("project_name"))
+                    with gLock.write_lock if write else gLock.read_lock:
+                        result = f(*args, **kwargs)
+                    return write_json({"ok": True, "data": result})
+            except HTTPResponse as error:
+                status = str(error.status_code)
+                raise
+            except Exception as error:
+                status = "error"
+                # Errors are not cached
+                response.headers.pop("ETag", None)
+                return write_json({"ok": False, "message": str(error)})
+            finally:
+                gMetrics.observe("http_request_seconds", perf_counter() - start_time, handler=f.__name__, status=status)
+        return wrapped_func
+    return decorator(func) if func is not None else decorator
 
 
 @get("/")
-def handle_index():
+@get("/p/<project_name>/")
+def handle_index(project_name=None):
     """Bottle: Index page
     """
-    assert gTranslationManager
+    assert gRegistry
+
+    load_project(project_name)
+    with gLock.read_lock:
+        project = get_project(project_name)
+        language = get_default_language(project, request.query.language)  # type: ignore
+        render_args: Dict[str, Any] = {
+            "language": language,
+            "languages": LanguageNames,
+            "project": project.name,
+            "projects": gRegistry.project_names,
+            "base_path": "/p/%s" % project_name if project_name else "",
+            "asset_url": gStaticFiles.get_url,
+        }
 
-    language = get_default_language(request.query.language)  # type: ignore
+    return template("index", **render_args)
 
-    render_args: Dict[str, Any] = {
-        "language": language,
-        "languages": LanguageNames
-    }
 
-    return template("index", **render_args)
+@get("/p/<project_name>")
+def handle_project_index(project_name):
+    """Bottle: Redirect to the index page of a project
+    """
+    redirect("/p/%s/" % project_name)
+
+
+@get("/_/projects")
+@json_response
+def handle_get_projects():
+    """Bottle: Get projects
+    """
+    assert gRegistry
+
+    return {
+        "default_project": gRegistry.default_project_name,
+        "projects": [
+            {
+                "name": name,
+                "loaded": gRegistry.is_loaded(name),
+            } for name in gRegistry.project_names
+        ],
+    }
 
 
 @get("/_/keys")
+@get("/p/<project_name>/_/keys")
 @json_response
-def handle_get_keys():
+def handle_get_keys(project_name=None):
     """Bottle: Get keys
     """
-    assert gTranslationManager
+    project = get_project(project_name)
 
     # Get keys
-    language = get_default_language(request.query.language)  # type: ignore
-    new_keys, changed_keys, done_keys, skipped_keys = gTranslationManager.get_translation_keys(language)
-
-    # Filter keys
+    language = get_default_language(project, request.query.language)  # type: ignore
+    check_not_modified(project, language)
     query = request.query.query  # type: ignore
     if query:
-        query = query.lower()
         # Filter keys by query
-        new_keys = [k for k in new_keys if k.lower().find(query) >= 0]
-        changed_keys = [k for k in changed_keys if k.lower().find(query) >= 0]
-        done_keys = [k for k in done_keys if k.lower().find(query) >= 0]
-        skipped_keys = [k for k in skipped_keys if k.lower().find(query) >= 0]
+        scope = request.query.scope or "key"  # type: ignore
+        if scope not in SearchScopes:
+            abort(400, "Invalid search scope")
+        matched_keys = set()
+        if scope in ("key", "all"):
+            matched_keys.update(project.localization_manager.search_keys(query))
+        if scope in ("source", "all"):
+            matched_keys.update(project.localization_manager.search_values(query))
+        if scope in ("translation", "all"):
+            matched_keys.update(project.translation_manager.search_translations(query, language))
+        buckets = project.translation_manager.get_translation_key_buckets(language, matched_keys)
+    else:
+        buckets = project.translation_manager.get_translation_key_buckets(language)
+    new_keys, changed_keys, done_keys, skipped_keys = buckets
+
+    # Return one page of keys of a state if required
+    state = request.query.state  # type: ignore
+    if state:
+        if state not in KeyStateNames:
+            abort(400, "Invalid key state")
+        bucket = buckets[KeyStateNames.index(state)]
+        after = request.query.after  # type: ignore
+        if after:
+            # Keys after a key, which are still right when keys before it have moved to other states
+            offset = bisect_right(bucket, after)
+        else:
+            offset = get_int_query("offset", 0, 0, None)
+        limit = get_int_query("limit", DefaultKeyPageSize, 1, MaxKeyPageSize)
+        return {
+            "sizes": {name: len(bucket) for name, bucket in zip(KeyStateNames, buckets)},
+            "state": state,
+            "offset": offset,
+            "keys": bucket[offset:offset+limit],
+        }
 
     return {
         "new_keys": new_keys,
@@ -98,23 +223,24 @@ def handle_get_keys():
 
 
 @get("/_/translation")
+@get("/p/<project_name>/_/translation")
 @json_response
-def handle_get_translation():
+def handle_get_translation(project_name=None):
     """Bottle: Get translation
     """
-    assert gLocalizationManager
-    assert gTranslationManager
+    project = get_project(project_name)
 
     key = request.query.key  # type: ignore
     language = request.query.language  # type: ignore
 
     if not language:
-        language = get_default_language()
+        language = get_default_language(project)
     if not key or language not in LanguageNames:
         return
+    check_not_modified(project, language)
 
     result = {}
-    localization_item = gLocalizationManager.get(key)
+    localization_item = project.localization_manager.get(key)
     if localization_item:
         result["source"] = {
             "key": localization_item.key,
@@ -126,23 +252,78 @@ def handle_get_translation():
             ]
         }
 
-    translation_item = gTranslationManager.get(key, language)
+    translation_item = project.translation_manager.get(key, language)
     if translation_item:
         result["translation"] = {
             "value": translation_item.translate_value,
             "skipped": translation_item.skipped,
             "update_time": datetime.fromtimestamp(translation_item.update_time).strftime("%Y-%m-%d %H:%M:%S") if translation_item.update_time else "Never",
+            "issues": [
+                {
+                    "kind": issue.kind,
+                    "missing": issue.missing,
+                    "unexpected": issue.unexpected,
+                } for issue in validate_value(key, localization_item.values[0].value, translation_item.translate_value)
+            ] if localization_item and not translation_item.skipped else [],
         }
+        delta = project.translation_manager.get_delta(key, language)
+        if delta is not None:
+            # The original value has changed since translated
+            result["delta"] = {
+                "original_value": translation_item.original_value,
+                "trivial": delta.trivial,
+                "segments": [
+                    {
+                        "op": op,
+                        "text": text,
+                    } for op, text in delta.segments
+                ],
+            }
 
     return result
 
 
-@post("/_/translation")
+@get("/_/suggestions")
+@get("/p/<project_name>/_/suggestions")
 @json_response
-def handle_submit_translation():
+def handle_get_suggestions(project_name=None):
+    """Bottle: Get translation suggestions of a key (or a text) from translated items of which the original value is the same or similar
+    """
+    project = get_project(project_name)
+
+    key = request.query.key  # type: ignore
+    text = request.query.text  # type: ignore
+    language = get_default_language(project, request.query.language)  # type: ignore
+    limit = get_int_query("limit", DefaultSuggestionSize, 1, MaxSuggestionSize)
+    check_not_modified(project, language)
+
+    if not text:
+        if not key:
+            abort(400, "Require key or text")
+        text = project.localization_manager.get_value(key)
+        if text is None:
+            abort(400, "Source localisation not found")
+
+    return {
+        "text": text,
+        "suggestions": [
+            {
+                "key": suggestion.key,
+                "source": suggestion.source,
+                "translation": suggestion.translation,
+                "score": round(suggestion.score, 4),
+            } for suggestion in project.translation_manager.suggest_translations(text, language, limit, exclude_key=key or None)
+        ],
+    }
+
+
+@post("/_/translation")
+@post("/p/<project_name>/_/translation")
+@json_response(write=True)
+def handle_submit_translation(project_name=None):
     """Bottle: Submit translation
     """
-    assert gTranslationManager
+    project = get_project(project_name)
 
     if not request.json:
         abort(400, "Require json payload")
@@ -155,7 +336,7 @@ def handle_submit_translation():
     if not isinstance(key, str):
         abort(400, "Key must be string")
     if not language:
-        language = get_default_language()
+        language = get_default_language(project)
     if language not in LanguageNames:
         abort(400, "Invalid language")
     if value is not None and not isinstance(value, str):
@@ -164,69 +345,439 @@ def handle_submit_translation():
         skipped = skipped.lower() == "true" if skipped else False
     # Add or delete the translation
     if value or skipped:
-        gTranslationManager.add(key, language, value, skipped)
+        project.translation_manager.add(key, language, value, skipped)
     else:
-        gTranslationManager.delete(key, language)
+        project.translation_manager.delete(key, language)
+    project.compact_journal_if_needed(gLock.write_lock)
+
+
+@post("/_/translations")
+@post("/p/<project_name>/_/translations")
+@json_response(write=True)
+def handle_submit_translations(project_name=None):
+    """Bottle: Submit a batch of translation operations, which are applied atomically
+    """
+    project = get_project(project_name)
+
+    if not request.json:
+        abort(400, "Require json payload")
+    operations = request.json.get("operations")  # type: ignore
+    if not isinstance(operations, list) or not operations:
+        abort(400, "Require operations")
+    if len(operations) > MaxOperationSize:
+        abort(400, "Too many operations")
+    default_language = get_default_language(project)
+    translation_operations = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            abort(400, "Operation #%d must be object" % index)
+        key = operation.get("key")
+        value = operation.get("value")
+        if not key or not isinstance(key, str):
+            abort(400, "Require key of operation #%d" % index)
+        if value is not None and not isinstance(value, str):
+            abort(400, "Value of operation #%d must be null or string" % index)
+        translation_operations.append(TranslationOperation(operation.get("op"), key, operation.get("language") or default_language, value))
+    size = project.translation_manager.apply(translation_operations)
+    project.compact_journal_if_needed(gLock.write_lock)
+    return {
+        "changed": size,
+    }
+
+
+@post("/_/auto_skip")
+@post("/p/<project_name>/_/auto_skip")
+@json_response(write=True)
+def handle_auto_skip(project_name=None):
+    """Bottle: Skip new and changed keys which don't need translation, or only classify them if dry run
+    """
+    project = get_project(project_name)
+
+    payload = request.json or {}  # type: ignore
+    language = get_default_language(project, payload.get("language"))
+    rules = payload.get("rules") or None
+    dry_run = payload.get("dry_run") is True
+    if rules is not None and (not isinstance(rules, list) or not all(isinstance(rule, str) for rule in rules)):
+        abort(400, "Rules must be a list of string")
+    if dry_run:
+        result = project.translation_manager.classify_skip_keys(language, rules)
+    else:
+        result = project.translation_manager.auto_skip(language, rules)
+        project.compact_journal_if_needed(gLock.write_lock)
+    return {
+        "language": language,
+        "dry_run": dry_run,
+        "size": len(result.matches),
+        "elapsed": round(result.elapsed, 4),
+        "rules": [
+            {
+                "name": name,
+                "count": stats.count,
+                "elapsed": round(stats.elapsed, 4),
+            } for name, stats in result.stats.items()
+        ],
+        "keys": sorted(result.matches.keys())[:MaxKeyPageSize] if dry_run else [],
+    }
+
+
+@post("/_/accept_trivial_changes")
+@post("/p/<project_name>/_/accept_trivial_changes")
+@json_response(write=True)
+def handle_accept_trivial_changes(project_name=None):
+    """Bottle: Accept changed keys of which only whitespaces or punctuations of the original value changed, or only list them if dry run
+    """
+    project = get_project(project_name)
+
+    payload = request.json or {}  # type: ignore
+    language = get_default_language(project, payload.get("language"))
+    dry_run = payload.get("dry_run") is True
+    if dry_run:
+        keys = project.translation_manager.get_trivial_changed_keys(language)
+    else:
+        keys = project.translation_manager.accept_trivial_changes(language)
+        project.compact_journal_if_needed(gLock.write_lock)
+    return {
+        "language": language,
+        "dry_run": dry_run,
+        "size": len(keys),
+        "keys": keys[:MaxKeyPageSize] if dry_run else [],
+    }
+
+
+@get("/_/validate")
+@get("/p/<project_name>/_/validate")
+@json_response
+def handle_validate(project_name=None):
+    """Bottle: Validate that translations keep references, icons, formatting codes and line breaks of source values
+    """
+    project = get_project(project_name)
+
+    language = get_default_language(project, request.query.language)  # type: ignore
+    offset = get_int_query("offset", 0, 0, None)
+    limit = get_int_query("limit", DefaultIssuePageSize, 1, MaxIssuePageSize)
+    check_not_modified(project, language)
+
+    result = project.translation_manager.validate(language)
+    return {
+        "checked": result.checked,
+        "elapsed": round(result.elapsed, 4),
+        "count": len(result.issues),
+        "offset": offset,
+        "issues": [
+            {
+                "key": issue.key,
+                "kind": issue.kind,
+                "missing": issue.missing,
+                "unexpected": issue.unexpected,
+            } for issue in result.issues[offset:offset+limit]
+        ],
+    }
 
 
 @post("/_/save")
+@post("/p/<project_name>/_/save")
 @json_response
-def handle_save():
-    """Bottle: save
+def handle_save(project_name=None):
+    """Bottle: Save in background
     """
-    assert gTranslationManager
+    project = get_project(project_name)
 
-    gTranslationManager.save(gTranslationDataFile)
+    return {
+        "job": submit_save_job(project).to_dict(),
+    }
 
 
 @post("/_/save_and_build")
+@post("/p/<project_name>/_/save_and_build")
 @json_response
-def handle_save_and_build():
-    """Bottle: Save and build
+def handle_save_and_build(project_name=None):
+    """Bottle: Save and build in background
+    """
+    project = get_project(project_name)
+
+    def save_and_build(job: Job):
+        project.translation_manager.save(project.config.data_file, lock=gLock.write_lock)
+        job.set_progress(0.2)
+        built_files = project.translation_manager.build_targets(
+            project.config.build_targets, lock=gLock.read_lock, progress=lambda progress: job.set_progress(0.2 + 0.8 * progress))
+        built_languages = list(dict.fromkeys(language for _, language in built_files))
+        # Issues of written translations, see /_/validate
+        issues = {}
+        for language in built_languages:
+            with gLock.read_lock:
+                issues[language] = len(project.translation_manager.validate(language).issues)
+        return {
+            "built_languages": built_languages,
+            "built_files": [{"target": name, "language": language} for name, language in built_files],
+            "issues": issues,
+        }
+
+    return {
+        "job": submit_job("save_and_build", project, save_and_build, ["save_and_build"]).to_dict(),
+    }
+
+
+@get("/_/jobs")
+@get("/p/<project_name>/_/jobs")
+def handle_get_jobs(project_name=None):
+    """Bottle: Get background jobs (of a project if requested under its path), the latest first
     """
-    assert gTranslationManager
-    assert gBuildOutputPath
-    assert gName
+    assert gRegistry
+
+    if project_name is not None and not gRegistry.has(project_name):
+        abort(404, "Project not found")
+    state = request.query.state  # type: ignore
+    if state and state not in JobStates:
+        abort(400, "Invalid job state")
+    limit = get_int_query("limit", 20, 1, MaxJobPageSize)
+    jobs = [job for job in reversed(gJobWorker.list(project_name)) if not state or job.state == state]
+
+    return write_json({"ok": True, "data": {
+        "jobs": [job.to_dict() for job in jobs[:limit]],
+    }})
+
+
+@get("/_/jobs/<job_id:int>")
+@get("/p/<project_name>/_/jobs/<job_id:int>")
+def handle_get_job(job_id, project_name=None):
+    """Bottle: Get a background job (of a project if requested under its path)
+    """
+    assert gRegistry
+
+    if project_name is not None and not gRegistry.has(project_name):
+        abort(404, "Project not found")
+    job = gJobWorker.get(job_id)
+    if job is None or (project_name is not None and job.project != project_name):
+        abort(404, "Job not found")
+    return write_json({"ok": True, "data": job.to_dict()})
+
+
+@get("/_/source")
+@get("/p/<project_name>/_/source")
+@json_response
+def handle_get_source(project_name=None):
+    """Bottle: Get source state, the web page polls it to know whether the source has been reloaded (and whether data has been saved)
+    """
+    project = get_project(project_name)
+
+    return {
+        "dirty": project.translation_manager.dirty,
+        "version": project.source.version,
+        "update_time": project.source.update_time.strftime("%Y-%m-%d %H:%M:%S") if project.source.update_time else None,
+    }
+
 
-    gTranslationManager.save(gTranslationDataFile)
-    gTranslationManager.build(gName, gBuildOutputPath, gBuildNoneTranslatedKey)
+@get("/_/metrics")
+def handle_get_metrics():
+    """Bottle: Get metrics in the prometheus text format
+    """
+    response.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+    return gMetrics.render()
 
 
 @get("/<path:path>")
 def handle_static_file(path):
-    """Bottle: Get static file
+    """Bottle: Get static file. Versioned urls (see `StaticFiles.get_url`) are cached forever
+    """
+    result = static_file(path, root=StaticPath)
+    if result.status_code != 200:
+        return result
+    result.set_header("Cache-Control", "public, max-age=31536000, immutable" if request.query.v else "no-cache")  # type: ignore
+    encoding = get_accepted_encoding(request.get_header("Accept-Encoding"))
+    result.set_header("Vary", "Accept-Encoding")
+    if encoding and request.method == "GET" and "HTTP_RANGE" not in request.environ:
+        body = gStaticFiles.get_compressed(path, encoding)
+        if body is not None:
+            result.body.close()
+            result.body = body
+            result.set_header("Content-Encoding", encoding)
+            result.set_header("Content-Length", str(len(body)))
+            result.headers.pop("Accept-Ranges", None)
+    return result
+
+
+def load_project(name: str | None) -> None:
+    """Load a project if it's not loaded, which requires the write lock
     """
-    return static_file(path, root=StaticPath)
+    assert gRegistry
+
+    if name is not None and not gRegistry.has(name):
+        abort(404, "Project not found")
+    with gLock.read_lock:
+        if gRegistry.get_loaded(name) is not None:
+            return
+    with gLock.write_lock:
+        gRegistry.get(name)
 
 
-def get_default_language(language: str | None = None):
+def get_project(name: str | None) -> Project:
+    """Get a loaded project (the default one if name is not specified). MUST be called with the lock held
+    """
+    assert gRegistry
+
+    project = gRegistry.get_loaded(name)
+    if project is None:
+        # Unloaded after loading, which is rare
+        abort(503, "Project is not loaded, please retry")
+    return project
+
+
+def submit_save_job(project: Project, name: str = "save") -> Job:
+    """Submit a job to save a project. MUST be called with the lock held
+    """
+    def save(job: Job):
+        project.translation_manager.save(project.config.data_file, lock=gLock.write_lock)
+
+    return submit_job(name, project, save, ["save", "autosave", "save_and_build"])
+
+
+def submit_job(name: str, project: Project, func: Callable[[Job], Any], coalesce_names: List[str] | None = None) -> Job:
+    """Submit a background job of a project, the project won't be unloaded until the job has finished. MUST be called with the lock held
+    Args:
+        coalesce_names: Return the pending job of the project with one of these names instead if exists,
+            which hasn't started yet so it will see all changes made before this submission
+    """
+    def run(job: Job):
+        try:
+            with gMetrics.timer("job_seconds", name=name):
+                return func(job)
+        finally:
+            project.remove_job()
+
+    # Counted before submitting, so the project is never unloaded while the job is pending
+    project.add_job()
+    job, submitted = gJobWorker.submit(name, project.name, run, coalesce_names)
+    if not submitted:
+        project.remove_job()
+    return job
+
+
+def write_json(value: Any) -> str | bytes:
+    """Get the json response body, which is compressed if large and the client accepts
+    """
+    response.set_header("Content-Type", "application/json")
+    response.set_header("Vary", "Accept-Encoding")
+    body = json.dumps(value)
+    if len(body) < CompressMinSize:
+        return body
+    encoding = get_accepted_encoding(request.get_header("Accept-Encoding"))
+    if not encoding:
+        return body
+    response.set_header("Content-Encoding", encoding)
+    return compress(body.encode("utf-8"), encoding)
+
+
+def check_not_modified(project: Project, language: str) -> None:
+    """Set the ETag of a response which only depends on the data of the language and the source,
+    and respond 304 if the client has the same one. MUST be called with the lock held and before the response is built
+    """
+    etag = get_etag("%x" % int(project.load_time * 1000), language,
+                    project.translation_manager.get_data_version(language), project.translation_manager.source_version)
+    response.set_header("ETag", etag)
+    response.set_header("Cache-Control", "no-cache")
+    if match_etag(request.get_header("If-None-Match"), etag):
+        raise HTTPResponse(status=304, headers={"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"})
+
+
+def get_request_profiler(name: str) -> ContextManager:
+    """Get the profiler of a request, which profiles the request if profiling is enabled and the request has `profile=1` query
+    """
+    if not gProfilePath or request.query.profile != "1":  # type: ignore
+        return nullcontext()
+    return profile(os.path.join(gProfilePath, "%s-%s" % (name, datetime.now().strftime("%Y%m%d-%H%M%S-%f"))))
+
+
+def collect_metrics() -> List[Sample]:
+    """Collect gauges of loaded projects and jobs
+    """
+    assert gRegistry
+
+    key_samples = []
+    journal_samples = []
+    with gLock.read_lock:
+        projects = gRegistry.loaded_projects
+        for project in projects:
+            for language, sizes in sorted(project.translation_manager.get_key_state_sizes().items()):
+                for state, size in zip(KeyStateNames, sizes):
+                    key_samples.append(((("language", language), ("project", project.name), ("state", state)), size))
+            journal_samples.append(((("project", project.name),), project.translation_manager.journal_size))
+    job_counts = {state: 0 for state in JobStates}
+    for job in gJobWorker.list():
+        job_counts[job.state] += 1
+    return [
+        ("translation_keys", "gauge", "The number of keys of each state of languages which have been viewed", key_samples),
+        ("translation_journal_records", "gauge", "The number of records in the journal", journal_samples),
+        ("projects_loaded", "gauge", "The number of loaded projects", [((), len(projects))]),
+        ("jobs", "gauge", "The number of kept jobs of each state", [((("state", state),), count) for state, count in job_counts.items()]),
+    ]
+
+
+def get_int_query(name: str, default: int, min_value: int, max_value: int | None) -> int:
+    """Get an integer query parameter
+    """
+    value = request.query.get(name)  # type: ignore
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400, "Query [%s] must be integer" % name)
+    if value < min_value or (max_value is not None and value > max_value):
+        abort(400, "Query [%s] out of range" % name)
+    return value
+
+
+def get_default_language(project: Project, language: str | None = None):
     """Get default language
     """
     if language in LanguageNames:
         return language
-    return gDefaultTargetLanguage or "simp_chinese"  # Hard code chinese as fallback language
+    return project.config.default_target_language or "simp_chinese"  # Hard code chinese as fallback language
 
 
 if __name__ == "__main__":
 
+    import atexit
+    import tracemalloc
+
     from argparse import ArgumentParser
 
     def get_args():
         """Get args
         """
         parser = ArgumentParser(description="Stellaris translation server")
-        parser.add_argument("--name", dest="name", required=True, help="Name of this translation. This name will be used in building progress.")
-        parser.add_argument("--source-path", dest="source_paths", required=True, default=[], action="append",
+        parser.add_argument("--config", dest="config", default=None,
+                            help="The config file of projects, see project.py for its format. Serve multiple projects in this process, project arguments are ignored if specified")
+        parser.add_argument("--name", dest="name", help="Name of this translation. This name will be used in building progress.")
+        parser.add_argument("--source-path", dest="source_paths", default=[], action="append",
                             help="The source path, either a directory or a file. Usually [localisation] directory of a mod or a sub directory of a specific language. You MUST ONLY load file(s) for 1 language. You can specify multiple source paths")
-        parser.add_argument("--data-file", dest="data_file", required=True, help="The file which stores the translation data")
+        parser.add_argument("--data-file", dest="data_file", help="The file which stores the translation data")
         parser.add_argument("--source-language", dest="source_language", default=None, choices=LanguageNames,
                             help="Source language. Only preserve the value of specified language. Will preserve all languages if not specified. (I highly recommend to set this flag in order to avoid unexpected language misusage)")
         parser.add_argument("--default-target-language", dest="default_target_language",
                             default="simp_chinese", choices=LanguageNames, help="Default target language")
-        parser.add_argument("--output-path", dest="output_path", required=True,
+        parser.add_argument("--output-path", dest="output_path",
                             help="The build output directory path. Usually [localisation] of your mod")
         parser.add_argument("--build-none-translated-key", dest="build_none_translated_key", default=False,
                             action="store_true", help="Write none-translated key when building")
+        parser.add_argument("--jobs", dest="jobs", default=1, type=int,
+                            help="The number of processes to parse source files, 1 by default. 0 means the number of CPUs")
+        parser.add_argument("--source-cache", dest="source_cache", default=None,
+                            help="The file which caches parsed source files, source files will be parsed every time if not specified")
+        parser.add_argument("--watch-source", dest="watch_source", default=False, action="store_true",
+                            help="Watch source paths and reload changed files automatically")
+        parser.add_argument("--watch-interval", dest="watch_interval", default=2.0, type=float,
+                            help="Interval in seconds of checking source changes, 2 by default")
+        parser.add_argument("--disable-journal", dest="disable_journal", default=False, action="store_true",
+                            help="Do not append every change to the journal of data file. Changes will be lost if not saved")
+        parser.add_argument("--journal-compact-size", dest="journal_compact_size", default=10000, type=int,
+                            help="Fold the journal into the data file in background when it has more records than this size, 10000 by default")
+        parser.add_argument("--autosave-interval", dest="autosave_interval", default=300, type=float,
+                            help="Save changed data in background every this many seconds, 300 by default and 0 to disable")
+        parser.add_argument("--server", dest="server", default="threading", choices=WSGIServerNames,
+                            help="The WSGI server, threading by default which handles each request in a thread. wsgiref is single threaded. Others require the corresponding package")
+        parser.add_argument("--profile", dest="profile_path",
+                            help="Enable profiling of requests with `profile=1` query, cProfile stats and tracemalloc snapshots are dumped into this directory")
         parser.add_argument("--run-host", dest="run_host", default="0.0.0.0", help="Web server host, 0.0.0.0 by default")
         parser.add_argument("--run-port", dest="run_port", default=8080, type=int, help="Web server port, 8080 by default")
         return parser.parse_args()
@@ -234,46 +785,55 @@ if __name__ == "__main__":
     def main() -> None:
         """The main entry
         """
-        global gName
-        global gLocalizationManager
-        global gTranslationManager
-        global gTranslationDataFile
-        global gDefaultTargetLanguage
-        global gBuildOutputPath
-        global gBuildNoneTranslatedKey
+        global gRegistry, gProfilePath
 
         args = get_args()
 
-        gName = args.name
-        gDefaultTargetLanguage = args.default_target_language
-        gBuildNoneTranslatedKey = args.build_none_translated_key
-
-        # Source
-        source_paths = []
-        if not args.source_paths:
-            raise ValueError("Require at least 1 source path")
-        for source_path in args.source_paths:
-            source_path = os.path.abspath(source_path)
-            if not os.path.isdir(source_path) and not os.path.isfile(source_path):
-                raise ValueError("Source path [%s] not exist" % source_path)
-            source_paths.append(source_path)
-
-        data_file = os.path.abspath(args.data_file)
-        if not os.path.isdir(os.path.dirname(data_file)):
-            raise ValueError("Parent directory of data file [%s] not exist" % data_file)
-        gTranslationDataFile = args.data_file
-
-        output_path = os.path.abspath(args.output_path)
-        if not os.path.isdir(output_path):
-            raise ValueError("Output directory [%s] not exist" % output_path)
-        gBuildOutputPath = output_path
-
-        gLocalizationManager = LocalizationManager([args.source_language] if args.source_language else None)
-        for source_path in source_paths:
-            gLocalizationManager.load(source_path)
-        gTranslationManager = TranslationManager(gLocalizationManager)
-        gTranslationManager.load(data_file)
-
-        run(host=args.run_host, port=args.run_port)
+        if args.profile_path:
+            gProfilePath = os.path.abspath(args.profile_path)
+            os.makedirs(gProfilePath, exist_ok=True)
+            # Trace allocations as early as possible
+            tracemalloc.start()
+
+        if args.config:
+            config = load_registry_config(os.path.abspath(args.config))
+        else:
+            if not args.name or not args.data_file or not args.output_path:
+                raise ValueError("Require --name, --data-file and --output-path without --config")
+            config = RegistryConfig(
+                projects=[get_project_config({
+                    "name": args.name,
+                    "source_paths": args.source_paths,
+                    "source_language": args.source_language,
+                    "data_file": args.data_file,
+                    "output_path": args.output_path,
+                    "default_target_language": args.default_target_language,
+                    "build_none_translated_key": args.build_none_translated_key,
+                    "disable_journal": args.disable_journal,
+                    "journal_compact_size": args.journal_compact_size,
+                }, os.getcwd())],
+                default_project=None,
+                max_loaded_projects=0,
+                idle_timeout=0,
+                autosave_interval=args.autosave_interval,
+                jobs=args.jobs,
+                source_cache=os.path.abspath(args.source_cache) if args.source_cache else None,
+                watch_source=args.watch_source,
+                watch_interval=args.watch_interval,
+            )
+
+        gRegistry = ProjectRegistry(config, gLock.write_lock, gLock.read_lock)
+        atexit.register(gRegistry.close)
+        if not args.config:
+            # Load the only project at start
+            with gLock.write_lock:
+                gRegistry.get()
+        gMetrics.add_collector(collect_metrics)
+        gRegistry.start(autosave=lambda project: submit_save_job(project, "autosave"))
+        # Finish pending jobs before closing projects
+        gJobWorker.start()
+        atexit.register(gJobWorker.stop)
+
+        run(server=ThreadingWSGIRefServer if args.server == "threading" else args.server, host=args.run_host, port=args.run_port)
 
     main()
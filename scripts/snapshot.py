@@ -0,0 +1,262 @@
+# encoding=utf-8
+
+""" Snapshot
+    Author: lipixun
+    Created Time : 2024-04-04 20:12:45
+
+    File Name: snapshot.py
+    Description:
+
+        Binary snapshot of translation data, which is memory-mapped and read lazily so that loading
+        doesn't depend on the size of data. The json lines data file is still the source of truth,
+        use `translation.py convert` to convert between them.
+
+        Layout (little endian):
+
+            header      magic (8 bytes), version (u32), language count (u32)
+            languages   [name size (u32), name (utf-8), record count (u32), records offset (u64),
+                         hash slot count (u32), hash offset (u64)] * language count
+            records     [key offset (u64), original value offset (u64), translate value offset (u64),
+                         key size (u32), original value size (u32), translate value size (u32), flags (u32),
+                         update time (i64)] * record count of each language
+            hashes      [record index + 1 (u32), 0 means empty] * hash slot count of each language
+            heap        utf-8 strings, equal strings are stored once
+
+        Records of a language are sorted by the utf-8 bytes of key. Keys are found by an open addressing
+        hash table (crc32 of the utf-8 bytes, linear probing) of which the load factor is at most 0.5.
+
+"""
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+import os
+import sys
+import mmap
+import zlib
+import struct
+
+from array import array
+
+SnapshotMagic = b"STLTSNAP"
+SnapshotVersion = 1
+
+HeaderStruct = struct.Struct("<8sII")
+LanguageStruct = struct.Struct("<I")
+LanguageTableStruct = struct.Struct("<IQIQ")
+RecordStruct = struct.Struct("<QQQIIIIq")
+RecordKeyStruct = struct.Struct("<Q16xI")   # Only (key offset, key size) of a record
+HashSlotStruct = struct.Struct("<I")
+
+# Record flags
+FlagSkipped = 1
+FlagNoOriginalValue = 2     # The original value is None (written as null in json lines)
+
+
+class SnapshotTable(object):
+    """Records of a language in a snapshot
+    """
+
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int, hash_offset: int, hash_size: int) -> None:
+        """Create a new SnapshotTable
+        """
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+        self._hash_offset = hash_offset
+        self._hash_mask = hash_size - 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def find(self, key: str) -> int:
+        """Find the index of a key, returns -1 if not found
+        """
+        if not self._count:
+            return -1
+        data = key.encode("utf-8", "surrogatepass")
+        slot = zlib.crc32(data) & self._hash_mask
+        while True:
+            index, = HashSlotStruct.unpack_from(self._buffer, self._hash_offset + slot * HashSlotStruct.size)
+            if not index:
+                return -1
+            key_offset, key_size = RecordKeyStruct.unpack_from(self._buffer, self._offset + (index - 1) * RecordStruct.size)
+            if key_size == len(data) and self._buffer[key_offset:key_offset+key_size] == data:
+                return index - 1
+            slot = (slot + 1) & self._hash_mask
+
+    def get_key(self, index: int) -> str:
+        """Get the key of a record
+        """
+        key_offset, key_size = RecordKeyStruct.unpack_from(self._buffer, self._offset + index * RecordStruct.size)
+        return self._get_string(key_offset, key_size)
+
+    def get_record(self, index: int) -> Tuple[str | None, str, bool, int]:
+        """Get (original value, translate value, skipped, update time) of a record
+        """
+        _, original_offset, translate_offset, _, original_size, translate_size, flags, update_time = \
+            RecordStruct.unpack_from(self._buffer, self._offset + index * RecordStruct.size)
+        return (
+            self._get_string(original_offset, original_size) if not flags & FlagNoOriginalValue else None,
+            self._get_string(translate_offset, translate_size),
+            bool(flags & FlagSkipped),
+            update_time,
+        )
+
+    def iter_records(self) -> Iterator[Tuple[str, Tuple[str | None, str, bool, int]]]:
+        """Iterate (key, record) in order
+        """
+        for index in range(self._count):
+            yield self.get_key(index), self.get_record(index)
+
+    def _get_string(self, offset: int, size: int) -> str:
+        """Get a string in heap
+        """
+        return self._buffer[offset:offset+size].decode("utf-8", "surrogatepass")
+
+
+class SnapshotFile(object):
+    """A memory-mapped snapshot file. Only the header is read when opening
+    """
+
+    def __init__(self, filepath: str) -> None:
+        """Open a snapshot file
+        """
+        self._filepath = filepath
+        with open(filepath, "rb") as fd:
+            self._buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._tables = self._read_header()
+        except Exception:
+            self._buffer.close()
+            raise
+
+    @property
+    def filepath(self) -> str:
+        """Get file path
+        """
+        return self._filepath
+
+    @property
+    def languages(self) -> List[str]:
+        """Get languages
+        """
+        return list(self._tables.keys())
+
+    def get_table(self, language: str) -> SnapshotTable | None:
+        """Get records of a language
+        """
+        return self._tables.get(language)
+
+    def close(self) -> None:
+        """Close the file. Tables of this file MUST NOT be used after closed
+        """
+        self._buffer.close()
+
+    def _read_header(self) -> Dict[str, SnapshotTable]:
+        """Read header and language table
+        """
+        if len(self._buffer) < HeaderStruct.size:
+            raise ValueError("Invalid snapshot file [%s]" % self._filepath)
+        magic, version, language_count = HeaderStruct.unpack_from(self._buffer, 0)
+        if magic != SnapshotMagic:
+            raise ValueError("Invalid snapshot file [%s]" % self._filepath)
+        if version != SnapshotVersion:
+            raise ValueError("Unsupported snapshot version [%d] of file [%s]" % (version, self._filepath))
+        tables = {}
+        offset = HeaderStruct.size
+        for _ in range(language_count):
+            name_size, = LanguageStruct.unpack_from(self._buffer, offset)
+            offset += LanguageStruct.size
+            language = self._buffer[offset:offset+name_size].decode("utf-8")
+            offset += name_size
+            count, records_offset, hash_size, hash_offset = LanguageTableStruct.unpack_from(self._buffer, offset)
+            offset += LanguageTableStruct.size
+            tables[language] = SnapshotTable(self._buffer, records_offset, count, hash_offset, hash_size)
+        return tables
+
+
+def is_snapshot_file(filepath: str) -> bool:
+    """Check if a file is a snapshot file
+    """
+    try:
+        with open(filepath, "rb") as fd:
+            return fd.read(len(SnapshotMagic)) == SnapshotMagic
+    except OSError:
+        return False
+
+
+def write_snapshot_file(filepath: str, translation_data: Mapping[str, Mapping[str, Any]]) -> None:
+    """Write a snapshot file of translation data (language to key to TranslationValue)
+    Only translated or skipped items are written, the same as the json lines data file.
+    """
+    heap = bytearray()
+    heap_offsets: Dict[str, Tuple[int, int]] = {}   # string to (offset in heap, size)
+
+    def add_string(value: str) -> Tuple[int, int]:
+        """Add a string to heap
+        """
+        location = heap_offsets.get(value)
+        if location is None:
+            data = value.encode("utf-8", "surrogatepass")
+            location = heap_offsets[value] = (len(heap), len(data))
+            heap.extend(data)
+        return location
+
+    # Collect records
+    languages = []
+    for language, items in sorted(translation_data.items(), key=lambda p: p[0]):
+        records = []
+        for key, item in items.items():
+            if item.translate_value or item.skipped:
+                records.append((key.encode("utf-8", "surrogatepass"), key, item))
+        if records:
+            records.sort(key=lambda r: r[0])
+            languages.append((language.encode("utf-8"), records))
+
+    # Layout
+    hash_sizes = [get_hash_size(len(records)) for _, records in languages]
+    records_offset = HeaderStruct.size + sum(LanguageStruct.size + len(name) + LanguageTableStruct.size for name, _ in languages)
+    hash_offset = records_offset + sum(len(records) for _, records in languages) * RecordStruct.size
+    heap_offset = hash_offset + sum(hash_sizes) * HashSlotStruct.size
+
+    with open(filepath, "wb") as fd:
+        fd.write(HeaderStruct.pack(SnapshotMagic, SnapshotVersion, len(languages)))
+        offset = records_offset
+        for (name, records), hash_size in zip(languages, hash_sizes):
+            fd.write(LanguageStruct.pack(len(name)))
+            fd.write(name)
+            fd.write(LanguageTableStruct.pack(len(records), offset, hash_size, hash_offset))
+            offset += len(records) * RecordStruct.size
+            hash_offset += hash_size * HashSlotStruct.size
+        for _, records in languages:
+            for _, key, item in records:
+                key_offset, key_size = add_string(key)
+                original_offset, original_size = add_string(item.original_value or "")
+                translate_offset, translate_size = add_string(item.translate_value or "")
+                flags = (FlagSkipped if item.skipped else 0) | (FlagNoOriginalValue if item.original_value is None else 0)
+                fd.write(RecordStruct.pack(
+                    heap_offset + key_offset, heap_offset + original_offset, heap_offset + translate_offset,
+                    key_size, original_size, translate_size, flags, item.update_time,
+                ))
+        for (_, records), hash_size in zip(languages, hash_sizes):
+            slots = array("I", bytes(hash_size * HashSlotStruct.size))
+            mask = hash_size - 1
+            for index, (data, _, _) in enumerate(records):
+                slot = zlib.crc32(data) & mask
+                while slots[slot]:
+                    slot = (slot + 1) & mask
+                slots[slot] = index + 1
+            if sys.byteorder != "little":
+                slots.byteswap()
+            fd.write(slots.tobytes())
+        fd.write(heap)
+        fd.flush()
+        os.fsync(fd.fileno())
+
+
+def get_hash_size(count: int) -> int:
+    """Get the number of hash slots (a power of 2) of records
+    """
+    size = 1
+    while size < count * 2:
+        size *= 2
+    return size
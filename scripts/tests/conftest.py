@@ -0,0 +1,16 @@
+# encoding=utf-8
+
+""" Test configuration
+    Author: lipixun
+    Created Time : 2024-04-27 10:12:05
+
+    File Name: conftest.py
+    Description:
+
+        Scripts import each other as top level modules, so the scripts directory is added to the module search path.
+
+"""
+import os.path
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
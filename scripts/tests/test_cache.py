@@ -0,0 +1,47 @@
+# encoding=utf-8
+
+""" Cache tests
+    Author: lipixun
+    Created Time : 2024-04-28 10:41:27
+
+    File Name: test_cache.py
+    Description:
+
+"""
+import os
+
+from cache import SourceCache
+
+
+def test_cache(tmp_path):
+    cache_filepath = str(tmp_path / "source.cache")
+    a_filepath, b_filepath = tmp_path / "a_l_english.yml", tmp_path / "b_l_english.yml"
+    a_filepath.write_text("content", encoding="utf-8")
+    b_filepath.write_text("content", encoding="utf-8")
+    cache = SourceCache(cache_filepath)
+    assert cache.get(str(a_filepath)) is None
+    cache.set(str(a_filepath), "english", [("key", "a")])
+    cache.set(str(b_filepath), "english", [("key", "a")])
+    cache.save()
+    # Files with the same content share values
+    assert len(os.listdir(tmp_path / "source.cache.values")) == 1
+
+    cache = SourceCache(cache_filepath)
+    assert cache.get(str(a_filepath)) == ("english", [("key", "a")])
+    # Touched but not changed
+    os.utime(b_filepath, ns=(0, 0))
+    assert cache.get(str(b_filepath)) == ("english", [("key", "a")])
+    # Changed
+    a_filepath.write_text("changed", encoding="utf-8")
+    assert cache.get(str(a_filepath)) is None
+    cache.set(str(a_filepath), "english", [("key", "changed")])
+    cache.save()
+    assert SourceCache(cache_filepath).get(str(a_filepath)) == ("english", [("key", "changed")])
+
+    # Values of files which are not used any more are removed by the next process
+    for _ in range(2):
+        cache = SourceCache(cache_filepath)
+        assert cache.get(str(a_filepath)) is not None
+        cache.save()
+    assert len(os.listdir(tmp_path / "source.cache.values")) == 1
+    assert SourceCache(cache_filepath).get(str(b_filepath)) is None
@@ -0,0 +1,58 @@
+# encoding=utf-8
+
+""" Daemon tests
+    Author: lipixun
+    Created Time : 2024-04-27 17:32:10
+
+    File Name: test_daemon.py
+    Description:
+
+"""
+import os
+import sys
+
+import pytest
+
+import daemon
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Files of named pipes are not checked")
+
+
+@pytest.fixture
+def runtime_dirpath(monkeypatch, tmp_path):
+    """Use a runtime directory in the temporary path
+    """
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path / "stellaris-translation"
+
+
+def test_files_in_runtime_dir(runtime_dirpath):
+    assert daemon.get_default_address() == str(runtime_dirpath / "daemon.sock")
+    assert os.path.dirname(daemon.get_key_filepath("/any/address.sock")) == str(runtime_dirpath)
+    daemon.check_runtime_dir(create=True)
+    assert os.stat(runtime_dirpath).st_mode & 0o777 == 0o700
+
+
+def test_refuse_accessible_runtime_dir(runtime_dirpath):
+    runtime_dirpath.mkdir(mode=0o755)
+    os.chmod(runtime_dirpath, 0o755)
+    with pytest.raises(ValueError):
+        daemon.serve_daemon(daemon.get_default_address(), lambda request: request)
+    # Clients don't connect either
+    assert daemon.connect_daemon(daemon.get_default_address()) is None
+
+
+@pytest.mark.parametrize("symlink", [False, True])
+def test_refuse_existing_key_file(runtime_dirpath, tmp_path, symlink):
+    address = daemon.get_default_address()
+    daemon.check_runtime_dir(create=True)
+    key_filepath = daemon.get_key_filepath(address)
+    if symlink:
+        os.symlink(tmp_path / "target", key_filepath)
+    else:
+        with open(key_filepath, "wb") as fd:
+            fd.write(b"key")
+    with pytest.raises(ValueError):
+        daemon.serve_daemon(address, lambda request: request)
+    assert not os.path.exists(tmp_path / "target")
+    assert not os.path.exists(address)
@@ -0,0 +1,94 @@
+# encoding=utf-8
+
+""" Emitter tests
+    Author: lipixun
+    Created Time : 2024-04-27 10:15:41
+
+    File Name: test_emitter.py
+    Description:
+
+        The streaming emitter must write the same bytes as dumping the file by ruamel.
+
+"""
+from typing import List, Tuple
+
+import random
+
+import pytest
+
+from emitter import MaxSimpleKeyLength, ReservedKeys, dump_localization_file, write_localization_file
+
+
+def assert_same_bytes(tmp_path, language: str, values: List[Tuple[str, str]]) -> None:
+    """Write values by both emitters (as localisation files are written) and compare the bytes
+    """
+    expected_filepath, actual_filepath = tmp_path / "expected.yml", tmp_path / "actual.yml"
+    with open(expected_filepath, "w", encoding="utf-8-sig") as fd:
+        dump_localization_file(fd, language, values)
+    with open(actual_filepath, "w", encoding="utf-8-sig") as fd:
+        write_localization_file(fd, language, iter(values))
+    assert actual_filepath.read_bytes() == expected_filepath.read_bytes()
+
+
+def test_empty_file(tmp_path):
+    assert_same_bytes(tmp_path, "english", [])
+    assert (tmp_path / "actual.yml").read_bytes() == "\ufeffl_english: {}\n".encode("utf-8")
+
+
+@pytest.mark.parametrize("value", [
+    "",
+    "plain text",
+    "\"quoted\" 'single'",
+    "back\\slash \\n \\\\ end\\",
+    "line\nbreak\r\ttab",
+    "".join(chr(code) for code in range(0x20)),
+    "\x7f\x80\x85\x9f\xa0",
+    "\ufeffbom at start and \ufeff inside",
+    "nel\x85 ls\u2028 ps\u2029",
+    "\ufffe\uffff",
+    "中文 §Y£energy£§! $KEY$ [Root.GetName]",
+    "\U0001F600 emoji",
+    "# not a comment: key: value",
+    "  leading and trailing spaces  ",
+    "x" * 5000,
+])
+def test_values(tmp_path, value):
+    assert_same_bytes(tmp_path, "english", [("KEY_1", value), ("key.sub-2", value)])
+
+
+@pytest.mark.parametrize("key", [
+    *sorted(ReservedKeys),
+    "yes",
+    "no",
+    "on",
+    "1",
+    "1.5",
+    "0x1f",
+    "_key",
+    "key with space",
+    "key:colon",
+    "key#hash",
+    "\"quoted\"",
+    "back\\slash",
+    "中文",
+    "a" * (MaxSimpleKeyLength - 1),
+    "a" * MaxSimpleKeyLength,
+    "a" * 300,
+    "a b" * 100,
+])
+def test_keys(tmp_path, key):
+    assert_same_bytes(tmp_path, "simp_chinese", [("before", "1"), (key, "value \"2\"\n"), ("after", "3")])
+
+
+def test_random(tmp_path):
+    rand = random.Random(20240427)
+    alphabet = ["a", "Z", "0", "_", ".", "-", " ", ":", "#", "'", "\"", "\\", "\n", "\t", "\x00", "\x7f", "\x85", "\xa0",
+                "中", "\u2028", "\ufeff", "\uffff", "\U0001F600", "§", "$", "£", "%", "{", "[", "&", "*", "?", "|", ">", "@"]
+    for _ in range(200):
+        values = {}
+        for _ in range(rand.randint(1, 5)):
+            key = "".join(rand.choice(alphabet[:6]) for _ in range(rand.randint(1, 8)))
+            if not key[0].isalpha():
+                key = "k" + key
+            values[key] = "".join(rand.choice(alphabet) for _ in range(rand.randint(0, 30)))
+        assert_same_bytes(tmp_path, "english", list(values.items()))
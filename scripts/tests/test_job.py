@@ -0,0 +1,51 @@
+# encoding=utf-8
+
+""" Job tests
+    Author: lipixun
+    Created Time : 2024-04-27 16:05:52
+
+    File Name: test_job.py
+    Description:
+
+"""
+import threading
+
+from job import JobStateSucceeded, JobWorker
+
+
+def test_coalesce_concurrent_submissions():
+    worker = JobWorker()
+    barrier, results = threading.Barrier(8), []
+
+    def submit():
+        barrier.wait()
+        for _ in range(100):
+            results.append(worker.submit("save", "project", lambda job: None, ["save"]))
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The worker hasn't started, so every submission is coalesced into the first job
+    assert len({job.id for job, _ in results}) == 1
+    assert sum(1 for _, submitted in results if submitted) == 1
+    worker.start()
+    job, _ = results[0]
+    assert job.wait(10) and job.state == JobStateSucceeded
+    worker.stop()
+
+
+def test_coalesce_by_project_and_name():
+    worker = JobWorker()
+    save, submitted = worker.submit("save", "a", lambda job: "save")
+    assert submitted
+    assert worker.submit("autosave", "a", lambda job: None, ["save", "autosave"]) == (save, False)
+    # Another project, or names which don't match
+    assert worker.submit("save", "b", lambda job: None, ["save"])[1]
+    assert worker.submit("build", "a", lambda job: None, ["build"])[1]
+    worker.start()
+    worker.stop()
+    assert save.result == "save"
+    # Finished jobs aren't coalesced
+    assert worker.submit("save", "a", lambda job: None, ["save"])[1]
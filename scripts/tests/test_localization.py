@@ -0,0 +1,146 @@
+# encoding=utf-8
+
+""" Localization tests
+    Author: lipixun
+    Created Time : 2024-04-27 11:02:36
+
+    File Name: test_localization.py
+    Description:
+
+        Runs the parser conformance corpus: each corpus/<name>.yml is parsed and compared with corpus/<name>.json,
+        which is either {"language": ..., "values": [[key, value]]} or {"error": ...}.
+
+"""
+import glob
+import io
+import json
+import os.path
+import threading
+
+import pytest
+
+import localization
+from cache import get_file_digest
+from localization import LocalizationManager, get_shared_file_values, iter_chunks, parse_file
+
+CorpusPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CorpusFilePaths = sorted(glob.glob(os.path.join(CorpusPath, "*.yml")))
+
+
+def load_expected(filepath: str) -> dict:
+    """Load the expected result of a corpus file
+    """
+    with open(filepath[:-len(".yml")] + ".json", "r", encoding="utf-8") as fd:
+        return json.load(fd)
+
+
+def assert_parsed(filepath: str) -> None:
+    """Parse a corpus file and compare with the expected result
+    """
+    expected = load_expected(filepath)
+    if "error" in expected:
+        with pytest.raises(ValueError) as error:
+            parse_file(filepath)
+        assert str(error.value) == expected["error"]
+        return
+    language, values = parse_file(filepath)
+    assert language == expected["language"]
+    assert [list(value) for value in values] == expected["values"]
+
+
+@pytest.mark.parametrize("filepath", CorpusFilePaths, ids=os.path.basename)
+def test_corpus(filepath):
+    assert_parsed(filepath)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16])
+@pytest.mark.parametrize("filepath", CorpusFilePaths, ids=os.path.basename)
+def test_corpus_small_chunks(monkeypatch, filepath, chunk_size):
+    # Lines and values are split across chunk boundaries
+    monkeypatch.setattr(localization, "ReadChunkSize", chunk_size)
+    assert_parsed(filepath)
+
+
+def test_escaped_backslash_n_is_not_a_newline(tmp_path):
+    filepath = tmp_path / "test_l_english.yml"
+    filepath.write_text("l_english:\n a:0 \"x\\ny\"\n b:0 \"x\\\\ny\"\n", encoding="utf-8")
+    assert parse_file(str(filepath)) == ("english", [("a", "x\ny"), ("b", "x\\ny")])
+
+
+def test_trailing_comment_after_quoted_value(tmp_path):
+    filepath = tmp_path / "test_l_english.yml"
+    filepath.write_text("l_english:\n key: \"x\" # comment\n", encoding="utf-8")
+    assert parse_file(str(filepath)) == ("english", [("key", "x")])
+
+
+def test_enabled_languages(tmp_path):
+    filepath = tmp_path / "test_l_german.yml"
+    filepath.write_text("l_german:\n key:0 \"Wert\"\n", encoding="utf-8")
+    assert parse_file(str(filepath), ["english"]) == ("german", [])
+    assert parse_file(str(filepath), ["german"]) == ("german", [("key", "Wert")])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 10, 1 << 20])
+@pytest.mark.parametrize("text", ["", "\n", "a", "a\n", "a\nb", "line 1\nline 2\n\nline 4\n", "x" * 50 + "\n" + "y" * 50])
+def test_iter_chunks(monkeypatch, text, chunk_size):
+    monkeypatch.setattr(localization, "ReadChunkSize", chunk_size)
+    chunks = list(iter_chunks(io.StringIO(text)))
+    # Chunks consist of whole lines, and the line breaks between them are removed
+    assert "\n".join(chunks) == (text[:-1] if text.endswith("\n") else text)
+
+
+def test_load_directory_checks_filename(tmp_path):
+    content = "l_english:\n key:0 \"Value\"\n"
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "mod_l_english.yml").write_text(content, encoding="utf-8")
+    (tmp_path / "readme.txt").write_text(content.replace("key", "readme"), encoding="utf-8")
+    (tmp_path / "mod_l_english.yml.bak").write_text(content.replace("key", "backup"), encoding="utf-8")
+    (tmp_path / "mod_l_klingon.yml").write_text(content.replace("key", "klingon"), encoding="utf-8")
+    manager = LocalizationManager()
+    manager.load(str(tmp_path))
+    assert manager.sorted_keys == ["key"]
+    # A file path is always read
+    manager.load(str(tmp_path / "readme.txt"))
+    assert manager.sorted_keys == ["key", "readme"]
+
+
+def test_concurrent_search(tmp_path):
+    # Readers holding the shared lock may build search indexes at the same time
+    filepath = tmp_path / "mod_l_english.yml"
+    filepath.write_text("l_english:\n" + "".join(" key_%d:0 \"Value %d\"\n" % (index, index) for index in range(5000)), encoding="utf-8")
+    manager = LocalizationManager()
+    manager.load(str(filepath))
+    barrier, results = threading.Barrier(8), []
+
+    def search():
+        barrier.wait()
+        results.append((len(manager.search_keys("key_1")), len(manager.search_values("value 2"))))
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [(1111, 1111)] * 8
+
+
+def test_share_file_values(tmp_path):
+    # Files of the same content are parsed once, even if projects list different source paths
+    content = "l_english:\n key:0 \"Value\"\n"
+    for name in ["a", "b"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "vanilla_l_english.yml").write_text(content, encoding="utf-8")
+    (tmp_path / "b" / "mod_l_english.yml").write_text("l_english:\n mod:0 \"Mod\"\n", encoding="utf-8")
+    manager_a, manager_b = LocalizationManager(track_files=True), LocalizationManager(track_files=True)
+    manager_a.load(str(tmp_path / "a"))
+    manager_b.load(str(tmp_path / "b"))
+    digest = get_file_digest(str(tmp_path / "a" / "vanilla_l_english.yml"))
+    assert get_shared_file_values(digest) is not None
+    assert manager_a.sorted_keys == ["key"]
+    assert manager_b.sorted_keys == ["key", "mod"]
+    # Changing a file of one project doesn't change the other
+    (tmp_path / "b" / "vanilla_l_english.yml").write_text(content.replace("Value", "Changed"), encoding="utf-8")
+    manager_b.reload_files([str(tmp_path / "b" / "vanilla_l_english.yml")], [])
+    assert manager_a.get_value("key", "english") == "Value"
+    assert manager_b.get_value("key", "english") == "Changed"
+    assert manager_b.get_value("mod", "english") == "Mod"
@@ -0,0 +1,126 @@
+# encoding=utf-8
+
+""" Translation tests
+    Author: lipixun
+    Created Time : 2024-04-27 14:20:18
+
+    File Name: test_translation.py
+    Description:
+
+"""
+import json
+import random
+import threading
+
+from localization import LocalizationManager
+from snapshot import SnapshotFile, write_snapshot_file
+from translation import KeyStateIndex, TranslationManager, TranslationOperation, TranslationValue
+
+
+def create_manager(tmp_path) -> TranslationManager:
+    """Create a manager of a source with 3 keys and its data file (empty if not exists), the journal is opened
+    """
+    source_filepath = tmp_path / "mod_l_english.yml"
+    source_filepath.write_text("l_english:\n key_1:0 \"Value 1\"\n key_2:0 \"Value 2\"\n key_3:0 \"Value 3\"\n", encoding="utf-8")
+    localization = LocalizationManager()
+    localization.load(str(source_filepath))
+    data_filepath = tmp_path / "data.jsonl"
+    if not data_filepath.exists():
+        data_filepath.write_text("", encoding="utf-8")
+    manager = TranslationManager(localization)
+    manager.load(str(data_filepath))
+    manager.open_journal(str(data_filepath))
+    return manager
+
+
+def test_apply_writes_one_journal_record(tmp_path):
+    manager = create_manager(tmp_path)
+    manager.apply([
+        TranslationOperation("add", "key_1", "simp_chinese", "值 1"),
+        TranslationOperation("add", "key_1", "german", "Wert 1"),
+        TranslationOperation("skip", "key_2", "german", None),
+    ])
+    manager.close_journal()
+    lines = (tmp_path / "data.jsonl.journal").read_text(encoding="utf-8").splitlines()
+    # Changes of all languages are replayed entirely or not at all
+    assert len(lines) == 1
+    assert sorted((record["l"], record["k"]) for record in json.loads(lines[0])["b"]) == \
+        [("german", "key_1"), ("german", "key_2"), ("simp_chinese", "key_1")]
+    # Replay
+    manager = create_manager(tmp_path)
+    assert manager.get("key_1", "simp_chinese").translate_value == "值 1"
+    assert manager.get("key_1", "german").translate_value == "Wert 1"
+    assert manager.get("key_2", "german").skipped
+
+
+
+def test_key_state_index():
+    rand = random.Random(20240427)
+    keys = ["key_%04d" % index for index in range(500)]
+    index, states = KeyStateIndex(), {}
+    for key in keys:
+        state = rand.choice([None, 0, 1, 2, 3])
+        index.append(key, state)
+        if state is not None:
+            states[key] = state
+    for _ in range(100):
+        buckets = index.buckets
+        copied_buckets = tuple(list(bucket) for bucket in buckets)
+        for _ in range(rand.randint(1, 50)):
+            key, state = rand.choice(keys), rand.choice([None, 0, 1, 2, 3])
+            index.update(key, state)
+            if state is None:
+                states.pop(key, None)
+            else:
+                states[key] = state
+        assert index.buckets == tuple(sorted(key for key, value in states.items() if value == bucket) for bucket in range(4))
+        assert all(index.get(key) == states.get(key) for key in keys)
+        # Buckets returned before are not modified
+        assert buckets == copied_buckets
+
+
+def test_concurrent_save(tmp_path):
+    manager = create_manager(tmp_path)
+    for index in range(200):
+        manager.apply([TranslationOperation("add", "key_%d" % (index % 3 + 1), "simp_chinese", "值 %d" % index)])
+    # E.g. a save job and journal compaction
+    barrier, errors = threading.Barrier(4), []
+
+    def save():
+        barrier.wait()
+        try:
+            for _ in range(10):
+                manager.save(str(tmp_path / "data.jsonl"))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and not manager.dirty
+    manager.close_journal()
+    manager = create_manager(tmp_path)
+    assert manager.get("key_2", "simp_chinese").translate_value == "值 199"
+
+
+def test_skip_without_value(tmp_path):
+    manager = create_manager(tmp_path)
+    manager.add("key_1", "simp_chinese", None, True)
+    assert manager.get("key_1", "simp_chinese").translate_value == ""
+    manager.close_journal()
+    # Replayed, also records written with a null value
+    with open(tmp_path / "data.jsonl.journal", "a", encoding="utf-8") as fd:
+        fd.write(json.dumps({"l": "simp_chinese", "k": "key_2", "v0": "Value 2", "v1": None, "s": True}) + "\n")
+    manager = create_manager(tmp_path)
+    item = manager.get("key_1", "simp_chinese")
+    assert item.translate_value == "" and item.skipped
+    assert manager.get("key_2", "simp_chinese").translate_value == ""
+
+
+def test_save_snapshot_without_value(tmp_path):
+    snapshot_filepath = str(tmp_path / "data.snapshot")
+    write_snapshot_file(snapshot_filepath, {"simp_chinese": {"key_1": TranslationValue("Value 1", None, True, 0)}})
+    table = SnapshotFile(snapshot_filepath).get_table("simp_chinese")
+    assert table.get_record(table.find("key_1")) == ("Value 1", "", True, 0)
@@ -8,17 +8,35 @@
     Description:
 
 """
-from typing import Dict, List, NamedTuple, Tuple
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, NamedTuple, Set, TextIO, Tuple
 
 import os
 import os.path
+import sys
+import filecmp
+import itertools
+import threading
 
-from time import time
+from collections.abc import MutableMapping
+from contextlib import nullcontext
 
-from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+from time import time
 
+from cache import SourceCache
+from classifier import ClassifyResult, DefaultRuleNames, Rules, classify
+from delta import Delta, DeltaCache
+from emitter import dump_localization_file, write_localization_file
+from journal import Journal, get_journal_filepath, read_records, remove_journal_files
 from localization import LocalizationManager
-from utils import LanguageNames, json, yaml
+from memory import Suggestion, TranslationMemory
+from metrics import gMetrics, profile
+from search import SearchIndex
+from snapshot import SnapshotFile, SnapshotTable, is_snapshot_file, write_snapshot_file
+from utils import LanguageNames, json
+from validator import ValidateResult, Validator
+
+gMetrics.describe("translation_phase_seconds", "histogram", "Seconds of phases: parse (source files), load, save, build, validate and delta")
+gMetrics.describe("translation_changes_total", "counter", "The number of changed translations")
 
 
 TranslationValue = NamedTuple("TranslationValue", [
@@ -28,6 +46,202 @@ TranslationValue = NamedTuple("TranslationValue", [
     ("update_time", int),
 ])
 
+# Key states, the value is the index of the bucket returned by `get_translation_keys`
+KeyStateNew = 0
+KeyStateChanged = 1
+KeyStateDone = 2
+KeyStateSkipped = 3
+
+# Data file formats
+DataFormatJsonLines = "jsonl"
+DataFormatSnapshot = "snapshot"
+
+# Operations of `TranslationManager.apply`
+OperationAdd = "add"            # Add (or replace) the translation
+OperationSkip = "skip"          # Skip the key, keep the translation (if any)
+OperationAccept = "accept"      # Accept the current original value of a changed key, keep the translation
+OperationDelete = "delete"      # Delete the translation
+Operations = [OperationAdd, OperationSkip, OperationAccept, OperationDelete]
+
+TranslationOperation = NamedTuple("TranslationOperation", [
+    ("op", str),
+    ("key", str),
+    ("language", str),
+    ("value", str | None),          # Only used by add and skip
+])
+
+# An output project of build, a mod which contains `replace/<language>/<name>_l_<language>.yml` files
+BuildTarget = NamedTuple("BuildTarget", [
+    ("name", str),
+    ("output_path", str),
+    ("languages", List[str] | None),            # All languages of the data file if None
+    ("build_none_translated_key", bool),
+])
+
+class KeyStateIndex(object):
+    """Key state index of a language
+    Keeps every source key partitioned into sorted (new, changed, done, skipped) buckets. Updating a key is O(1): keys added to or
+    removed from a bucket are kept in sets, and merged into the sorted bucket (O(n) once for all of them) when buckets are read.
+    """
+
+    def __init__(self) -> None:
+        """Create a new KeyStateIndex
+        """
+        self._lock = threading.Lock()                   # Buckets may be read by threads holding the shared lock of the manager
+        self._states: Dict[str, int] = {}
+        self._buckets: Tuple[List[str], List[str], List[str], List[str]] = ([], [], [], [])
+        self._added_keys: Tuple[Set[str], Set[str], Set[str], Set[str]] = (set(), set(), set(), set())
+        self._removed_keys: Tuple[Set[str], Set[str], Set[str], Set[str]] = (set(), set(), set(), set())
+
+    @property
+    def buckets(self) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """Get buckets (new keys, changed keys, done keys, skipped keys). DO NOT modify the returned lists
+        """
+        with self._lock:
+            if any(self._added_keys) or any(self._removed_keys):
+                buckets = []
+                for bucket, added_keys, removed_keys in zip(self._buckets, self._added_keys, self._removed_keys):
+                    if added_keys or removed_keys:
+                        # Both parts are sorted, so sorting is actually merging
+                        bucket = [key for key in bucket if key not in removed_keys] if removed_keys else list(bucket)
+                        bucket.extend(sorted(added_keys))
+                        bucket.sort()
+                        added_keys.clear()
+                        removed_keys.clear()
+                    buckets.append(bucket)
+                # Lists returned before are not modified
+                self._buckets = tuple(buckets)  # type: ignore
+            return self._buckets
+
+    def get(self, key: str) -> int | None:
+        """Get the state of a key
+        """
+        return self._states.get(key)
+
+    def append(self, key: str, state: int | None) -> None:
+        """Append a key, keys MUST be appended in sorted order before any update
+        """
+        if state is not None:
+            self._states[key] = state
+            self._buckets[state].append(key)
+
+    def update(self, key: str, state: int | None) -> None:
+        """Update the state of a key
+        """
+        old_state = self._states.get(key)
+        if old_state == state:
+            return
+        with self._lock:
+            if old_state is not None:
+                if key in self._added_keys[old_state]:
+                    self._added_keys[old_state].discard(key)
+                else:
+                    self._removed_keys[old_state].add(key)
+            if state is None:
+                del self._states[key]
+            else:
+                self._states[key] = state
+                if key in self._removed_keys[state]:
+                    self._removed_keys[state].discard(key)
+                else:
+                    self._added_keys[state].add(key)
+
+    def update_many(self, states: Dict[str, int | None]) -> None:
+        """Update states of keys
+        """
+        for key, state in states.items():
+            self.update(key, state)
+
+
+class SnapshotItems(MutableMapping):
+    """Translation items of a language read from a snapshot table on demand
+    Changes are kept in memory on top of the table until the snapshot is rewritten.
+    """
+
+    def __init__(self, table: SnapshotTable | None) -> None:
+        """Create a new SnapshotItems
+        """
+        self._table = table
+        self._changes: Dict[str, TranslationValue | None] = {}  # key to changed item, None means deleted
+        self._size = len(table) if table is not None else 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> TranslationValue:
+        item = self.get(key)
+        if item is None:
+            raise KeyError(key)
+        return item
+
+    def __setitem__(self, key: str, item: TranslationValue) -> None:
+        if key not in self:
+            self._size += 1
+        self._changes[key] = item
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._changes[key] = None
+        self._size -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self.items():
+            yield key
+
+    def get(self, key: str, default: TranslationValue | None = None) -> TranslationValue | None:
+        """Get an item
+        """
+        if key in self._changes:
+            item = self._changes[key]
+        else:
+            item = self._get_table_item(key)
+        return item if item is not None else default
+
+    def items(self) -> Iterator[Tuple[str, TranslationValue]]:     # type: ignore[override]
+        """Iterate (key, item), unchanged items in the order of table then changed items
+        """
+        if self._table is not None:
+            for key, record in self._table.iter_records():
+                if key not in self._changes:
+                    yield key, TranslationValue(*record)
+        for key, item in list(self._changes.items()):
+            if item is not None:
+                yield key, item
+
+    def copy(self) -> "SnapshotItems":
+        """Copy items, the table is shared
+        """
+        items = SnapshotItems(self._table)
+        items._changes = dict(self._changes)
+        items._size = self._size
+        return items
+
+    def rebase(self, table: SnapshotTable | None) -> None:
+        """Use a new table (of a new snapshot file), only changes not in the table are kept
+        """
+        changes = self._changes
+        self._table = table
+        self._changes = {}
+        self._size = len(table) if table is not None else 0
+        for key, item in changes.items():
+            if item != self._get_table_item(key):
+                if item is None:
+                    del self[key]
+                else:
+                    self[key] = item
+
+    def _get_table_item(self, key: str) -> TranslationValue | None:
+        """Get an item in table
+        """
+        if self._table is None:
+            return None
+        index = self._table.find(key)
+        return TranslationValue(*self._table.get_record(index)) if index >= 0 else None
+
 
 class TranslationManager(object):
     """Translation manager
@@ -37,7 +251,20 @@ class TranslationManager(object):
         """Create a new TranslationManager
         """
         self._source_localization = source_localization
-        self._translation_data: Dict[str, Dict[str, TranslationValue]] = {}   # language to key to item
+        self._translation_data: Dict[str, Dict[str, TranslationValue] | SnapshotItems] = {}   # language to key to item
+        self._snapshot: SnapshotFile | None = None                              # Set if data file is a snapshot
+        self._key_state_indexes: Dict[str, KeyStateIndex] = {}                  # language to key state index
+        self._search_indexes: Dict[str, SearchIndex] = {}                       # language to translated value search index
+        self._memories: Dict[str, TranslationMemory] = {}                       # language to translation memory
+        self._validators: Dict[str, Validator] = {}                             # language to validator
+        self._deltas = DeltaCache()                                             # (original value, source value) to delta of changed keys
+        self._journal: Journal | None = None
+        self._save_lock = threading.Lock()                                      # Held while saving, see `save`
+        self._data_versions: Dict[str, int] = {}                                # language to the version of data, increased on every change
+        self._source_version = 0                                                # Increased when the source localization has been changed
+        self._change_count = 0                                                  # Increased on every change not in the data file
+        self._saved_change_count = 0                                            # The change count of last save
+        self._build_fingerprints: Dict[str, Tuple] = {}     # output file path to (build params, data version, source version, output file fingerprint) of last build
 
     @property
     def source_localization(self):
@@ -45,41 +272,133 @@ class TranslationManager(object):
         """
         return self._source_localization
 
-    def get_translation_keys(self, language: str) -> Tuple[List[str], List[str], List[str], List[str]]:
+    def get_translation_keys(self, language: str, keys: Set[str] | None = None) -> Tuple[List[str], List[str], List[str], List[str]]:
         """Get translation keys
+        Args:
+            keys: Only return these keys if specified
         Returns:
             (news keys, changed keys, done keys, skipped keys)
         """
-        new_keys, changed_keys, done_keys, skipped_keys = [], [], [], []
+        new_keys, changed_keys, done_keys, skipped_keys = self.get_translation_key_buckets(language, keys)
+        if keys is None:
+            return list(new_keys), list(changed_keys), list(done_keys), list(skipped_keys)
+        return new_keys, changed_keys, done_keys, skipped_keys
 
-        if not self._source_localization.sorted_keys:
-            return new_keys, changed_keys, done_keys, skipped_keys
+    def get_translation_key_buckets(self, language: str, keys: Set[str] | None = None) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """Get translation keys without copying. DO NOT modify the returned lists
+        Args:
+            keys: Only return these keys if specified
+        Returns:
+            (news keys, changed keys, done keys, skipped keys)
+        """
+        key_state_index = self._get_key_state_index(language)
+        if keys is None:
+            return key_state_index.buckets
+        # Partition the specified keys by state
+        buckets: Tuple[List[str], List[str], List[str], List[str]] = ([], [], [], [])
+        for key in keys:
+            state = key_state_index.get(key)
+            if state is not None:
+                buckets[state].append(key)
+        for bucket in buckets:
+            bucket.sort()
+        return buckets
 
+    def search_translations(self, query: str, language: str) -> Set[str]:
+        """Search keys of which the translated value contains the query (case insensitive)
+        """
+        search_index = self._search_indexes.get(language)
+        if search_index is None:
+            search_index = SearchIndex()
+            items = self._translation_data.get(language) if self._translation_data else None
+            if items:
+                search_index.build((key, item.translate_value) for key, item in items.items())
+            self._search_indexes[language] = search_index
+        return search_index.search(query)
+
+    def suggest_translations(self, text: str, language: str, limit: int = 5, exclude_key: str | None = None) -> List[Suggestion]:
+        """Suggest translations of a text by translated items of which the original value is the same or similar
+        """
+        memory = self._memories.get(language)
+        if memory is None:
+            memory = TranslationMemory()
+            items = self._translation_data.get(language) if self._translation_data else None
+            if items:
+                memory.build((key, item.original_value, item.translate_value) for key, item in items.items() if not item.skipped)
+            self._memories[language] = memory
+        return memory.suggest(text, limit, exclude_key)
+
+    @gMetrics.timed("translation_phase_seconds", phase="validate")
+    def validate(self, language: str) -> ValidateResult:
+        """Validate that translations of a language keep references, icons, formatting codes and line breaks of the source values.
+        Only translations changed since last validation are checked
+        """
+        validator = self._validators.get(language)
+        if validator is None:
+            validator = self._validators[language] = Validator()
+        return validator.validate(self._get_validate_items(language), (self.get_data_version(language), self._source_version))
+
+    def _get_validate_items(self, language: str) -> Iterator[Tuple[str, str, str]]:
+        """Get (key, source value, translation) of translations to validate
+        """
         items = self._translation_data.get(language) if self._translation_data else None
-        for key in self._source_localization.sorted_keys:
-            if not items:
-                # New key
-                new_keys.append(key)
-                continue
-            if key not in items:
-                # New key
-                new_keys.append(key)
-            else:
-                value = self._source_localization.get(key)
-                if not value or not value.values:
-                    continue
-                # Only use the first language's value to check key state
-                if value.values[0].value != items[key].original_value:
-                    # Update
-                    changed_keys.append(key)
-                elif items[key].skipped:
-                    # Skipped
-                    skipped_keys.append(key)
+        if not items:
+            return
+        for key, item in items.items():
+            if not item.skipped:
+                source_value = self._source_localization.get_value(key)
+                if source_value is not None:
+                    yield key, source_value, item.translate_value
+
+    def refresh_key_states(self, keys: Set[str]) -> None:
+        """Refresh states of keys after their source values have been changed (or added, removed)
+        """
+        self._source_version += 1
+        for language, key_state_index in self._key_state_indexes.items():
+            items = self._translation_data.get(language) if self._translation_data else None
+            for key in keys:
+                if self._source_localization.get_value(key) is None:
+                    key_state_index.update(key, None)
                 else:
-                    # Done
-                    done_keys.append(key)
+                    key_state_index.update(key, self._get_key_state(key, items))
 
-        return new_keys, changed_keys, done_keys, skipped_keys
+    def reset_key_states(self) -> None:
+        """Reset key state index. MUST be called after the source localization has been changed
+        """
+        self._key_state_indexes = {}
+        self._source_version += 1
+
+    def _get_key_state_index(self, language: str) -> KeyStateIndex:
+        """Get key state index of a language, build it when not exists
+        """
+        key_state_index = self._key_state_indexes.get(language)
+        if key_state_index is None:
+            key_state_index = KeyStateIndex()
+            items = self._translation_data.get(language) if self._translation_data else None
+            for key in self._source_localization.sorted_keys:
+                key_state_index.append(key, self._get_key_state(key, items))
+            self._key_state_indexes[language] = key_state_index
+        return key_state_index
+
+    def _get_key_state(self, key: str, items: MutableMapping | None) -> int | None:
+        """Get the state of a key, returns None if the key should not be listed
+        """
+        item = items.get(key) if items else None
+        if item is None:
+            # New key
+            return KeyStateNew
+        value = self._source_localization.get_value(key)
+        if value is None:
+            return None
+        # Only use the first language's value to check key state
+        if value != item.original_value:
+            # Update
+            return KeyStateChanged
+        elif item.skipped:
+            # Skipped
+            return KeyStateSkipped
+        # Done
+        return KeyStateDone
 
     def get(self, key: str, language: str) -> TranslationValue | None:
         """Get a translation
@@ -89,22 +408,38 @@ class TranslationManager(object):
             if language_values:
                 return language_values.get(key)
 
-    def add(self, key: str, language: str, value: str, skipped: bool) -> None:
-        """Add a translation
+    @property
+    def source_version(self) -> int:
+        """Get the version of source localization, which is increased when it has been changed
+        """
+        return self._source_version
+
+    def get_key_state_sizes(self) -> Dict[str, Tuple[int, int, int, int]]:
+        """Get sizes of (new, changed, done, skipped) keys of languages of which key states have been built
+        """
+        return {language: tuple(len(bucket) for bucket in index.buckets) for language, index in list(self._key_state_indexes.items())}  # type: ignore
+
+    def get_data_version(self, language: str) -> int:
+        """Get the version of data of a language, which is increased on every change
+        """
+        return self._data_versions.get(language, 0)
+
+    @property
+    def dirty(self) -> bool:
+        """Check if there are changes which haven't been saved into the data file (they may be in the journal)
+        """
+        return self._change_count != self._saved_change_count
+
+    def add(self, key: str, language: str, value: str | None, skipped: bool) -> None:
+        """Add a translation, the value may be empty if skipped
         """
-        if not self._translation_data:
-            self._translation_data = {}
-        if language not in self._translation_data:
-            self._translation_data[language] = {}
         # Get original value
-        item = self._source_localization.get(key)
-        if not item or not item.values:
+        original_value = self._source_localization.get_value(key)
+        if original_value is None:
             raise ValueError("Source localisation not found")
-        original_value = item.values[0].value
-        if value:
-            value = value.strip()  # NOTE: We only strip the translated value
+        value = value.strip() if value else ""  # NOTE: We only strip the translated value
         # Add it
-        self._translation_data[language][key] = TranslationValue(original_value, value, skipped, int(time()))
+        self._apply_changes({language: {key: TranslationValue(original_value, value, skipped, int(time()))}})
 
     def delete(self, key: str, language: str) -> None:
         """Delete a translation
@@ -112,121 +447,591 @@ class TranslationManager(object):
         if self._translation_data:
             language_values = self._translation_data.get(language)
             if language_values and key in language_values:
+                self._apply_changes({language: {key: None}})
+
+    def apply(self, operations: List[TranslationOperation]) -> int:
+        """Apply operations atomically. All operations are validated before any change is made,
+        then changes of all languages are applied (and written to the journal) at once.
+        Returns:
+            The number of changed items
+        """
+        now = int(time())
+        changes: Dict[str, Dict[str, TranslationValue | None]] = {}     # language to key to item, None means deleted
+        for index, operation in enumerate(operations):
+            if operation.op not in Operations:
+                raise ValueError("Invalid operation [%s] of #%d" % (operation.op, index))
+            if operation.language not in LanguageNames:
+                raise ValueError("Invalid language [%s] of #%d" % (operation.language, index))
+            language_changes = changes.setdefault(operation.language, {})
+            # Later operations see changes of former ones
+            if operation.key in language_changes:
+                item = language_changes[operation.key]
+            else:
+                item = self.get(operation.key, operation.language)
+            if operation.op == OperationDelete:
+                if item is not None or operation.key in language_changes:
+                    language_changes[operation.key] = None
+                continue
+            original_value = self._source_localization.get_value(operation.key)
+            if original_value is None:
+                raise ValueError("Source localisation of [%s] not found of #%d" % (operation.key, index))
+            value = operation.value.strip() if operation.value else None   # NOTE: We only strip the translated value
+            if operation.op == OperationAdd:
+                if not value:
+                    raise ValueError("Require value to add [%s] of #%d" % (operation.key, index))
+                language_changes[operation.key] = TranslationValue(original_value, value, False, now)
+            elif operation.op == OperationSkip:
+                translate_value = value or (item.translate_value if item is not None else "")
+                language_changes[operation.key] = TranslationValue(original_value, translate_value, True, now)
+            else:
+                if item is None:
+                    raise ValueError("Translation of [%s] not found of #%d" % (operation.key, index))
+                language_changes[operation.key] = TranslationValue(original_value, item.translate_value, item.skipped, now)
+        # Apply
+        changes = {language: language_changes for language, language_changes in changes.items() if language_changes}
+        if changes:
+            self._apply_changes(changes)
+        return sum(len(language_changes) for language_changes in changes.values())
+
+    def classify_skip_keys(self, language: str, rule_names: List[str] | None = None, jobs: int = 1) -> ClassifyResult:
+        """Classify new and changed keys of a language which don't need translation
+        Args:
+            rule_names: Names of auto skip rules, the default rules if not specified
+            jobs: The number of processes, 0 means the number of CPUs
+        """
+        new_keys, changed_keys, _, _ = self.get_translation_key_buckets(language)
+        items = []
+        for key in itertools.chain(new_keys, changed_keys):
+            values = self._source_localization.get_values(key)
+            if values and values[0][1] is not None:
+                items.append((key, values))
+        return classify(items, rule_names, jobs)
+
+    def get_delta(self, key: str, language: str) -> Delta | None:
+        """Get the delta from the original value of the translation to the current source value, None if the key isn't changed
+        """
+        item = self.get(key, language)
+        value = self._source_localization.get_value(key)
+        if item is None or value is None or value == item.original_value:
+            return None
+        return self._deltas.get(item.original_value or "", value)
+
+    @gMetrics.timed("translation_phase_seconds", phase="delta")
+    def precompute_deltas(self, language: str, lock: ContextManager = nullcontext()) -> int:
+        """Compute deltas of changed keys of a language, so they're ready when reviewed. Returns the number of changed keys
+        Args:
+            lock: A shared lock of this manager, only held while collecting changed keys (not computing deltas)
+        """
+        with lock:
+            _, changed_keys, _, _ = self.get_translation_key_buckets(language)
+            items = self._translation_data.get(language) if self._translation_data else None
+            values = [(items[key].original_value or "", self._source_localization.get_value(key)) for key in changed_keys] if items else []
+        for original_value, value in values:
+            if value is not None:
+                self._deltas.get(original_value, value)
+        return len(values)
+
+    def get_trivial_changed_keys(self, language: str) -> List[str]:
+        """Get changed keys of a language of which only whitespaces or punctuations of the original value changed
+        """
+        _, changed_keys, _, _ = self.get_translation_key_buckets(language)
+        trivial_keys = []
+        for key in changed_keys:
+            delta = self.get_delta(key, language)
+            if delta is not None and delta.trivial:
+                trivial_keys.append(key)
+        return trivial_keys
+
+    def accept_trivial_changes(self, language: str) -> List[str]:
+        """Accept changed keys of a language of which only whitespaces or punctuations of the original value changed, see `get_trivial_changed_keys`
+        """
+        keys = self.get_trivial_changed_keys(language)
+        self.apply([TranslationOperation(OperationAccept, key, language, None) for key in keys])
+        return keys
+
+    def auto_skip(self, language: str, rule_names: List[str] | None = None, jobs: int = 1) -> ClassifyResult:
+        """Skip new and changed keys of a language which don't need translation. Translations of changed keys are kept
+        """
+        result = self.classify_skip_keys(language, rule_names, jobs)
+        self.apply([TranslationOperation(OperationSkip, key, language, None) for key in result.matches])
+        return result
+
+    def _apply_changes(self, changes: Dict[str, Dict[str, TranslationValue | None]]) -> None:
+        """Apply changes (language to key to item, None means deleted), update indexes and write the journal.
+        Changes of all languages are written as one journal record, which is replayed entirely or not at all
+        """
+        records = []
+        for language, language_changes in changes.items():
+            records.extend(self._apply_language_changes(language, language_changes))
+        self._change_count += 1
+        # Journal
+        if self._journal is not None and records:
+            self._journal.append_many(records)
+
+    def _apply_language_changes(self, language: str, changes: Dict[str, TranslationValue | None]) -> List[Dict[str, Any]]:
+        """Apply changes (key to item, None means deleted) of a language and update indexes
+        Returns:
+            Journal records of the changes
+        """
+        if language not in self._translation_data:
+            self._translation_data[language] = {}
+        language_values = self._translation_data[language]
+        records = []
+        for key, item in changes.items():
+            if item is not None:
+                if item.translate_value is None:
+                    # Skipped without a value, e.g. loaded from old data files
+                    item = changes[key] = item._replace(translate_value="")
+                language_values[key] = item
+                records.append(get_record(language, key, item))
+            elif key in language_values:
                 del language_values[key]
+                records.append({"l": language, "k": key, "d": True})
+        self._data_versions[language] = self._data_versions.get(language, 0) + 1
+        gMetrics.inc("translation_changes_total", len(changes), language=language)
+        # Indexes
+        key_state_index = self._key_state_indexes.get(language)
+        if key_state_index is not None:
+            key_state_index.update_many({
+                key: self._get_key_state(key, language_values) for key in changes
+                if self._source_localization.get_value(key) is not None
+            })
+        search_index = self._search_indexes.get(language)
+        memory = self._memories.get(language)
+        for key, item in changes.items():
+            if item is None:
+                if search_index is not None:
+                    search_index.remove(key)
+                if memory is not None:
+                    memory.remove(key)
+            else:
+                if search_index is not None:
+                    search_index.set(key, item.translate_value)
+                if memory is not None:
+                    memory.set(key, item.original_value, item.translate_value if not item.skipped else None)
+        return records
+
+    @property
+    def languages(self) -> List[str]:
+        """Get languages of translation data
+        """
+        return list(self._translation_data.keys())
 
+    @property
+    def data_format(self) -> str:
+        """Get the format of loaded data file
+        """
+        return DataFormatSnapshot if self._snapshot is not None else DataFormatJsonLines
+
+    @gMetrics.timed("translation_phase_seconds", phase="load")
     def load(self, filepath):
-        """Load translation file
-        """
-        with open(filepath, "r", encoding="utf-8") as fd:
-            for line in fd:
-                line = line.strip()
-                if line:
-                    value = json.loads(line)
-                    if value:
-                        language, key, original_value, translate_value, skipped, update_time = \
-                            value.get("l"), value.get("k"), value.get("v0"), \
-                            value.get("v1"), value.get("s", False), value.get("t")
-                        language = language.strip()
-                        key = key.strip()
-                        if not language or not key:
-                            continue
-                        translate_value = translate_value.strip()   # NOTE: We only strip the translated value
-                        skipped = False if skipped is False else True
-                        if not isinstance(update_time, int):
-                            update_time = 0
-                        # Add this item
-                        item = TranslationValue(original_value, translate_value, skipped, update_time)
-                        if language not in self._translation_data:
-                            self._translation_data[language] = {key:  item}
-                        else:
-                            self._translation_data[language][key] = item
-
-    def save(self, filepath):
-        """Save translation file
-        """
-        with open(filepath, "w", encoding="utf-8") as fd:
-            if self._translation_data:
-                for language, items in sorted(self._translation_data.items(), key=lambda p: p[0]):
-                    for key, item in sorted(items.items(), key=lambda p: p[0]):
-                        if item.translate_value or item.skipped:
-                            json_value = {
-                                "l": language,
-                                "k": key,
-                                "v0": item.original_value,
-                                "v1": item.translate_value,
-                                "t": item.update_time,
-                            }
-                            if item.skipped:
-                                json_value["s"] = True
-                            print(json.dumps(json_value, sort_keys=True, ensure_ascii=False), file=fd)
-
-    def build(self, name: str, output_path: str, build_none_translated_key: bool):
-        """Build
-        """
-        if not self._translation_data:
+        """Load translation file (json lines or snapshot), and replay its journal if exists.
+        Items of a snapshot are read on demand.
+        """
+        if is_snapshot_file(filepath):
+            self._snapshot = SnapshotFile(filepath)
+            for language in self._snapshot.languages:
+                self._translation_data[language] = SnapshotItems(self._snapshot.get_table(language))
+        else:
+            with open(filepath, "r", encoding="utf-8") as fd:
+                for line in fd:
+                    line = line.strip()
+                    if line:
+                        value = json.loads(line)
+                        if value:
+                            self._load_record(value)
+        for value in read_records(get_journal_filepath(filepath)):
+            self._load_record(value)
+            self._change_count += 1
+        # Key states, search indexes and translation memories will be rebuilt on demand
+        for language in self._translation_data:
+            self._data_versions[language] = self._data_versions.get(language, 0) + 1
+        self.reset_key_states()
+        self._search_indexes = {}
+        self._memories = {}
+
+    def _load_record(self, value: Dict[str, Any]) -> None:
+        """Load a record of data file or journal
+        """
+        language, key, original_value, translate_value, skipped, update_time = \
+            value.get("l"), value.get("k"), value.get("v0"), \
+            value.get("v1"), value.get("s", False), value.get("t")
+        language = sys.intern(language.strip())
+        key = sys.intern(key.strip())
+        if not language or not key:
             return
-        # Ensure dir
-        replace_dir = os.path.join(output_path, "replace")
-        if not os.path.isdir(replace_dir):
-            os.makedirs(replace_dir)
-        # Build each language
-        for language, translation_values in self._translation_data.items():
-            # Ensure dir
-            lang_dir = os.path.join(replace_dir, language)
-            if not os.path.isdir(lang_dir):
-                os.makedirs(lang_dir)
-            # Build data
-            build_values = {}
-            for key in self._source_localization.sorted_keys:
-                translation_value = translation_values.get(key)
-                if translation_value and not translation_value.skipped:
-                    # Found translation, use the translated value
-                    build_values[key] = DoubleQuotedScalarString(translation_value.translate_value)
-                elif build_none_translated_key:
-                    # Translation not found, try to use the original value or the first value
-                    localization_item = self._source_localization.get(key)
-                    if localization_item and localization_item.values:
-                        for value in localization_item.values:
-                            if value.language == language:
-                                # Use this language
-                                build_values[key] = DoubleQuotedScalarString(value.value)
-                                break
-                        else:
-                            # Use the first language
-                            build_values[key] = DoubleQuotedScalarString(localization_item.values[0].value)
-            build_data = {"l_%s" % language: build_values}
-            # Write yaml file
-            with open(os.path.join(lang_dir, "%s_l_%s.yml" % (name, language)), "w", encoding="utf-8-sig") as fd:
-                yaml.dump(build_data, fd)
+        if value.get("d"):
+            # Deleted
+            if language in self._translation_data:
+                self._translation_data[language].pop(key, None)
+            return
+        translate_value = translate_value.strip() if translate_value else ""     # NOTE: We only strip the translated value
+        skipped = False if skipped is False else True
+        if not isinstance(update_time, int):
+            update_time = 0
+        # Share the original value with other languages, it's usually the same
+        for items in self._translation_data.values():
+            item = items.get(key)
+            if item is not None and item.original_value == original_value:
+                original_value = item.original_value
+                break
+        # Add this item
+        item = TranslationValue(original_value, translate_value, skipped, update_time)
+        if language not in self._translation_data:
+            self._translation_data[language] = {key:  item}
+        else:
+            self._translation_data[language][key] = item
+
+    def open_journal(self, filepath: str) -> None:
+        """Open the journal of the data file, every change will be appended to it. MUST be called after `load`
+        """
+        if self._journal is None:
+            self._journal = Journal(get_journal_filepath(filepath))
+
+    def close_journal(self) -> None:
+        """Close the journal
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @property
+    def journal_size(self) -> int:
+        """Get the number of records in the journal
+        """
+        return self._journal.size if self._journal is not None else 0
+
+    @gMetrics.timed("translation_phase_seconds", phase="save")
+    def save(self, filepath, data_format: str | None = None, lock: ContextManager = nullcontext()):
+        """Save translation file, the journal is folded into it. Only the copy of data is protected by the lock
+        so that changes can be made while writing the translation file.
+        Args:
+            data_format: The format to write, the format of loaded data file by default
+            lock: An exclusive lock of this manager
+        """
+        # Saves (e.g. a save job and journal compaction) write the same temporary file and rotate the same journal, run them one by one
+        with self._save_lock:
+            with lock:
+                translation_data = {language: items.copy() for language, items in self._translation_data.items()}
+                change_count = self._change_count
+                if self._journal is not None:
+                    # Changes made while writing go to the new journal
+                    self._journal.rotate()
+            if (data_format or self.data_format) == DataFormatSnapshot:
+                self._write_snapshot(filepath, translation_data, lock)
+            else:
+                write_data_file(filepath, translation_data)
+            if self._journal is not None:
+                self._journal.remove_rotated()
+            else:
+                remove_journal_files(get_journal_filepath(filepath))
+            self._saved_change_count = change_count
+
+    def compact(self, filepath, lock: ContextManager = nullcontext()):
+        """Fold the journal into the translation file, see `save`
+        """
+        if self._journal is None:
+            raise ValueError("Journal is not opened")
+        self.save(filepath, lock=lock)
+
+    def _write_snapshot(self, filepath: str, translation_data: Dict[str, MutableMapping], lock: ContextManager = nullcontext()):
+        """Write a snapshot file atomically. If the data file is a snapshot, items are switched to the new file
+        """
+        temp_filepath = "%s.tmp" % filepath
+        write_snapshot_file(temp_filepath, translation_data)
+        if self._snapshot is None:
+            os.replace(temp_filepath, filepath)
+            return
+        with lock:
+            # The mapped file can't be replaced on windows, close it first
+            self._snapshot.close()
+            os.replace(temp_filepath, filepath)
+            self._snapshot = SnapshotFile(filepath)
+            for language, items in self._translation_data.items():
+                if isinstance(items, SnapshotItems):
+                    items.rebase(self._snapshot.get_table(language))
+
+    def build(self, name: str, output_path: str, build_none_translated_key: bool,
+              emitter: Callable[[TextIO, str, Iterable[Tuple[str, str]]], None] = write_localization_file,
+              lock: ContextManager = nullcontext(), progress: Callable[[float], None] | None = None) -> List[str]:
+        """Build all languages into an output project, see `build_targets`
+        Returns:
+            The languages written
+        """
+        return [language for _, language in self.build_targets([BuildTarget(name, output_path, None, build_none_translated_key)],
+                                                               emitter, lock, progress)]
+
+    @gMetrics.timed("translation_phase_seconds", phase="build")
+    def build_targets(self, targets: List[BuildTarget],
+                      emitter: Callable[[TextIO, str, Iterable[Tuple[str, str]]], None] = write_localization_file,
+                      lock: ContextManager = nullcontext(), progress: Callable[[float], None] | None = None, jobs: int = 1) -> List[Tuple[str, str]]:
+        """Build output projects in one pass: values of a language are collected once for all targets, then files are written.
+        Only files of which neither data nor output file is changed since last build are skipped
+        Args:
+            emitter: The function to write a localisation file, `dump_localization_file` is the (slower) reference
+            lock: A shared lock of this manager, only held while collecting values of a language (not writing files)
+            progress: Called with the progress (0 to 1) after each file
+            jobs: The number of processes to write files, 1 by default and 0 means the number of CPUs
+        Returns:
+            (target name, language) of files written
+        """
+        with lock:
+            data_languages = list(self._translation_data.keys())
+        # Files of each language: (target, file path)
+        language_files: Dict[str, List[Tuple[BuildTarget, str]]] = {}
+        for target in targets:
+            for language in target.languages if target.languages is not None else data_languages:
+                if language not in data_languages:
+                    continue
+                lang_dir = os.path.join(target.output_path, "replace", language)
+                if not os.path.isdir(lang_dir):
+                    os.makedirs(lang_dir)
+                language_files.setdefault(language, []).append((target, os.path.join(lang_dir, "%s_l_%s.yml" % (target.name, language))))
+        file_count = sum(len(files) for files in language_files.values())
+        if not file_count:
+            return []
+        # Collect values of files to write: (target, language, file path, fingerprint, values)
+        tasks: List[Tuple[BuildTarget, str, str, Tuple, List[Tuple[str, str]]]] = []
+        for language, files in language_files.items():
+            with lock:
+                versions = (self.get_data_version(language), self._source_version)
+                translation_values = self._translation_data.get(language)
+                language_values: Dict[bool, List[Tuple[str, str]]] = {}     # build_none_translated_key to values
+                for target, filepath in files:
+                    params = (target.name, target.output_path, target.build_none_translated_key, emitter)
+                    # Skip the file if neither data nor output file is changed since last build
+                    if translation_values is None or self._build_fingerprints.get(filepath) == (params, *versions, get_file_fingerprint(filepath)):
+                        continue
+                    values = language_values.get(target.build_none_translated_key)
+                    if values is None:
+                        values = language_values[target.build_none_translated_key] = list(
+                            self._get_build_values(language, translation_values, target.build_none_translated_key))
+                    tasks.append((target, language, filepath, (params, *versions), values))
+        # Write files
+        built_files: List[Tuple[str, str]] = []
+        written_count = file_count - len(tasks)
+        executor = None
+        if jobs != 1 and len(tasks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = ProcessPoolExecutor(max_workers=jobs or None)
+        with executor or nullcontext():
+            write_args = ([task[2] for task in tasks], [task[1] for task in tasks], [task[4] for task in tasks], [emitter] * len(tasks))
+            results = executor.map(write_build_file, *write_args) if executor is not None else map(write_build_file, *write_args)
+            for (target, language, filepath, fingerprint, _), written in zip(tasks, results):
+                if written:
+                    built_files.append((target.name, language))
+                # Changes made while writing have increased the versions, so they will be built next time
+                self._build_fingerprints[filepath] = (*fingerprint, get_file_fingerprint(filepath))
+                written_count += 1
+                if progress is not None:
+                    progress(written_count / file_count)
+        return built_files
+
+    def _get_build_values(self, language: str, translation_values: Dict[str, TranslationValue],
+                          build_none_translated_key: bool) -> Iterator[Tuple[str, str]]:
+        """Get (key, value) pairs to build a language
+        """
+        source_values = self._source_localization.get_language_values(language) if build_none_translated_key else None
+        for key in self._source_localization.sorted_keys:
+            translation_value = translation_values.get(key)
+            if translation_value and not translation_value.skipped:
+                # Found translation, use the translated value
+                yield key, translation_value.translate_value
+            elif source_values is not None:
+                # Translation not found, use the value of the language or the first value
+                value = source_values.get(key)
+                if value is not None:
+                    yield key, value
+
+
+def get_build_target(value: Dict[str, Any], base_path: str) -> BuildTarget:
+    """Get a build target of config, the output path is relative to base path and checked:
+
+        {
+            "name": "name",
+            "output_path": "path",
+            "languages": ["simp_chinese"],          # Optional, all languages of the data file by default
+            "build_none_translated_key": false      # Optional
+        }
+    """
+    name = value.get("name")
+    if not name or not isinstance(name, str) or "/" in name or "\\" in name:
+        raise ValueError("Invalid build target name [%s]" % name)
+    output_path = value.get("output_path")
+    if not output_path or not isinstance(output_path, str):
+        raise ValueError("Invalid output path [%s] of build target [%s]" % (output_path, name))
+    output_path = os.path.abspath(os.path.join(base_path, os.path.expanduser(output_path)))
+    if not os.path.isdir(output_path):
+        raise ValueError("Output directory [%s] of build target [%s] not exist" % (output_path, name))
+    languages = value.get("languages")
+    if languages is not None:
+        for language in languages:
+            if language not in LanguageNames:
+                raise ValueError("Invalid language [%s] of build target [%s]" % (language, name))
+    return BuildTarget(name, output_path, languages, bool(value.get("build_none_translated_key", False)))
+
+
+def load_build_plan(filepath: str) -> List[BuildTarget]:
+    """Load targets of a build plan file `{"targets": [target, ...]}`, see `get_build_target`. Relative paths are relative to the directory of the file
+    """
+    with open(filepath, "r", encoding="utf-8") as fd:
+        value = json.load(fd)
+    base_path = os.path.dirname(os.path.abspath(filepath))
+    return [get_build_target(target, base_path) for target in value.get("targets") or []]
+
+
+def write_build_file(filepath: str, language: str, values: List[Tuple[str, str]],
+                     emitter: Callable[[TextIO, str, Iterable[Tuple[str, str]]], None]) -> bool:
+    """Write a localisation file of build, to a temp file first then replace the output file if changed. So the game never sees a half-written file
+    Returns:
+        If the output file is changed
+    """
+    temp_filepath = "%s.tmp" % filepath
+    with open(temp_filepath, "w", encoding="utf-8-sig") as fd:
+        emitter(fd, language, values)
+    if os.path.isfile(filepath) and filecmp.cmp(temp_filepath, filepath, shallow=False):
+        os.remove(temp_filepath)
+        return False
+    os.replace(temp_filepath, filepath)
+    return True
+
+
+def get_file_fingerprint(filepath: str) -> Tuple[int, int] | None:
+    """Get (mtime, size) of a file, returns None if not exists
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_record(language: str, key: str, item: TranslationValue) -> Dict[str, Any]:
+    """Get the record (a line of data file or journal) of a translation value
+    """
+    record = {
+        "l": language,
+        "k": key,
+        "v0": item.original_value,
+        "v1": item.translate_value,
+        "t": item.update_time,
+    }
+    if item.skipped:
+        record["s"] = True
+    return record
+
+
+def write_data_file(filepath: str, translation_data: Dict[str, Dict[str, TranslationValue]]) -> None:
+    """Write translation data file (sorted by language and key) atomically
+    """
+    temp_filepath = "%s.tmp" % filepath
+    with open(temp_filepath, "w", encoding="utf-8") as fd:
+        if translation_data:
+            for language, items in sorted(translation_data.items(), key=lambda p: p[0]):
+                for key, item in sorted(items.items(), key=lambda p: p[0]):
+                    if item.translate_value or item.skipped:
+                        print(json.dumps(get_record(language, key, item), sort_keys=True, ensure_ascii=False), file=fd)
+        fd.flush()
+        os.fsync(fd.fileno())
+    os.replace(temp_filepath, filepath)
 
 
 if __name__ == "__main__":
 
-    import re
-    import sys
-    import itertools
+    import io
+    import signal
+    import traceback
+    import tracemalloc
+
+    from argparse import ArgumentParser, Namespace
+    from collections import OrderedDict
+    from contextlib import redirect_stdout
+
+    from daemon import call_daemon, get_default_address, serve_daemon
+    from watcher import SourceWatcher
+
+    # Commands which can run in the daemon
+    DaemonActions = ["build", "auto-skip", "validate"]
+    # Args which are paths, they're resolved by the client since the daemon runs in another directory
+    DaemonPathArgs = ["source_paths", "source_cache", "data_file", "output_path", "plan", "profile_path"]
+
+    class LoadedData(object):
+        """The source and the data file kept loaded by the daemon
+        """
 
-    from argparse import ArgumentParser
+        def __init__(self, args, source_paths: List[str], data_file: str) -> None:
+            """Create a new LoadedData and load the source
+            """
+            source_cache = SourceCache(os.path.abspath(args.source_cache)) if args.source_cache else None
+            self.source_localization = LocalizationManager([args.source_language] if args.source_language else None, source_cache,
+                                                           track_files=True)
+            self.data_file = data_file
+            self.translation_manager: TranslationManager | None = None
+            self.data_fingerprint: Tuple | None = None
+            # Checked before each command instead of watching in background. Take the snapshot before loading in order not to miss any changes
+            self._watcher = SourceWatcher(source_paths, lambda changed_filepaths, removed_filepaths: None)
+            for source_path in source_paths:
+                self.source_localization.load(source_path, args.jobs)
 
-    AliasValueRegex = re.compile(r"^[ \t\n]*((§\S*)*\$[^\$]*\$§*[ \:\-\.\t\n\!\?\,]*)*[ \:\-\.\t\n\!\?\,]*$", re.UNICODE)
+        def refresh(self) -> TranslationManager:
+            """Reload changed source files, and the data file if it's changed by others
+            """
+            changed_filepaths, removed_filepaths = self._watcher.check()
+            if changed_filepaths or removed_filepaths:
+                keys = self.source_localization.reload_files(changed_filepaths, removed_filepaths)
+                if self.translation_manager is not None:
+                    self.translation_manager.refresh_key_states(keys)
+                print("[+] Source changed: reload [%d] files, remove [%d] files, [%d] keys affected" % (
+                    len(changed_filepaths), len(removed_filepaths), len(keys)))
+            data_fingerprint = self.get_data_fingerprint()
+            if self.translation_manager is None or data_fingerprint != self.data_fingerprint:
+                self.translation_manager = TranslationManager(self.source_localization)
+                self.translation_manager.load(self.data_file)
+                self.data_fingerprint = data_fingerprint
+            return self.translation_manager
+
+        def get_data_fingerprint(self) -> Tuple:
+            """Get fingerprints of the data file and its journal
+            """
+            return get_file_fingerprint(self.data_file), get_file_fingerprint(get_journal_filepath(self.data_file))
+
+    # The daemon keeps (source paths, source language, source cache, data file) to LoadedData, least recently used first.
+    # None if not running as the daemon
+    gLoadedData: OrderedDict[Tuple, LoadedData] | None = None
+    # LoadedData used by the running command of the daemon
+    gUsedData: List[LoadedData] = []
 
     def get_args():
         """Get args
         """
         parser = ArgumentParser(description="Stellaris translation cli")
+        parser.add_argument("--profile", dest="profile_path", default=None,
+                            help="Profile the command, cProfile stats and tracemalloc snapshot are dumped into this directory and phase timings are printed")
+        parser.add_argument("--daemon", dest="daemon_address", nargs="?", const=get_default_address(), default=None,
+                            help="Run %s in the daemon listening on this address (the default address if omitted) which keeps the source and data loaded. "
+                                 "Run in this process if the daemon is not running" % ", ".join(DaemonActions))
         sub_parsers = parser.add_subparsers(dest="action")
         # Build
         build_parser = sub_parsers.add_parser("build", help="Build mod files")
-        build_parser.add_argument("--name", dest="name", required=True, help="Name of this translation")
+        build_parser.add_argument("--name", dest="name", help="Name of this translation. Required without --plan")
         build_parser.add_argument("--source-path", dest="source_paths", required=True, default=[], action="append",
                                   help="The source path, either a directory or a file. Usually [localisation] directory of a mod or a sub directory of a specific language. You MUST ONLY load file(s) for 1 language. You can specify multiple source paths")
         build_parser.add_argument("--source-language", dest="source_language", default=None, choices=LanguageNames,
                                   help="Source language. Only preserve the value of specified language. Will preserve all languages if not specified. (I highly recommend to set this flag in order to avoid unexpected language misusage)")
         build_parser.add_argument("--data-file", dest="data_file", required=True, help="The file which stores the translation data")
-        build_parser.add_argument("--output-path", dest="output_path", required=True,
-                                  help="The build output directory path. Usually [localisation] of your mod")
+        build_parser.add_argument("--output-path", dest="output_path",
+                                  help="The build output directory path. Usually [localisation] of your mod. Required without --plan")
+        build_parser.add_argument("--plan", dest="plan", default=None,
+                                  help="The build plan file which lists output projects, all of them are built in one pass. See `get_build_target` for its format")
         build_parser.add_argument("--build-none-translated-key", dest="build_none_translated_key", default=False,
                                   action="store_true", help="Write none-translated key when building")
+        build_parser.add_argument("--emitter", dest="emitter", default="stream", choices=["stream", "ruamel"],
+                                  help="The localisation file writer, stream by default. ruamel is the slower reference implementation with identical output")
+        build_parser.add_argument("--jobs", dest="jobs", default=1, type=int,
+                                  help="The number of processes to parse source files and write output files, 1 by default. 0 means the number of CPUs")
+        build_parser.add_argument("--source-cache", dest="source_cache", default=None,
+                                  help="The file which caches parsed source files, source files will be parsed every time if not specified")
         build_parser.set_defaults(handler=run_build)
         # Auto skip
         auto_skip_parser = sub_parsers.add_parser(
@@ -238,10 +1043,70 @@ if __name__ == "__main__":
         auto_skip_parser.add_argument("--data-file", dest="data_file", required=True, help="The file which stores the translation data")
         auto_skip_parser.add_argument("--target-language", dest="target_language",
                                       default="simp_chinese", choices=LanguageNames, help="Target language, simp_chinese by default.")
+        auto_skip_parser.add_argument("--jobs", dest="jobs", default=1, type=int,
+                                      help="The number of processes to parse source files and classify keys, 1 by default. 0 means the number of CPUs")
+        auto_skip_parser.add_argument("--rule", dest="rules", default=[], action="append", choices=list(Rules.keys()),
+                                      help="The auto skip rule, can be specified multiple times. Default: %s" % ", ".join(DefaultRuleNames))
+        auto_skip_parser.add_argument("--dry-run", dest="dry_run", default=False, action="store_true",
+                                      help="Only print the classification, don't skip keys")
+        auto_skip_parser.add_argument("--source-cache", dest="source_cache", default=None,
+                                      help="The file which caches parsed source files, source files will be parsed every time if not specified")
         auto_skip_parser.set_defaults(handler=run_auto_skip)
+        # Validate
+        validate_parser = sub_parsers.add_parser(
+            "validate", help="Check that translations keep references ($KEY$), icons (£icon£), formatting codes (§X) and line breaks of source values")
+        validate_parser.add_argument("--source-path", dest="source_paths", required=True, default=[], action="append",
+                                     help="The source path, either a directory or a file. Usually [localisation] directory of a mod or a sub directory of a specific language. You MUST ONLY load file(s) for 1 language. You can specify multiple source paths")
+        validate_parser.add_argument("--source-language", dest="source_language", default=None, choices=LanguageNames,
+                                     help="Source language. Only preserve the value of specified language. Will preserve all languages if not specified. (I highly recommend to set this flag in order to avoid unexpected language misusage)")
+        validate_parser.add_argument("--data-file", dest="data_file", required=True, help="The file which stores the translation data")
+        validate_parser.add_argument("--target-language", dest="target_languages", default=[], action="append", choices=LanguageNames,
+                                     help="Target language, can be specified multiple times. All languages of the data file by default")
+        validate_parser.add_argument("--jobs", dest="jobs", default=1, type=int,
+                                     help="The number of processes to parse source files, 1 by default. 0 means the number of CPUs")
+        validate_parser.add_argument("--source-cache", dest="source_cache", default=None,
+                                     help="The file which caches parsed source files, source files will be parsed every time if not specified")
+        validate_parser.set_defaults(handler=run_validate)
+        # Convert
+        convert_parser = sub_parsers.add_parser("convert", help="Convert the data file between json lines and snapshot format")
+        convert_parser.add_argument("--input", dest="input", required=True,
+                                    help="The data file to convert, either format. Its journal is replayed if exists")
+        convert_parser.add_argument("--output", dest="output", required=True, help="The converted data file")
+        convert_parser.add_argument("--format", dest="format", required=True, choices=[DataFormatJsonLines, DataFormatSnapshot],
+                                    help="The format of converted data file. json lines is the diff-friendly one to commit, snapshot is memory-mapped and loaded instantly")
+        convert_parser.set_defaults(handler=run_convert)
+        # Daemon
+        daemon_parser = sub_parsers.add_parser(
+            "daemon", help="Run a daemon which keeps sources and data files loaded, commands with --daemon run in it without loading them again")
+        daemon_parser.add_argument("--address", dest="address", default=get_default_address(),
+                                   help="The unix socket path (or named pipe on windows) to listen on, %s by default" % get_default_address())
+        daemon_parser.add_argument("--max-loaded", dest="max_loaded", default=4, type=int,
+                                   help="The max number of loaded (source, data file) pairs, least recently used ones are unloaded. 4 by default")
+        daemon_parser.set_defaults(handler=run_daemon)
 
         return parser.parse_args()
 
+    def load_translation_manager(args, source_paths: List[str], data_file: str) -> TranslationManager:
+        """Load the source and the data file. The daemon keeps them loaded
+        """
+        if gLoadedData is None:
+            source_cache = SourceCache(os.path.abspath(args.source_cache)) if args.source_cache else None
+            source_localization = LocalizationManager([args.source_language] if args.source_language else None, source_cache)
+            for source_path in source_paths:
+                source_localization.load(source_path, args.jobs)
+            translation_manager = TranslationManager(source_localization)
+            translation_manager.load(data_file)
+            return translation_manager
+        loaded_key = (tuple(source_paths), args.source_language, args.source_cache, data_file)
+        loaded = gLoadedData.pop(loaded_key, None)
+        if loaded is None:
+            loaded = LoadedData(args, source_paths, data_file)
+        gLoadedData[loaded_key] = loaded
+        while len(gLoadedData) > args.max_loaded:
+            gLoadedData.popitem(last=False)
+        gUsedData.append(loaded)
+        return loaded.refresh()
+
     def run_build(args):
         """Run build
         """
@@ -259,17 +1124,30 @@ if __name__ == "__main__":
         if not os.path.isdir(os.path.dirname(data_file)):
             raise ValueError("Parent directory of data file [%s] not exist" % data_file)
 
-        output_path = os.path.abspath(args.output_path)
-        if not os.path.isdir(output_path):
-            raise ValueError("Output dir [%s] not exist" % output_path)
+        # Targets
+        targets = load_build_plan(os.path.abspath(args.plan)) if args.plan else []
+        if args.name or args.output_path:
+            if not args.name or not args.output_path:
+                raise ValueError("Require both --name and --output-path")
+            targets.append(get_build_target({
+                "name": args.name,
+                "output_path": args.output_path,
+                "build_none_translated_key": args.build_none_translated_key,
+            }, os.getcwd()))
+        if not targets:
+            raise ValueError("Require --name and --output-path, or --plan")
 
         print("[+] Run build")
-        source_localization = LocalizationManager([args.source_language] if args.source_language else None)
-        for source_path in source_paths:
-            source_localization.load(source_path)
-        translation_manager = TranslationManager(source_localization)
-        translation_manager.load(data_file)
-        translation_manager.build(args.name, output_path, build_none_translated_key=args.build_none_translated_key)
+        translation_manager = load_translation_manager(args, source_paths, data_file)
+        built_files = translation_manager.build_targets(targets, emitter=dump_localization_file if args.emitter == "ruamel" else write_localization_file,
+                                                        jobs=args.jobs)
+        print("[+] Written [%d] changed language files: %s" % (len(built_files), ", ".join(
+            language if len(targets) == 1 else "%s/%s" % (name, language) for name, language in built_files)))
+        built_languages = list(dict.fromkeys(language for _, language in built_files))
+        for language in built_languages:
+            result = translation_manager.validate(language)
+            if result.issues:
+                print("[!] Found [%d] issues of [%s] translations, run validate for details" % (len(result.issues), language))
         return 0
 
     def run_auto_skip(args):
@@ -290,35 +1168,22 @@ if __name__ == "__main__":
             raise ValueError("Parent directory of data file [%s] not exist" % data_file)
 
         print("[+] Run auto skip")
-        source_localization = LocalizationManager([args.source_language] if args.source_language else None)
-        for source_path in source_paths:
-            source_localization.load(source_path)
-        translation_manager = TranslationManager(source_localization)
-        translation_manager.load(data_file)
+        translation_manager = load_translation_manager(args, source_paths, data_file)
 
         new_keys, changed_keys, done_keys, skipped_keys = translation_manager.get_translation_keys(args.target_language)
         # Print states
         print("[+] Before generating skip keys: new [%d] changed [%d] done [%d] skipped [%d]" % (
             len(new_keys), len(changed_keys), len(done_keys), len(skipped_keys)))
 
-        auto_skip_count = 0
-
-        for key in itertools.chain(new_keys, changed_keys):
-            localization_item = source_localization.get(key)
-            if not localization_item or not localization_item.values or localization_item.values[0].value is None:
-                continue
-            # Empty
-            if not localization_item.values[0].value.strip():
-                auto_skip_count += 1
-                translation_manager.add(key, args.target_language, "", True)
-                continue
-            # No need to translate
-            if AliasValueRegex.match(localization_item.values[0].value):
-                auto_skip_count += 1
-                translation_manager.add(key, args.target_language, "", True)
-                continue
-
-        print("[+] Found %d new skipped keys" % auto_skip_count)
+        if args.dry_run:
+            result = translation_manager.classify_skip_keys(args.target_language, args.rules or None, args.jobs)
+        else:
+            result = translation_manager.auto_skip(args.target_language, args.rules or None, args.jobs)
+        for name, stats in result.stats.items():
+            print("[+] Rule [%s]: matched [%d] keys in %.3fs" % (name, stats.count, stats.elapsed))
+        print("[+] Found %d new skipped keys in %.3fs" % (len(result.matches), result.elapsed))
+        if args.dry_run:
+            return 0
 
         # Save and print new stats
         translation_manager.save(data_file)
@@ -328,10 +1193,146 @@ if __name__ == "__main__":
 
         return 0
 
+    def run_validate(args):
+        """Run validate
+        """
+        # Source
+        source_paths = []
+        if not args.source_paths:
+            raise ValueError("Require at least 1 source path")
+        for source_path in args.source_paths:
+            source_path = os.path.abspath(source_path)
+            if not os.path.isdir(source_path) and not os.path.isfile(source_path):
+                raise ValueError("Source path [%s] not exist" % source_path)
+            source_paths.append(source_path)
+
+        data_file = os.path.abspath(args.data_file)
+        if not os.path.isfile(data_file):
+            raise ValueError("Data file [%s] not exist" % data_file)
+
+        print("[+] Run validate")
+        translation_manager = load_translation_manager(args, source_paths, data_file)
+
+        issue_count = 0
+        for language in args.target_languages or translation_manager.languages:
+            result = translation_manager.validate(language)
+            for issue in result.issues:
+                print("[!] [%s] %s: %s%s%s" % (
+                    language, issue.key, issue.kind,
+                    " missing %s" % json.dumps(issue.missing, ensure_ascii=False) if issue.missing else "",
+                    " unexpected %s" % json.dumps(issue.unexpected, ensure_ascii=False) if issue.unexpected else "",
+                ))
+            print("[+] Language [%s]: found [%d] issues in [%d] translations in %.3fs" % (
+                language, len(result.issues), result.checked, result.elapsed))
+            issue_count += len(result.issues)
+        # Non-zero exit code so it can be used in scripts
+        return 1 if issue_count else 0
+
+    def run_convert(args):
+        """Run convert
+        """
+        input_file = os.path.abspath(args.input)
+        if not os.path.isfile(input_file):
+            raise ValueError("Data file [%s] not exist" % input_file)
+        output_file = os.path.abspath(args.output)
+        if output_file == input_file:
+            raise ValueError("Output file MUST NOT be the input file")
+        if not os.path.isdir(os.path.dirname(output_file)):
+            raise ValueError("Parent directory of output file [%s] not exist" % output_file)
+
+        print("[+] Run convert")
+        translation_manager = TranslationManager(LocalizationManager())
+        translation_manager.load(input_file)
+        translation_manager.save(output_file, args.format)
+        print("[+] Converted [%s] data file [%s] to [%s] data file [%s]" % (
+            translation_manager.data_format, input_file, args.format, output_file))
+        return 0
+
+    def run_daemon(args):
+        """Run daemon
+        """
+        global gLoadedData
+
+        gLoadedData = OrderedDict()
+        handlers = {"build": run_build, "auto-skip": run_auto_skip, "validate": run_validate}
+
+        def handle_request(request):
+            """Run a command with args sent by the client, returns its output and exit code
+            """
+            handler = handlers.get(request["args"].get("action"))
+            if handler is None:
+                return {"output": "[!] Unsupported command\n", "code": 2}
+            command_args = Namespace(**request["args"], handler=handler, max_loaded=args.max_loaded)
+            print("[+] Run %s" % command_args.action, flush=True)
+            output = io.StringIO()
+            gUsedData.clear()
+            try:
+                with redirect_stdout(output):
+                    code = run_command(command_args)
+            except Exception:
+                output.write(traceback.format_exc())
+                code = 1
+                # The loaded data may be partially changed
+                for loaded in gUsedData:
+                    loaded.translation_manager = None
+            else:
+                # The data file may be saved by the command
+                for loaded in gUsedData:
+                    loaded.data_fingerprint = loaded.get_data_fingerprint()
+            return {"output": output.getvalue(), "code": code}
+
+        # Exit normally on termination so the socket and the key file are removed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            serve_daemon(os.path.abspath(args.address) if sys.platform != "win32" else args.address, handle_request)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    def run_in_daemon(args) -> int | None:
+        """Run the command in the daemon, returns None if the daemon is not running
+        """
+        request_args = {name: value for name, value in vars(args).items() if name not in ("handler", "daemon_address")}
+        for name in DaemonPathArgs:
+            value = request_args.get(name)
+            if isinstance(value, list):
+                request_args[name] = [os.path.abspath(path) for path in value]
+            elif value:
+                request_args[name] = os.path.abspath(value)
+        response = call_daemon(args.daemon_address, {"args": request_args})
+        if response is None:
+            print("[!] Daemon [%s] is not running, run the command in this process" % args.daemon_address, file=sys.stderr)
+            return None
+        sys.stdout.write(response["output"])
+        return response["code"]
+
+    def run_command(args):
+        """Run the command, profile it if required
+        """
+        if not args.profile_path:
+            return args.handler(args)
+        profile_path = os.path.abspath(args.profile_path)
+        os.makedirs(profile_path, exist_ok=True)
+        tracemalloc.start()
+        try:
+            with profile(os.path.join(profile_path, "translation-%s" % args.action)):
+                code = args.handler(args)
+        finally:
+            # The daemon keeps running
+            tracemalloc.stop()
+        for labels, count, total_seconds in sorted(gMetrics.get_histograms("translation_phase_seconds")):
+            print("[+] Phase %s: %d call(s) in %.3fs" % (dict(labels)["phase"], count, total_seconds))
+        print("[+] Profile is dumped into [%s]" % profile_path)
+        return code
+
     def main():
         """Main entry
         """
         args = get_args()
-        return args.handler(args)
+        if args.daemon_address and args.action in DaemonActions:
+            code = run_in_daemon(args)
+            if code is not None:
+                return code
+        return run_command(args)
 
     sys.exit(main())
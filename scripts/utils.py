@@ -11,22 +11,31 @@
 
 import sys
 
+from functools import lru_cache
+
 try:
     import simplejson as json
 except ImportError:
     import json
 
-from ruamel.yaml import YAML
-
 LanguageNames = ["braz_por", "english", "french", "german", "japanese", "korean", "polish", "russian", "simp_chinese", "spanish"]
 
-yaml = YAML()
-yaml.width = sys.maxsize        # Prevent from wrap the line
-yaml.map_indent = 1             # Only have 1 white space as prefix
-yaml.preserve_quotes = True     # Add quotes
+
+@lru_cache(maxsize=None)
+def get_yaml():
+    """Get the yaml instance. ruamel is imported on first use since it's slow to import and only used by the reference emitter
+    """
+    from ruamel.yaml import YAML
+
+    yaml = YAML()
+    yaml.width = sys.maxsize        # Prevent from wrap the line
+    yaml.map_indent = 1             # Only have 1 white space as prefix
+    yaml.preserve_quotes = True     # Add quotes
+    return yaml
+
 
 __all__ = [
     "json",
-    "yaml",
+    "get_yaml",
     "LanguageNames",
 ]
@@ -0,0 +1,151 @@
+# encoding=utf-8
+
+""" Translation validator
+    Author: lipixun
+    Created Time : 2024-04-15 21:08:44
+
+    File Name: validator.py
+    Description:
+
+        Check that a translation keeps the tokens of the source value which the game interprets: references (`$KEY$`),
+        icons (`£icon£`), formatting codes (`§X`) and line breaks. Broken tokens are otherwise only found in game.
+        Tokens of source values and results of translations are cached, so a run only checks changed keys.
+
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import re
+import threading
+
+from time import perf_counter
+
+# Token kinds
+TokenKindReference = "reference"
+TokenKindIcon = "icon"
+TokenKindFormatting = "formatting"
+TokenKindNewline = "newline"
+TokenKinds = [TokenKindReference, TokenKindIcon, TokenKindFormatting, TokenKindNewline]
+
+# Token regexes, in the order of `TokenKinds`. A literal `\n` in a translation is a token as well, since it's escaped on build and shown as is in game
+TokenRegexes = [
+    re.compile(r"\$[^\$\n]*\$", re.UNICODE),
+    re.compile(r"£[^£\n]*£", re.UNICODE),
+    re.compile(r"§.", re.UNICODE | re.DOTALL),
+    re.compile(r"\n|\\n", re.UNICODE),
+]
+
+# Sorted tokens of each kind, in the order of `TokenKinds`
+Tokens = Tuple[Tuple[str, ...], ...]
+
+ValidationIssue = NamedTuple("ValidationIssue", [
+    ("key", str),
+    ("kind", str),
+    ("missing", List[str]),             # Tokens of the source value not in the translation
+    ("unexpected", List[str]),          # Tokens of the translation not in the source value
+])
+
+ValidateResult = NamedTuple("ValidateResult", [
+    ("issues", List[ValidationIssue]),  # Sorted by key
+    ("checked", int),                   # The number of translations
+    ("rechecked", int),                 # The number of translations checked in this run (others are cached)
+    ("elapsed", float),                 # Seconds
+])
+
+
+def tokenize(value: str) -> Tokens:
+    """Get tokens of a value
+    """
+    tokens = []
+    for regex in TokenRegexes:
+        kind_tokens = regex.findall(value)
+        if len(kind_tokens) > 1:
+            kind_tokens.sort()
+        tokens.append(tuple(kind_tokens))
+    return tuple(tokens)
+
+
+def validate_value(key: str, source_value: str, translation: str) -> List[ValidationIssue]:
+    """Validate a translation without cache
+    """
+    return compare_tokens(key, tokenize(source_value), tokenize(translation))
+
+
+def compare_tokens(key: str, source_tokens: Tokens, translation_tokens: Tokens) -> List[ValidationIssue]:
+    """Compare tokens of the source value and the translation. The order of tokens is not checked since it may change in translation
+    """
+    if source_tokens == translation_tokens:
+        return []
+    issues = []
+    for kind, expected, actual in zip(TokenKinds, source_tokens, translation_tokens):
+        if expected != actual:
+            missing, unexpected = diff_sorted_tokens(expected, actual)
+            issues.append(ValidationIssue(key, kind, missing, unexpected))
+    return issues
+
+
+def diff_sorted_tokens(expected: Tuple[str, ...], actual: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+    """Get (missing, unexpected) tokens of two sorted token lists
+    """
+    missing: List[str] = []
+    unexpected: List[str] = []
+    i, j = 0, 0
+    while i < len(expected) and j < len(actual):
+        if expected[i] == actual[j]:
+            i += 1
+            j += 1
+        elif expected[i] < actual[j]:
+            missing.append(expected[i])
+            i += 1
+        else:
+            unexpected.append(actual[j])
+            j += 1
+    missing.extend(expected[i:])
+    unexpected.extend(actual[j:])
+    return missing, unexpected
+
+
+class Validator(object):
+    """Validate translations of a language incrementally
+    """
+
+    def __init__(self) -> None:
+        """Create a new Validator
+        """
+        self._lock = threading.Lock()
+        self._source_tokens: Dict[str, Tuple[str, Tokens]] = {}                     # key to (source value, tokens)
+        self._results: Dict[str, Tuple[str, str, List[ValidationIssue]]] = {}       # key to (source value, translation, issues)
+        self._version: Tuple | None = None
+        self._result: ValidateResult | None = None
+
+    def validate(self, items: Iterable[Tuple[str, str, str]], version: Tuple | None = None) -> ValidateResult:
+        """Validate (key, source value, translation) items, only changed ones are checked
+        Args:
+            version: Versions of the items, the last result is returned without iterating items if it's the same as last run
+        """
+        with self._lock:
+            if version is not None and version == self._version and self._result is not None:
+                return self._result._replace(rechecked=0, elapsed=0.0)
+            start_time = perf_counter()
+            source_tokens: Dict[str, Tuple[str, Tokens]] = {}
+            results: Dict[str, Tuple[str, str, List[ValidationIssue]]] = {}
+            rechecked = 0
+            for key, source_value, translation in items:
+                result = self._results.get(key)
+                if result is not None and result[0] == source_value and result[1] == translation:
+                    results[key] = result
+                    if key in self._source_tokens:
+                        source_tokens[key] = self._source_tokens[key]
+                    continue
+                rechecked += 1
+                value = self._source_tokens.get(key)
+                if value is None or value[0] != source_value:
+                    value = (source_value, tokenize(source_value))
+                source_tokens[key] = value
+                results[key] = (source_value, translation, compare_tokens(key, value[1], tokenize(translation)))
+            # Drop removed keys
+            self._source_tokens = source_tokens
+            self._results = results
+            issues = [issue for key in sorted(key for key, result in results.items() if result[2]) for issue in results[key][2]]
+            self._version = version
+            self._result = ValidateResult(issues, len(results), rechecked, perf_counter() - start_time)
+            return self._result
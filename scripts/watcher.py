@@ -0,0 +1,87 @@
+# encoding=utf-8
+
+""" Watcher
+    Author: lipixun
+    Created Time : 2024-03-25 20:41:18
+
+    File Name: watcher.py
+    Description:
+
+"""
+from typing import Callable, Dict, List, Tuple
+
+import os
+import os.path
+import threading
+
+from localization import list_files
+
+
+class SourceWatcher(object):
+    """Watch source paths by polling mtime and size of files
+    """
+
+    def __init__(self, paths: List[str], callback: Callable[[List[str], List[str]], None], interval: float = 2.0) -> None:
+        """Create a new SourceWatcher
+        Args:
+            callback: Called with (changed or new file paths, removed file paths) in the watcher thread
+        """
+        self._paths = paths
+        self._callback = callback
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._snapshot = self._take_snapshot()
+
+    def start(self) -> None:
+        """Start watching in a daemon thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="source-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop watching
+        Args:
+            wait: Wait for the watcher thread to exit. MUST NOT wait while holding a lock which the callback acquires
+        """
+        self._stop_event.set()
+        if self._thread is not None and wait:
+            self._thread.join()
+        self._thread = None
+
+    def check(self) -> Tuple[List[str], List[str]]:
+        """Check changes since last check
+        Returns:
+            (changed or new file paths, removed file paths)
+        """
+        snapshot = self._take_snapshot()
+        changed_filepaths = [path for path, stat in snapshot.items() if self._snapshot.get(path) != stat]
+        removed_filepaths = [path for path in self._snapshot if path not in snapshot]
+        self._snapshot = snapshot
+        return changed_filepaths, removed_filepaths
+
+    def _run(self) -> None:
+        """Run the polling loop
+        """
+        while not self._stop_event.wait(self._interval):
+            try:
+                changed_filepaths, removed_filepaths = self.check()
+                if changed_filepaths or removed_filepaths:
+                    self._callback(changed_filepaths, removed_filepaths)
+            except Exception as error:
+                print("[!] Failed to check source changes: %s" % error)
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Get (mtime, size) of all files
+        """
+        snapshot = {}
+        for path in self._paths:
+            filepaths = list_files(path) if os.path.isdir(path) else [path]
+            for filepath in filepaths:
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    continue
+                snapshot[filepath] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
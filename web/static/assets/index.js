@@ -1,4 +1,6 @@
 var language = "";
+// The url prefix of current project, empty for the default project
+var basePath = "";
 
 const handleInputSearchKeyKeyUp = _.debounce(async e => await updateTranslationKeys(e.target.value ?? ""), 500);
 
@@ -8,19 +10,44 @@ Navbar
 
 */
 
+const JobPollInterval = 500;
+
+async function runJob(url, title) {
+  // Submit the job, then poll it until finished
+  const response = await fetch(url, { method: "POST" });
+  if (!response.ok) {
+    throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+  }
+  const data = await response.json();
+  if (data?.ok !== true) {
+    throw new Error(`Error: ${data?.message}`);
+  }
+  let job = data.data.job;
+  while (job.state === "pending" || job.state === "running") {
+    showProgressAlert(`${title}: ${Math.round(job.progress * 100)}%`);
+    await new Promise(resolve => setTimeout(resolve, JobPollInterval));
+    const jobResponse = await fetch(`${basePath}/_/jobs/${job.id}`);
+    if (!jobResponse.ok) {
+      throw new Error(`Http Error #${jobResponse.status}: ${jobResponse.statusText}`);
+    }
+    const jobData = await jobResponse.json();
+    if (jobData?.ok !== true) {
+      throw new Error(`Error: ${jobData?.message}`);
+    }
+    job = jobData.data;
+  }
+  if (job.state !== "succeeded") {
+    throw new Error(`Error: ${job.error}`);
+  }
+  return job.result;
+}
+
 async function handleSaveClick() {
   try {
-    const response = await fetch("/_/save", { method: "POST" });
-    if (response.ok) {
-      const data = await response.json();
-      if (data?.ok !== true) {
-        throw new Error(`Error: ${data?.message}`);
-      }
-      // Good
-      showSuccessAlert("Save succeed");
-    } else {
-      throw new Error(`Http Error #${response.status}: ${response.statusText}`);
-    }
+    await runJob(`${basePath}/_/save`, "Saving");
+    // Good
+    showSuccessAlert("Save succeed");
+    await pollSourceChanges();
   } catch (e) {
     showErrorModal(`${e}`, "Save failed");
   }
@@ -28,20 +55,57 @@ async function handleSaveClick() {
 
 async function handleSaveAndBuildClick() {
   try {
-    const response = await fetch("/_/save_and_build", { method: "POST" });
-    if (response.ok) {
+    const result = await runJob(`${basePath}/_/save_and_build`, "Saving and building");
+    // Good
+    const builtLanguages = result?.built_languages ?? [];
+    showSuccessAlert(builtLanguages.length > 0 ? `Save and build succeed, written: ${builtLanguages.join(", ")}` : "Save and build succeed, nothing changed");
+    const issues = Object.entries(result?.issues ?? {}).filter(([, count]) => count > 0);
+    if (issues.length > 0) {
+      showInfoModal(`Translations with broken references, icons, formatting codes or line breaks: ${issues.map(([lang, count]) => `${lang} (${count})`).join(", ")}. See ${basePath}/_/validate?language=... for details`, "Validation");
+    }
+    await pollSourceChanges();
+  } catch (e) {
+    showErrorModal(`${e}`, "Save and build failed");
+  }
+}
+
+async function handleAcceptTrivialChangesClick() {
+  try {
+    const submit = async dryRun => {
+      const response = await fetch(`${basePath}/_/accept_trivial_changes`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({ language, dry_run: dryRun }),
+      });
+      if (!response.ok) {
+        throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+      }
       const data = await response.json();
       if (data?.ok !== true) {
         throw new Error(`Error: ${data?.message}`);
       }
-      // Good
-      showSuccessAlert("Save and build succeed");
-    } else {
-      throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+      return data.data;
+    };
+    const preview = await submit(true);
+    if (preview.size === 0) {
+      showInfoModal("No changed key of which only whitespaces or punctuations of the original value changed");
+      return;
     }
+    if (!confirm(`Accept translations of ${preview.size} changed keys of which only whitespaces or punctuations of the original value changed?`)) {
+      return;
+    }
+    const result = await submit(false);
+    showSuccessAlert(`Accepted ${result.size} trivial changes`);
   } catch (e) {
-    showErrorModal(`${e}`, "Save and build failed");
+    showErrorModal(`${e}`, "Accept trivial changes failed");
+    return;
   }
+  // Keys have moved to other states
+  await updateTranslationKeys(keyQuery);
+  await updateTranslationContent(null);
+  await updateTranslationSuggestions(null);
 }
 
 /*
@@ -50,68 +114,301 @@ Translation key list
 
 */
 
+const KeyStates = ["new", "changed", "done", "skipped"];
+const KeyPageSize = 200;
+const KeyItemHeight = 34;
+const KeyItemOverscan = 10;
+
+// The key lists of all states. Only the pages around the visible window are fetched
+var keyQuery = "";
+var keyListVersion = 0;
+var keyLists = {};
+var activeKey = null;
+// Selected keys of the active state, for bulk actions
+var keySelection = { state: null, keys: new Set(), lastIndex: null };
+
+function resetKeyLists() {
+  keyListVersion += 1;
+  clearKeySelection();
+  for (const state of KeyStates) {
+    keyLists[state] = { size: 0, pages: new Map(), pendingPages: new Map() };
+  }
+}
+
+function getActiveKeyState() {
+  const activeTab = document.querySelector(".translation-keys-tab-header .nav-link.active");
+  return activeTab?.dataset?.state ?? "new";
+}
+
+async function fetchTranslationKeys(state, params) {
+  const version = keyListVersion;
+  const scope = document.getElementById("select-search-scope").value;
+  const response = await fetch(`${basePath}/_/keys?language=${encodeURIComponent(language)}&query=${encodeURIComponent(keyQuery)}&scope=${encodeURIComponent(scope)}` +
+    `&state=${state}&${new URLSearchParams(params)}`);
+  if (!response.ok) {
+    throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+  }
+  const data = await response.json();
+  if (data?.ok !== true) {
+    throw new Error(`Error: ${data?.message}`);
+  }
+  if (version !== keyListVersion) {
+    // Outdated
+    return null;
+  }
+  updateTranslationKeySizes(data.data.sizes);
+  return data.data;
+}
+
+async function fetchTranslationKeyPage(state, pageIndex) {
+  const data = await fetchTranslationKeys(state, { offset: pageIndex * KeyPageSize, limit: KeyPageSize });
+  if (data) {
+    keyLists[state].pages.set(pageIndex, data.keys ?? []);
+  }
+  return data;
+}
+
+function updateTranslationKeySizes(sizes) {
+  for (const name of KeyStates) {
+    keyLists[name].size = sizes?.[name] ?? 0;
+    document.getElementById(`translation-keys-tab-header-${name}-key-size`).innerHTML = `${keyLists[name].size}`;
+    document.getElementById(`translation-keys-${name}-key-list`).style.height = `${keyLists[name].size * KeyItemHeight}px`;
+  }
+}
+
+async function reloadTranslationKeyPages() {
+  // A submitted key may move to another state, so fetched pages (and sizes) are outdated. Fetch the visible ones again
+  keyListVersion += 1;
+  for (const state of KeyStates) {
+    keyLists[state].pages = new Map();
+    keyLists[state].pendingPages = new Map();
+  }
+  await renderTranslationKeys();
+}
+
+async function loadTranslationKeyPage(state, pageIndex) {
+  const keyList = keyLists[state];
+  if (keyList.pages.has(pageIndex)) {
+    return;
+  }
+  if (!keyList.pendingPages.has(pageIndex)) {
+    keyList.pendingPages.set(pageIndex, fetchTranslationKeyPage(state, pageIndex).finally(() => keyList.pendingPages.delete(pageIndex)));
+  }
+  await keyList.pendingPages.get(pageIndex);
+}
+
+function getTranslationKey(state, index) {
+  return keyLists[state]?.pages.get(Math.floor(index / KeyPageSize))?.[index % KeyPageSize];
+}
+
 async function updateTranslationKeys(query) {
   try {
-    const response = await fetch(`/_/keys?language=${language}&query=${query}`);
-    if (response.ok) {
-      const data = await response.json();
-      if (data?.ok !== true) {
-        throw new Error(`Error: ${data?.message}`);
-      }
-      // Good, update key tab
-      const updateKeyTab = (keys, sizeElementName, listElementName) => {
-        if (keys?.length > 0) {
-          const items = [];
-          for (const key of keys) {
-            items.push(`<li class="list-group-item list-group-item-action translation-key-item" data-value="${key}" onclick="handleTranslationKeyItemClick(event)">${key}</li>`);
-          }
-          document.getElementById(listElementName).innerHTML = items.join("\n");
-          document.getElementById(sizeElementName).innerHTML = `${keys.length}`;
-        } else {
-          document.getElementById(listElementName).innerHTML = "";
-          document.getElementById(sizeElementName).innerHTML = "0";
-        }
-      }
-      updateKeyTab(data?.data?.new_keys, "translation-keys-tab-header-new-key-size", "translation-keys-new-key-list");
-      updateKeyTab(data?.data?.changed_keys, "translation-keys-tab-header-changed-key-size", "translation-keys-changed-key-list");
-      updateKeyTab(data?.data?.done_keys, "translation-keys-tab-header-done-key-size", "translation-keys-done-key-list");
-      updateKeyTab(data?.data?.skipped_keys, "translation-keys-tab-header-skipped-key-size", "translation-keys-skipped-key-list");
-    } else {
-      throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+    keyQuery = query ?? "";
+    activeKey = null;
+    resetKeyLists();
+    // Fetch the first page of the active state, which also returns sizes of all states
+    const state = getActiveKeyState();
+    const data = await fetchTranslationKeyPage(state, 0);
+    if (!data) {
+      return;
     }
+    document.getElementById("translation-keys-tab-content").scrollTop = 0;
+    await renderTranslationKeys();
   } catch (e) {
     showErrorModal(`${e}`, "Update keys failed");
   }
 }
 
-async function handleTranslationKeyItemClick(e) {
-  // Switch active state
+async function renderTranslationKeys() {
+  const state = getActiveKeyState();
+  const keyList = keyLists[state];
+  if (!keyList) {
+    return;
+  }
+  // Get visible window
+  const container = document.getElementById("translation-keys-tab-content");
+  const first = Math.max(0, Math.floor(container.scrollTop / KeyItemHeight) - KeyItemOverscan);
+  const last = Math.min(keyList.size, Math.ceil((container.scrollTop + container.clientHeight) / KeyItemHeight) + KeyItemOverscan);
+  // Render what we have, then fetch missing pages and render again
+  const render = () => {
+    const items = [];
+    for (let index = first; index < last; index++) {
+      const key = getTranslationKey(state, index);
+      if (key === undefined) {
+        continue;
+      }
+      const active = activeKey?.state === state && activeKey?.key === key ? " active" : "";
+      const selected = keySelection.state === state && keySelection.keys.has(key) ? " translation-key-item-selected" : "";
+      items.push(`<li class="list-group-item list-group-item-action translation-key-item${active}${selected}" style="top: ${index * KeyItemHeight}px" ` +
+        `data-state="${state}" data-index="${index}" data-value="${key}" onclick="handleTranslationKeyItemClick(event)">${key}</li>`);
+    }
+    document.getElementById(`translation-keys-${state}-key-list`).innerHTML = items.join("\n");
+  };
+  render();
+  const missingPages = [];
+  for (let pageIndex = Math.floor(first / KeyPageSize); pageIndex * KeyPageSize < last; pageIndex++) {
+    if (!keyList.pages.has(pageIndex)) {
+      missingPages.push(pageIndex);
+    }
+  }
+  if (missingPages.length > 0) {
+    const version = keyListVersion;
+    try {
+      await Promise.all(missingPages.map(pageIndex => loadTranslationKeyPage(state, pageIndex)));
+    } catch (e) {
+      showErrorModal(`${e}`, "Update keys failed");
+      return;
+    }
+    if (version === keyListVersion) {
+      render();
+    }
+  }
+}
+
+async function selectTranslationKeyItem(state, index) {
+  const key = getTranslationKey(state, index);
+  if (key === undefined) {
+    return;
+  }
+  activeKey = { state, index, key };
   document.querySelectorAll(".translation-key-item.active").forEach(element => element.classList.remove("active"));
-  e.target.classList.add("active");
+  document.querySelector(`.translation-key-item[data-state="${state}"][data-index="${index}"]`)?.classList.add("active");
   // Update translation content
-  const succeed = await updateTranslationContent(e.target.dataset.value);
+  const succeed = await updateTranslationContent(key);
   if (succeed) {
     document.getElementById("input-translation-translate-value").focus();
   }
+  await updateTranslationSuggestions(key);
+}
+
+async function handleTranslationKeyItemClick(e) {
+  const state = e.target.dataset.state;
+  const index = parseInt(e.target.dataset.index);
+  if (e.ctrlKey || e.metaKey || e.shiftKey) {
+    // Select keys for bulk actions
+    await toggleKeySelection(state, index, e.shiftKey);
+    return;
+  }
+  clearKeySelection();
+  await renderTranslationKeys();
+  await selectTranslationKeyItem(state, index);
+}
+
+/*
+
+Bulk actions
+
+*/
+
+function clearKeySelection() {
+  keySelection = { state: null, keys: new Set(), lastIndex: null };
+  renderKeySelection();
+}
+
+async function toggleKeySelection(state, index, range) {
+  if (keySelection.state !== state) {
+    keySelection = { state, keys: new Set(), lastIndex: null };
+  }
+  if (range && keySelection.lastIndex !== null) {
+    // Select all keys between the last selected one and this one
+    const first = Math.min(keySelection.lastIndex, index);
+    const last = Math.max(keySelection.lastIndex, index);
+    try {
+      const pageIndexes = _.range(Math.floor(first / KeyPageSize), Math.floor(last / KeyPageSize) + 1);
+      await Promise.all(pageIndexes.map(pageIndex => loadTranslationKeyPage(state, pageIndex)));
+    } catch (e) {
+      showErrorModal(`${e}`, "Update keys failed");
+      return;
+    }
+    for (let i = first; i <= last; i++) {
+      const key = getTranslationKey(state, i);
+      if (key !== undefined) {
+        keySelection.keys.add(key);
+      }
+    }
+  } else {
+    const key = getTranslationKey(state, index);
+    if (keySelection.keys.has(key)) {
+      keySelection.keys.delete(key);
+    } else if (key !== undefined) {
+      keySelection.keys.add(key);
+    }
+  }
+  keySelection.lastIndex = index;
+  renderKeySelection();
+  await renderTranslationKeys();
+}
+
+function renderKeySelection() {
+  const size = keySelection.keys.size;
+  document.getElementById("translation-keys-bulk-actions").classList.toggle("d-none", size === 0);
+  document.getElementById("translation-keys-selected-size").innerHTML = `${size}`;
+  document.getElementById("btn-bulk-accept").disabled = keySelection.state !== "changed";
+  document.getElementById("btn-bulk-skip").disabled = keySelection.state === "skipped";
+}
+
+async function submitBulkOperation(op, title) {
+  const keys = [...keySelection.keys];
+  if (keys.length === 0) {
+    return;
+  }
+  try {
+    const response = await fetch(`${basePath}/_/translations`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        operations: keys.map(key => ({ op, key, language })),
+      }),
+    });
+    if (response.ok) {
+      const data = await response.json();
+      if (data?.ok !== true) {
+        throw new Error(`Error: ${data?.message}`);
+      }
+      showSuccessAlert(`${title} succeed, ${data.data.changed} keys changed`);
+    } else {
+      throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+    }
+  } catch (e) {
+    showErrorModal(`${e}`, `${title} failed`);
+    return;
+  }
+  // Keys have moved to other states
+  await updateTranslationKeys(keyQuery);
+  await updateTranslationContent(null);
+  await updateTranslationSuggestions(null);
 }
 
 async function moveToNextTranslationKeyItem() {
-  // Get next key of current active element
-  const activeKeyItems = document.querySelectorAll(".translation-key-item.active");
-  if (activeKeyItems.length !== 1) {
+  // Get next key of current active key
+  if (!activeKey || activeKey.state !== getActiveKeyState()) {
     return;
   }
-  const nextElement = activeKeyItems[0].nextElementSibling;
-  if (nextElement && nextElement.dataset.value) {
-    // Move to this item
-    document.querySelectorAll(".translation-key-item.active").forEach(element => element.classList.remove("active"));
-    nextElement.classList.add("active");
-    // Update translation content
-    const succeed = await updateTranslationContent(nextElement.dataset.value);
-    if (succeed) {
-      document.getElementById("input-translation-translate-value").focus();
+  // The active key may have moved to another state, so the next key is found by the key instead of its index
+  const { state, key } = activeKey;
+  let index;
+  try {
+    const data = await fetchTranslationKeys(state, { after: key, limit: 1 });
+    if (!data || data.keys.length === 0) {
+      return;
     }
+    index = data.offset;
+    await loadTranslationKeyPage(state, Math.floor(index / KeyPageSize));
+  } catch (e) {
+    showErrorModal(`${e}`, "Update keys failed");
+    return;
   }
+  // Scroll the item into view
+  const container = document.getElementById("translation-keys-tab-content");
+  const top = index * KeyItemHeight;
+  if (top < container.scrollTop || top + KeyItemHeight > container.scrollTop + container.clientHeight) {
+    container.scrollTop = top + KeyItemHeight - container.clientHeight;
+  }
+  activeKey = { state, index, key: getTranslationKey(state, index) };
+  await renderTranslationKeys();
+  await selectTranslationKeyItem(state, index);
 }
 
 /*
@@ -123,7 +420,7 @@ Translation content
 async function updateTranslationContent(key) {
   if (key) {
     try {
-      const response = await fetch(`/_/translation?key=${encodeURIComponent(key)}&language=${encodeURIComponent(language)}`);
+      const response = await fetch(`${basePath}/_/translation?key=${encodeURIComponent(key)}&language=${encodeURIComponent(language)}`);
       if (response.ok) {
         const data = await response.json();
         if (data?.ok !== true) {
@@ -161,6 +458,14 @@ function renderTranslationContent(data) {
     document.getElementById("checkbox-translation-translate-skipped").checked = false;
   }
   document.getElementById("translation-translate-update-time").innerHTML = `Update time: ${data?.translation?.update_time ?? 'Never'}`;
+  renderTranslationDelta(data?.delta);
+  // Tokens of the original value which are broken in the translation
+  document.getElementById("translation-translate-issues").innerHTML = (data?.translation?.issues ?? []).map(issue =>
+    `<li>Translation ${issue.kind}: ` +
+    [issue.missing.length > 0 ? `missing <code>${escapeHtml(JSON.stringify(issue.missing))}</code>` : "",
+    issue.unexpected.length > 0 ? `unexpected <code>${escapeHtml(JSON.stringify(issue.unexpected))}</code>` : ""].filter(text => text).join(", ") +
+    `</li>`
+  ).join("\n");
   if (data?.source?.key && data?.source?.values?.length > 0) {
     // Enable
     document.getElementById("input-translation-translate-value").disabled = false;
@@ -176,6 +481,69 @@ function renderTranslationContent(data) {
   }
 }
 
+function renderTranslationDelta(delta) {
+  // Word level changes from the original value when translated to the current one
+  const element = document.getElementById("translation-original-delta");
+  if (!delta) {
+    element.classList.add("d-none");
+    element.innerHTML = "";
+    return;
+  }
+  element.classList.remove("d-none");
+  element.innerHTML =
+    `<h6 class="card-subtitle">Changed since translated${delta.trivial ? ' <span class="badge text-bg-success">Only whitespaces or punctuations</span>' : ""}</h6>` +
+    `<div class="translation-original-delta-segments">` +
+    delta.segments.map(segment => {
+      const text = escapeHtml(segment.text);
+      return segment.op === "insert" ? `<ins>${text}</ins>` : segment.op === "delete" ? `<del>${text}</del>` : text;
+    }).join("") +
+    `</div>`;
+}
+
+async function updateTranslationSuggestions(key) {
+  renderTranslationSuggestions([]);
+  if (!key) {
+    return;
+  }
+  try {
+    const response = await fetch(`${basePath}/_/suggestions?key=${encodeURIComponent(key)}&language=${encodeURIComponent(language)}`);
+    if (!response.ok) {
+      throw new Error(`Http Error #${response.status}: ${response.statusText}`);
+    }
+    const data = await response.json();
+    if (data?.ok !== true) {
+      throw new Error(`Error: ${data?.message}`);
+    }
+    if (activeKey?.key === key) {
+      renderTranslationSuggestions(data.data?.suggestions ?? []);
+    }
+  } catch (e) {
+    // Suggestions are optional, don't interrupt translating
+    console.warn(`Get suggestions failed: ${e}`);
+  }
+}
+
+function escapeHtml(value) {
+  return `${value ?? ""}`.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;");
+}
+
+function renderTranslationSuggestions(suggestions) {
+  document.getElementById("translation-suggestions").innerHTML = suggestions.map((suggestion, index) =>
+    `<li class="list-group-item list-group-item-action translation-suggestion-item" data-index="${index}">` +
+    `<span class="badge text-bg-${suggestion.score >= 1 ? "success" : "secondary"} prefix-badge">${Math.round(suggestion.score * 100)}%</span> ` +
+    `${escapeHtml(suggestion.translation).replace(/\n/g, "<br>")}` +
+    `<div class="translation-suggestion-source">${escapeHtml(suggestion.key)}: ${escapeHtml(suggestion.source).replace(/\n/g, "<br>")}</div></li>`
+  ).join("\n");
+  document.querySelectorAll(".translation-suggestion-item").forEach(element =>
+    element.addEventListener("click", () => {
+      const input = document.getElementById("input-translation-translate-value");
+      if (!input.disabled) {
+        input.value = suggestions[parseInt(element.dataset.index)].translation;
+        input.focus();
+      }
+    }));
+}
+
 async function handleTranslateValueTextAreaKeyPress(e) {
   if (e.keyCode === 13 && e.ctrlKey) {
     // Ctrl + Enter, submit it
@@ -196,7 +564,7 @@ async function submitTranslation() {
     return;
   }
   try {
-    const response = await fetch("/_/translation", {
+    const response = await fetch(`${basePath}/_/translation`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
@@ -217,6 +585,7 @@ async function submitTranslation() {
     } else {
       throw new Error(`Http Error #${response.status}: ${response.statusText}`);
     }
+    await reloadTranslationKeyPages();
     return true;
   } catch (e) {
     showErrorModal(`${e}`, "Submit new translation failed");
@@ -225,6 +594,39 @@ async function submitTranslation() {
 }
 
 
+/*
+
+Source changes
+
+*/
+
+const SourcePollInterval = 5000;
+
+var sourceVersion = null;
+
+async function pollSourceChanges() {
+  try {
+    const response = await fetch(`${basePath}/_/source`);
+    if (!response.ok) {
+      return;
+    }
+    const data = await response.json();
+    if (data?.ok !== true) {
+      return;
+    }
+    if (sourceVersion !== null && sourceVersion !== data.data.version) {
+      // Source has been reloaded, refresh keys
+      await updateTranslationKeys(document.getElementById("input-search-key").value);
+      showSuccessAlert(`Source changed at ${data.data.update_time}, keys refreshed`);
+    }
+    sourceVersion = data.data.version;
+    // Changes are saved by the autosave of server
+    document.getElementById("save-state").textContent = data.data.dirty ? "Unsaved changes" : "All changes saved";
+  } catch (e) {
+    // Ignore, the server may be restarting
+  }
+}
+
 /*
 
 Modal utility
@@ -265,6 +667,15 @@ function showSuccessAlert(message) {
   successAlertAutoCloseHandler = setTimeout(() => successAlertContainer.innerHTML = "", 1500);
 }
 
+function showProgressAlert(message) {
+  // Keep showing until replaced
+  if (successAlertAutoCloseHandler) {
+    clearTimeout(successAlertAutoCloseHandler);
+    successAlertAutoCloseHandler = null;
+  }
+  successAlertContainer.innerHTML = `<div class="alert alert-info" role="alert">${message}</div>`;
+}
+
 var tooltipList = null;
 
 /*
@@ -276,6 +687,7 @@ On loaded
 document.addEventListener("DOMContentLoaded", function () {
   // Initalize values
   language = document.getElementById("language-select").value;
+  basePath = document.body.dataset.basePath ?? "";
   errorModal = new bootstrap.Modal(document.getElementById("modal-error"), {});
   infoModal = new bootstrap.Modal(document.getElementById("modal-info"), {});
   successAlertContainer = document.getElementById("alert-success-container");
@@ -284,13 +696,32 @@ document.addEventListener("DOMContentLoaded", function () {
 
   // Hook events
   document.getElementById("language-select").addEventListener("change", () => {
-    window.location.href = `/?language=${document.getElementById("language-select").value}`;
+    window.location.href = `${basePath}/?language=${document.getElementById("language-select").value}`;
+  });
+  document.getElementById("project-select")?.addEventListener("change", () => {
+    window.location.href = `/p/${encodeURIComponent(document.getElementById("project-select").value)}/?language=${language}`;
   });
   document.getElementById("btn-save").addEventListener("click", handleSaveClick);
   document.getElementById("btn-save-and-build").addEventListener("click", handleSaveAndBuildClick);
+  document.getElementById("btn-accept-trivial-changes").addEventListener("click", handleAcceptTrivialChangesClick);
   document.getElementById("input-search-key").addEventListener("keyup", handleInputSearchKeyKeyUp);
+  document.getElementById("select-search-scope").addEventListener("change", () =>
+    updateTranslationKeys(document.getElementById("input-search-key").value));
+  document.getElementById("translation-keys-tab-content").addEventListener("scroll", _.throttle(renderTranslationKeys, 50));
+  document.querySelectorAll(".translation-keys-tab-header .nav-link").forEach(element =>
+    element.addEventListener("shown.bs.tab", () => {
+      clearKeySelection();
+      document.getElementById("translation-keys-tab-content").scrollTop = 0;
+      renderTranslationKeys();
+    }));
   document.getElementById("btn-refresh-keys").addEventListener("click", () =>
     updateTranslationKeys(document.getElementById("input-search-key").value));
+  document.getElementById("btn-bulk-skip").addEventListener("click", () => submitBulkOperation("skip", "Skip selected"));
+  document.getElementById("btn-bulk-accept").addEventListener("click", () => submitBulkOperation("accept", "Accept changed"));
+  document.getElementById("btn-bulk-clear").addEventListener("click", async () => {
+    clearKeySelection();
+    await renderTranslationKeys();
+  });
   document.getElementById("input-translation-translate-value").addEventListener("keypress", handleTranslateValueTextAreaKeyPress);
   document.getElementById("btn-translation-submit").addEventListener("click", e => {
     e.preventDefault();
@@ -306,4 +737,6 @@ document.addEventListener("DOMContentLoaded", function () {
 
   // Load keys
   updateTranslationKeys("");
+  pollSourceChanges();
+  setInterval(pollSourceChanges, SourcePollInterval);
 });
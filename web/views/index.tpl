@@ -7,7 +7,7 @@
     <title>Stellaris Translation Tool</title>
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet"
         integrity="sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH" crossorigin="anonymous">
-    <link href="/assets/index.css" rel="stylesheet">
+    <link href="{{asset_url('assets/index.css')}}" rel="stylesheet">
 
     <script>
         /* Auto switch color mode */
@@ -27,12 +27,12 @@
     </script>
 </head>
 
-<body>
+<body data-base-path="{{base_path}}">
     <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js"
         integrity="sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz"
         crossorigin="anonymous"></script>
     <script src="https://cdn.jsdelivr.net/npm/lodash@4.17.21/lodash.min.js"></script>
-    <script src="/assets/index.js"></script>
+    <script src="{{asset_url('assets/index.js')}}"></script>
     <div class="index-root">
         <div id="alert-success-container">
         </div>
@@ -41,6 +41,7 @@
                 <a class="navbar-brand">Stellaris Translation</a>
                 <!-- Toolbar -->
                 <div class="navbar-tools">
+                    <span id="save-state" class="navbar-text save-state"></span>
                     <button id="btn-save" class="btn btn-primary btn-save" type="button" aria-label="Save">
                         Save (all languages)
                     </button>
@@ -48,6 +49,19 @@
                         aria-label="Save and build">
                         Save and build (all languages)
                     </button>
+                    <button id="btn-accept-trivial-changes" class="btn btn-outline-secondary btn-accept-trivial-changes" type="button"
+                        data-bs-toggle="tooltip" data-bs-placement="bottom"
+                        data-bs-title="Keep translations of changed keys of which only whitespaces or punctuations of the original value changed">
+                        Accept trivial changes
+                    </button>
+                    % if len(projects) > 1:
+                    <select id="project-select" class="form-select project-select" aria-label="Select project">
+                        % for name in projects:
+                        <option value="{{name}}" {{"selected" if name==project else "" }}>{{name}}
+                        </option>
+                        % end
+                    </select>
+                    % end
                     <select id="language-select" class="form-select language-select"
                         aria-label="Select translation language">
                         % for lang in languages:
@@ -72,6 +86,13 @@
                         </span>
                         <input id="input-search-key" type="text" class="form-control" placeholder="Search Content"
                             aria-label="Search" aria-describedby="Search-key">
+                        <select id="select-search-scope" class="form-select translation-keys-search-scope"
+                            aria-label="Search scope">
+                            <option value="key" selected>Key</option>
+                            <option value="source">Source</option>
+                            <option value="translation">Translation</option>
+                            <option value="all">All</option>
+                        </select>
                         <button class="btn btn-outline-secondary" type="button" id="btn-refresh-keys">
                             <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" fill="currentColor"
                                 class="bi bi-arrow-clockwise" viewBox="0 0 16 16">
@@ -85,7 +106,7 @@
                     <!-- Keys tab header-->
                     <ul class="nav nav-tabs translation-keys-tab-header" id="myTab" role="tablist">
                         <li class="nav-item" role="presentation">
-                            <button class="nav-link active" id="new-keys-tab" data-bs-toggle="tab"
+                            <button class="nav-link active" id="new-keys-tab" data-state="new" data-bs-toggle="tab"
                                 data-bs-target="#new-keys-tab-pane" type="button" role="tab"
                                 aria-controls="new-keys-tab-pane" aria-selected="true">
                                 <span data-bs-toggle="tooltip" data-bs-placement="top"
@@ -96,7 +117,7 @@
                             </button>
                         </li>
                         <li class="nav-item" role="presentation">
-                            <button class="nav-link" id="changed-keys-tab" data-bs-toggle="tab"
+                            <button class="nav-link" id="changed-keys-tab" data-state="changed" data-bs-toggle="tab"
                                 data-bs-target="#changed-keys-tab-pane" type="button" role="tab"
                                 aria-controls="changed-keys-tab-pane" aria-selected="false">
                                 <span data-bs-toggle="tooltip" data-bs-placement="top"
@@ -107,7 +128,7 @@
                             </button>
                         </li>
                         <li class="nav-item" role="presentation">
-                            <button class="nav-link" id="done-keys-tab" data-bs-toggle="tab"
+                            <button class="nav-link" id="done-keys-tab" data-state="done" data-bs-toggle="tab"
                                 data-bs-target="#done-keys-tab-pane" type="button" role="tab"
                                 aria-controls="done-keys-tab-pane" aria-selected="false">
                                 <span data-bs-toggle="tooltip" data-bs-placement="top"
@@ -118,7 +139,7 @@
                             </button>
                         </li>
                         <li class="nav-item" role="presentation">
-                            <button class="nav-link" id="skipped-keys-tab" data-bs-toggle="tab"
+                            <button class="nav-link" id="skipped-keys-tab" data-state="skipped" data-bs-toggle="tab"
                                 data-bs-target="#skipped-keys-tab-pane" type="button" role="tab"
                                 aria-controls="skipped-keys-tab-pane" aria-selected="false">
                                 <span data-bs-toggle="tooltip" data-bs-placement="top"
@@ -129,23 +150,34 @@
                             </button>
                         </li>
                     </ul>
+                    <!-- Bulk actions of selected keys (Ctrl/Shift + click to select) -->
+                    <div id="translation-keys-bulk-actions" class="translation-keys-bulk-actions d-none">
+                        <span><span id="translation-keys-selected-size">0</span> selected</span>
+                        <div class="btn-group btn-group-sm" role="group" aria-label="Bulk actions">
+                            <button id="btn-bulk-skip" class="btn btn-outline-secondary" type="button">Skip selected</button>
+                            <button id="btn-bulk-accept" class="btn btn-outline-success" type="button"
+                                data-bs-toggle="tooltip" data-bs-placement="top"
+                                data-bs-title="Keep translations of selected changed keys for their new original values">Accept changed</button>
+                            <button id="btn-bulk-clear" class="btn btn-outline-secondary" type="button">Clear</button>
+                        </div>
+                    </div>
                     <!-- Keys tab content -->
-                    <div class="tab-content translation-keys-tab-content">
+                    <div id="translation-keys-tab-content" class="tab-content translation-keys-tab-content">
                         <div class="tab-pane fade show active" id="new-keys-tab-pane" role="tabpanel"
                             aria-labelledby="new-keys-tab" tabindex="0">
-                            <ul id="translation-keys-new-key-list" class="list-group list-group-flush"></ul>
+                            <ul id="translation-keys-new-key-list" class="list-group list-group-flush translation-keys-virtual-list"></ul>
                         </div>
                         <div class="tab-pane fade" id="changed-keys-tab-pane" role="tabpanel"
                             aria-labelledby="changed-keys-tab" tabindex="1">
-                            <ul id="translation-keys-changed-key-list" class="list-group list-group-flush"></ul>
+                            <ul id="translation-keys-changed-key-list" class="list-group list-group-flush translation-keys-virtual-list"></ul>
                         </div>
                         <div class="tab-pane fade" id="done-keys-tab-pane" role="tabpanel"
                             aria-labelledby="done-keys-tab" tabindex="2">
-                            <ul id="translation-keys-done-key-list" class="list-group list-group-flush"></ul>
+                            <ul id="translation-keys-done-key-list" class="list-group list-group-flush translation-keys-virtual-list"></ul>
                         </div>
                         <div class="tab-pane fade" id="skipped-keys-tab-pane" role="tabpanel"
                             aria-labelledby="skipped-keys-tab" tabindex="3">
-                            <ul id="translation-keys-skipped-key-list" class="list-group list-group-flush"></ul>
+                            <ul id="translation-keys-skipped-key-list" class="list-group list-group-flush translation-keys-virtual-list"></ul>
                         </div>
                     </div>
                 </div>
@@ -158,6 +190,8 @@
                     </div>
                     <ul id="translation-original-values" class="list-group list-group-flush">
                     </ul>
+                    <!-- Changes of the original value since translated -->
+                    <div id="translation-original-delta" class="card-body translation-original-delta d-none"></div>
                 </div>
                 <!-- Translation: Translated content -->
                 <div class="card translation-content-card translation-content-new-value">
@@ -172,6 +206,7 @@
                                 <textarea id="input-translation-translate-value" class="form-control" rows="5" disabled
                                     placeholder="Translation"></textarea>
                             </div>
+                            <ul id="translation-translate-issues" class="translation-translate-issues"></ul>
                             <div class="form-check">
                                 <input class="form-check-input" type="checkbox" value="" disabled
                                     id="checkbox-translation-translate-skipped">
@@ -193,6 +228,14 @@
                         </form>
                     </div>
                 </div>
+                <!-- Translation: Suggestions from translated keys of the same or similar original value -->
+                <div class="card translation-content-card translation-content-suggestions">
+                    <div class="card-body">
+                        <h5 class="card-title">Suggestions</h5>
+                    </div>
+                    <ul id="translation-suggestions" class="list-group list-group-flush">
+                    </ul>
+                </div>
             </div>
         </div>
     </div>